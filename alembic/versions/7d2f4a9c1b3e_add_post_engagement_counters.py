@@ -0,0 +1,47 @@
+"""add materialized engagement counters to posts
+
+Revision ID: 7d2f4a9c1b3e
+Revises: 1a2b3c4d5e6f
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7d2f4a9c1b3e'
+down_revision: Union[str, Sequence[str], None] = '1a2b3c4d5e6f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COUNTERS = {
+    'views_count': 'post_views',
+    'replies_count': 'post_replies',
+    'shares_count': 'post_shares',
+    'reactions_count': 'post_reactions',
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for column in COUNTERS:
+        op.add_column('posts', sa.Column(column, sa.Integer(), server_default='0', nullable=False))
+
+    # post_replies / post_shares were created by `create_all` rather than a
+    # migration, so only backfill from the tables that actually exist
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+    for column, table in COUNTERS.items():
+        if table in existing:
+            op.execute(
+                f"UPDATE posts SET {column} = "
+                f"(SELECT COUNT(*) FROM {table} WHERE {table}.post_id = posts.id)"
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for column in reversed(list(COUNTERS)):
+        op.drop_column('posts', column)
@@ -0,0 +1,55 @@
+"""create post_replies / post_shares and the reply keyset index
+
+Revision ID: a7e3b9d2c5f8
+Revises: f6c2d8e4a1b7
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7e3b9d2c5f8'
+down_revision: Union[str, Sequence[str], None] = 'f6c2d8e4a1b7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # both tables were only ever created by `create_all`, so databases set up
+    # by the app already have them and migration-only databases do not
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+    if 'post_replies' not in existing:
+        op.create_table(
+            'post_replies',
+            sa.Column('id', sa.Integer(), primary_key=True, nullable=False),
+            sa.Column('post_id', sa.Integer(), sa.ForeignKey('posts.id', ondelete='CASCADE'), nullable=False),
+            sa.Column('user', sa.String(length=200), nullable=False),
+            sa.Column('content', sa.Text(), nullable=False),
+            sa.Column('created_at', sa.DateTime(), server_default=sa.func.now(), nullable=False),
+        )
+        op.create_index(op.f('ix_post_replies_post_id'), 'post_replies', ['post_id'], unique=False)
+    if 'post_shares' not in existing:
+        op.create_table(
+            'post_shares',
+            sa.Column('id', sa.Integer(), primary_key=True, nullable=False),
+            sa.Column('post_id', sa.Integer(), sa.ForeignKey('posts.id', ondelete='CASCADE'), nullable=False),
+            sa.Column('user', sa.String(length=200), nullable=False),
+            sa.Column('platform', sa.String(length=120), nullable=True),
+            sa.Column('created_at', sa.DateTime(), server_default=sa.func.now(), nullable=False),
+        )
+        op.create_index(op.f('ix_post_shares_post_id'), 'post_shares', ['post_id'], unique=False)
+    op.create_index(
+        'ix_post_replies_post_id_created_at_id', 'post_replies', ['post_id', 'created_at', 'id'], unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # the tables may predate this revision (created by the app), so only the
+    # index added here is removed
+    op.drop_index('ix_post_replies_post_id_created_at_id', table_name='post_replies')
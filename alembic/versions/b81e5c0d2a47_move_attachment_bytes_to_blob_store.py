@@ -0,0 +1,92 @@
+"""move attachment bytes out of post_attachments into the blob store
+
+Revision ID: b81e5c0d2a47
+Revises: 7d2f4a9c1b3e
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+import io
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b81e5c0d2a47'
+down_revision: Union[str, Sequence[str], None] = '7d2f4a9c1b3e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 50
+
+attachments = sa.table(
+    'post_attachments',
+    sa.column('id', sa.Integer),
+    sa.column('storage_key', sa.String),
+    sa.column('sha256', sa.String),
+    sa.column('size', sa.Integer),
+    sa.column('data', sa.LargeBinary),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    from app.services.blob_store import get_blob_store
+
+    op.add_column('post_attachments', sa.Column('storage_key', sa.String(length=255), nullable=True))
+    op.add_column('post_attachments', sa.Column('sha256', sa.String(length=64), nullable=True))
+    op.create_index(op.f('ix_post_attachments_sha256'), 'post_attachments', ['sha256'], unique=False)
+    op.alter_column('post_attachments', 'data', existing_type=sa.LargeBinary(), nullable=True)
+
+    # copy existing rows out a batch at a time so only BATCH_SIZE blobs are in memory
+    bind = op.get_bind()
+    store = get_blob_store()
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(attachments.c.id, attachments.c.data)
+            .where(attachments.c.id > last_id, attachments.c.data.isnot(None))
+            .order_by(attachments.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        for att_id, data in rows:
+            blob = store.put(io.BytesIO(data))
+            bind.execute(
+                attachments.update()
+                .where(attachments.c.id == att_id)
+                .values(storage_key=blob.key, sha256=blob.sha256, size=blob.size, data=None)
+            )
+        last_id = rows[-1].id
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    from app.services.blob_store import get_blob_store
+
+    bind = op.get_bind()
+    store = get_blob_store()
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(attachments.c.id, attachments.c.storage_key)
+            .where(attachments.c.id > last_id, attachments.c.storage_key.isnot(None))
+            .order_by(attachments.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        for att_id, key in rows:
+            bind.execute(
+                attachments.update()
+                .where(attachments.c.id == att_id)
+                .values(data=b"".join(store.open(key)))
+            )
+        last_id = rows[-1].id
+
+    op.alter_column('post_attachments', 'data', existing_type=sa.LargeBinary(), nullable=False)
+    op.drop_index(op.f('ix_post_attachments_sha256'), table_name='post_attachments')
+    op.drop_column('post_attachments', 'sha256')
+    op.drop_column('post_attachments', 'storage_key')
@@ -0,0 +1,47 @@
+"""create blobs table with reference counts
+
+Revision ID: b9d4f1a6e3c2
+Revises: a7e3b9d2c5f8
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b9d4f1a6e3c2'
+down_revision: Union[str, Sequence[str], None] = 'a7e3b9d2c5f8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'blobs',
+        sa.Column('key', sa.String(length=64), primary_key=True, nullable=False),
+        sa.Column('size', sa.BigInteger(), nullable=False),
+        sa.Column('ref_count', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.func.now(), nullable=False),
+        sa.Column('released_at', sa.DateTime(), nullable=True),
+    )
+    op.create_index(op.f('ix_blobs_released_at'), 'blobs', ['released_at'], unique=False)
+
+    # one reference per attachment and per variant already in the blob store
+    op.execute(
+        "INSERT INTO blobs (key, size, ref_count) "
+        "SELECT storage_key, MAX(size), COUNT(*) FROM ("
+        "  SELECT storage_key, size FROM post_attachments WHERE storage_key IS NOT NULL"
+        "  UNION ALL"
+        "  SELECT storage_key, size FROM post_attachment_variants"
+        ") refs GROUP BY storage_key"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_blobs_released_at'), table_name='blobs')
+    op.drop_table('blobs')
@@ -0,0 +1,109 @@
+"""add plain-text excerpt to posts
+
+Revision ID: c1e8a4f7b2d9
+Revises: b9d4f1a6e3c2
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+import re
+from html import escape, unescape
+from html.parser import HTMLParser
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c1e8a4f7b2d9'
+down_revision: Union[str, Sequence[str], None] = 'b9d4f1a6e3c2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+EXCERPT_LENGTH = 200
+BATCH_SIZE = 1000
+
+
+# Frozen copy of app.services.text.make_excerpt as of this revision: migrations
+# must keep producing the same data whatever the app code later becomes.
+_WHITESPACE = re.compile(r"\s+")
+_SKIP_TAGS = {"script", "style", "head", "title"}
+
+
+class _TextExtractor(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self._skip = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _SKIP_TAGS:
+            self._skip += 1
+        self.parts.append(" ")
+
+    def handle_endtag(self, tag):
+        if tag in _SKIP_TAGS and self._skip:
+            self._skip -= 1
+        self.parts.append(" ")
+
+    def handle_data(self, data):
+        if not self._skip:
+            self.parts.append(data)
+
+
+def _strip_html(html):
+    if not html:
+        return ""
+    parser = _TextExtractor()
+    try:
+        parser.feed(html)
+        parser.close()
+        text = "".join(parser.parts)
+    except Exception:
+        text = unescape(re.sub(r"<[^>]*>", " ", html))
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def make_excerpt(html, length):
+    text = _strip_html(html)
+    if len(escape(text)) <= length:
+        return escape(text)
+    used = 0
+    for end, char in enumerate(text):
+        used += len(escape(char))
+        if used > length - 1:
+            break
+    cut = text[:end]
+    if " " in cut:
+        cut = cut[:cut.rindex(" ")]
+    return escape(cut.rstrip(" ,;:.-")) + "…"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('posts', sa.Column('excerpt', sa.String(length=EXCERPT_LENGTH), nullable=True))
+
+    # the excerpt comes from the same HTML stripping as the app (frozen above), so backfill in Python
+    bind = op.get_bind()
+    posts = sa.table('posts', sa.column('id', sa.Integer), sa.column('description', sa.Text),
+                     sa.column('excerpt', sa.String))
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(posts.c.id, posts.c.description)
+            .where(posts.c.id > last_id, posts.c.description.isnot(None))
+            .order_by(posts.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        bind.execute(
+            posts.update().where(posts.c.id == sa.bindparam('pid')).values(excerpt=sa.bindparam('value')),
+            [{'pid': pid, 'value': make_excerpt(description, EXCERPT_LENGTH) or None} for pid, description in rows],
+        )
+        last_id = rows[-1][0]
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('posts', 'excerpt')
@@ -0,0 +1,45 @@
+"""create post_attachment_variants
+
+Revision ID: c4a9e2f7d610
+Revises: b81e5c0d2a47
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4a9e2f7d610'
+down_revision: Union[str, Sequence[str], None] = 'b81e5c0d2a47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'post_attachment_variants',
+        sa.Column('id', sa.Integer(), primary_key=True, nullable=False),
+        sa.Column('attachment_id', sa.Integer(), sa.ForeignKey('post_attachments.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('name', sa.String(length=50), nullable=False),
+        sa.Column('content_type', sa.String(length=120), nullable=False),
+        sa.Column('width', sa.Integer(), nullable=False),
+        sa.Column('height', sa.Integer(), nullable=False),
+        sa.Column('size', sa.Integer(), nullable=False),
+        sa.Column('storage_key', sa.String(length=255), nullable=False),
+        sa.Column('sha256', sa.String(length=64), nullable=False),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.func.now(), nullable=False),
+        sa.UniqueConstraint('attachment_id', 'name', name='uq_post_attachment_variants_attachment_name'),
+    )
+    op.create_index(op.f('ix_post_attachment_variants_id'), 'post_attachment_variants', ['id'], unique=False)
+    op.create_index(op.f('ix_post_attachment_variants_attachment_id'), 'post_attachment_variants', ['attachment_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_post_attachment_variants_attachment_id'), table_name='post_attachment_variants')
+    op.drop_index(op.f('ix_post_attachment_variants_id'), table_name='post_attachment_variants')
+    op.drop_table('post_attachment_variants')
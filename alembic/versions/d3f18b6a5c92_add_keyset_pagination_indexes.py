@@ -0,0 +1,31 @@
+"""add composite indexes for keyset pagination
+
+Revision ID: d3f18b6a5c92
+Revises: c4a9e2f7d610
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd3f18b6a5c92'
+down_revision: Union[str, Sequence[str], None] = 'c4a9e2f7d610'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_posts_created_at_id', 'posts', ['created_at', 'id'], unique=False)
+    op.create_index('ix_documents_name_id', 'documents', ['name', 'id'], unique=False)
+    op.create_index('ix_documents_updated_at_id', 'documents', ['updated_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_documents_updated_at_id', table_name='documents')
+    op.drop_index('ix_documents_name_id', table_name='documents')
+    op.drop_index('ix_posts_created_at_id', table_name='posts')
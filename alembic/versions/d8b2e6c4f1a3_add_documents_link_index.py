@@ -0,0 +1,29 @@
+"""index documents.link for bulk import upserts
+
+Revision ID: d8b2e6c4f1a3
+Revises: c1e8a4f7b2d9
+Create Date: 2026-10-18 19:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd8b2e6c4f1a3'
+down_revision: Union[str, Sequence[str], None] = 'c1e8a4f7b2d9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # not unique: existing libraries may already hold the same link twice, and
+    # bulk import updates every document carrying a matched link
+    op.create_index(op.f('ix_documents_link'), 'documents', ['link'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_documents_link'), table_name='documents')
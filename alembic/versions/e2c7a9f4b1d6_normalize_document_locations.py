@@ -0,0 +1,87 @@
+"""normalize document locations into a lookup table
+
+Revision ID: e2c7a9f4b1d6
+Revises: d8b2e6c4f1a3
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+import hashlib
+import re
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2c7a9f4b1d6'
+down_revision: Union[str, Sequence[str], None] = 'd8b2e6c4f1a3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+CODE_LENGTH = 64
+
+# Frozen copy of app.services.locations.canonical as of this revision: migrations
+# must keep producing the same codes whatever the app code later becomes.
+KNOWN_LOCATIONS = {
+    "IN": ("India", ("india", "in", "ind", "bharat")),
+    "US": ("USA", ("usa", "us", "u.s.", "u.s.a.", "united states", "united states of america", "america")),
+    "GB": ("UK", ("uk", "gb", "united kingdom", "great britain", "england", "britain")),
+}
+_ALIASES = {alias: code for code, (_, aliases) in KNOWN_LOCATIONS.items() for alias in aliases}
+_NON_CODE = re.compile(r"[\W_]+")
+_HASH_LENGTH = 8
+
+
+def canonical(value):
+    key = " ".join(value.split()).casefold()
+    code = _ALIASES.get(key)
+    if code:
+        return code, KNOWN_LOCATIONS[code][0]
+    code = _NON_CODE.sub("_", key.upper()).strip("_") or "UNKNOWN"
+    if len(code) > CODE_LENGTH:
+        digest = hashlib.sha256(code.encode()).hexdigest()[:_HASH_LENGTH].upper()
+        code = f"{code[:CODE_LENGTH - _HASH_LENGTH - 1]}_{digest}"
+    return code, " ".join(value.split())
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'locations',
+        sa.Column('code', sa.String(length=CODE_LENGTH), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('code'),
+    )
+    op.add_column('documents', sa.Column('location_code', sa.String(length=CODE_LENGTH), nullable=True))
+    op.create_foreign_key('fk_documents_location_code', 'documents', 'locations', ['location_code'], ['code'])
+
+    # canonicalize with the rules the app applies on write ("india ", "IN" -> India), frozen above
+    bind = op.get_bind()
+    documents = sa.table('documents', sa.column('location', sa.String), sa.column('location_code', sa.String))
+    locations = sa.table('locations', sa.column('code', sa.String), sa.column('name', sa.String))
+    values = [value for (value,) in bind.execute(sa.select(documents.c.location).distinct())]
+    resolved = {value: canonical(value) for value in values}
+    names = {}
+    for code, name in sorted(resolved.values()):
+        names.setdefault(code, name)  # first spelling wins for new codes
+    if names:
+        bind.execute(locations.insert(), [{'code': code, 'name': name} for code, name in names.items()])
+        bind.execute(
+            documents.update()
+            .where(documents.c.location == sa.bindparam('old'))
+            .values(location=sa.bindparam('name'), location_code=sa.bindparam('code')),
+            [{'old': value, 'code': code, 'name': names[code]} for value, (code, _) in resolved.items()],
+        )
+
+    op.create_index('ix_documents_location_code_name_id', 'documents', ['location_code', 'name', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # canonicalized location names are kept
+    op.drop_index('ix_documents_location_code_name_id', table_name='documents')
+    op.drop_constraint('fk_documents_location_code', 'documents', type_='foreignkey')
+    op.drop_column('documents', 'location_code')
+    op.drop_table('locations')
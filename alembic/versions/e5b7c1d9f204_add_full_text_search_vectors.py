@@ -0,0 +1,51 @@
+"""add generated tsvector columns and GIN indexes for full-text search
+
+Revision ID: e5b7c1d9f204
+Revises: d3f18b6a5c92
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5b7c1d9f204'
+down_revision: Union[str, Sequence[str], None] = 'd3f18b6a5c92'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+DOCUMENT_SEARCH_VECTOR = (
+    "setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(location, '')), 'C')"
+)
+POST_SEARCH_VECTOR = (
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', "
+    "regexp_replace(regexp_replace(coalesce(description, ''), '<[^>]*>', ' ', 'g'), "
+    "'&[#a-zA-Z0-9]+;', ' ', 'g')), 'B')"
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(
+        "ALTER TABLE documents ADD COLUMN search_vector tsvector "
+        f"GENERATED ALWAYS AS ({DOCUMENT_SEARCH_VECTOR}) STORED"
+    )
+    op.execute(
+        "ALTER TABLE posts ADD COLUMN search_vector tsvector "
+        f"GENERATED ALWAYS AS ({POST_SEARCH_VECTOR}) STORED"
+    )
+    op.create_index('ix_documents_search_vector', 'documents', ['search_vector'], postgresql_using='gin')
+    op.create_index('ix_posts_search_vector', 'posts', ['search_vector'], postgresql_using='gin')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_posts_search_vector', table_name='posts')
+    op.drop_index('ix_documents_search_vector', table_name='documents')
+    op.drop_column('posts', 'search_vector')
+    op.drop_column('documents', 'search_vector')
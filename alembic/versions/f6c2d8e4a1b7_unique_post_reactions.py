@@ -0,0 +1,41 @@
+"""make reactions unique per (post, user, reaction)
+
+Revision ID: f6c2d8e4a1b7
+Revises: e5b7c1d9f204
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f6c2d8e4a1b7'
+down_revision: Union[str, Sequence[str], None] = 'e5b7c1d9f204'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # reactions are stored lower-cased from now on; fold existing ones first so
+    # "Like" and "like" collapse into the same row
+    op.execute("UPDATE post_reactions SET reaction = LOWER(TRIM(reaction))")
+    # keep the earliest row of every duplicate group
+    op.execute(
+        "DELETE FROM post_reactions WHERE id NOT IN ("
+        "SELECT MIN(id) FROM post_reactions GROUP BY post_id, \"user\", reaction)"
+    )
+    op.execute(
+        "UPDATE posts SET reactions_count = "
+        "(SELECT COUNT(*) FROM post_reactions WHERE post_reactions.post_id = posts.id)"
+    )
+    op.create_unique_constraint(
+        'uq_post_reactions_post_user_reaction', 'post_reactions', ['post_id', 'user', 'reaction']
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('uq_post_reactions_post_user_reaction', 'post_reactions', type_='unique')
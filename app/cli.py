@@ -0,0 +1,116 @@
+"""
+Maintenance commands.
+
+Usage:
+    python -m app.cli bootstrap [--stamp]
+    python -m app.cli reconcile-counters
+    python -m app.cli generate-variants [--batch-size N]
+    python -m app.cli gc-blobs [--batch-size N] [--grace-seconds S]
+"""
+import argparse
+
+from app.database import SessionLocal
+
+
+def bootstrap(args):
+    """Create any missing tables for a fresh database (production schemas are managed by Alembic)."""
+    from app.database import Base, get_engine
+    import app.models.blob  # noqa: F401
+    import app.models.document  # noqa: F401
+    import app.models.post  # noqa: F401
+
+    Base.metadata.create_all(bind=get_engine())
+    print(f"{len(Base.metadata.tables)} table(s) present")
+    if args.stamp:
+        # the tables now match the newest migration, so mark the database as migrated
+        from alembic import command
+        from alembic.config import Config
+        from app.config import settings
+
+        alembic_cfg = Config(args.alembic_config)
+        alembic_cfg.set_main_option("sqlalchemy.url", settings.database_url.replace("%", "%%"))
+        command.stamp(alembic_cfg, "head")
+        print("stamped alembic revision head")
+
+
+def reconcile_counters(args):
+    """Recompute the per-post engagement counters from their source tables."""
+    from app.services.counters import reconcile
+
+    db = SessionLocal()
+    try:
+        fixed = reconcile(db)
+    finally:
+        db.close()
+    for counter, rows in fixed.items():
+        print(f"{counter}: {rows} post(s) repaired")
+
+
+def generate_variants(args):
+    """Render missing thumbnail/medium variants for existing image attachments."""
+    from sqlalchemy import select
+    from app.models.post import Attachment
+    from app.services.images import generate_variants as generate
+
+    db = SessionLocal()
+    try:
+        last_id, total = 0, 0
+        while True:
+            ids = db.scalars(
+                select(Attachment.id)
+                .where(Attachment.is_image.is_(True), Attachment.id > last_id)
+                .order_by(Attachment.id)
+                .limit(args.batch_size)
+            ).all()
+            if not ids:
+                break
+            total += generate(db, ids)
+            last_id = ids[-1]
+            print(f"processed attachments up to id {last_id}, {total} variant(s) created")
+    finally:
+        db.close()
+
+
+def gc_blobs(args):
+    """Delete stored attachment blobs that no attachment or variant references any more."""
+    from app.services.blob_refs import collect_garbage
+    from app.services.blob_store import get_blob_store
+
+    db = SessionLocal()
+    try:
+        deleted, freed = collect_garbage(db, get_blob_store(), batch_size=args.batch_size,
+                                         grace_seconds=args.grace_seconds)
+    finally:
+        db.close()
+    print(f"{deleted} blob(s) deleted, {freed} byte(s) freed")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Intranet API maintenance commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    cmd = commands.add_parser("bootstrap", help=bootstrap.__doc__)
+    cmd.add_argument("--stamp", action="store_true",
+                     help="also record the newest Alembic revision (only for a database created empty by this command)")
+    cmd.add_argument("--alembic-config", default="alembic.ini")
+    cmd.set_defaults(func=bootstrap)
+
+    cmd = commands.add_parser("reconcile-counters", help=reconcile_counters.__doc__)
+    cmd.set_defaults(func=reconcile_counters)
+
+    cmd = commands.add_parser("generate-variants", help=generate_variants.__doc__)
+    cmd.add_argument("--batch-size", type=int, default=100)
+    cmd.set_defaults(func=generate_variants)
+
+    cmd = commands.add_parser("gc-blobs", help=gc_blobs.__doc__)
+    cmd.add_argument("--batch-size", type=int, default=500)
+    cmd.add_argument("--grace-seconds", type=int, default=3600,
+                     help="only delete blobs unreferenced for at least this long")
+    cmd.set_defaults(func=gc_blobs)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
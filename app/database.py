@@ -1,18 +1,107 @@
-from sqlalchemy import create_engine
+import importlib
+import itertools
+import logging
+import math
+import sqlite3
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import TYPE_CHECKING, Dict, List, Optional, Union
+
+from fastapi import Request
+from fastapi.concurrency import contextmanager_in_threadpool
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import NullPool
+from starlette.concurrency import run_in_threadpool
 from app.config import settings
+from app.services.pool_metrics import InstrumentedAsyncQueuePool, InstrumentedQueuePool, instrument, pool_status
+from app.services.request_metrics import instrument_queries
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+@event.listens_for(Engine, "connect")
+def _register_sqlite_functions(dbapi_connection, connection_record):
+    """
+    SQLite stand-ins need strip_html() for the posts full-text index triggers,
+    and foreign keys switched on: the ON DELETE CASCADE that the models'
+    passive_deletes relationships rely on is off by default in SQLite.
+    """
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        from app.services.text import strip_html
+        dbapi_connection.create_function("strip_html", 1, strip_html, deterministic=True)
+        dbapi_connection.execute("PRAGMA foreign_keys=ON")
+    elif type(getattr(dbapi_connection, "driver_connection", None)).__module__.startswith("aiosqlite"):
+        from app.services.text import strip_html
+
+        async def setup(conn):
+            await conn.create_function("strip_html", 1, strip_html, deterministic=True)
+            await conn.execute("PRAGMA foreign_keys=ON")
+
+        dbapi_connection.run_async(setup)
+
+def pool_options(is_async: bool = False) -> dict:
+    """Engine keyword arguments for the configured pool (DB_POOL_* settings)."""
+    if settings.db_pool_mode == "null":
+        options = {"poolclass": NullPool}
+    elif settings.db_pool_mode == "queue":
+        options = {
+            "poolclass": InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool,
+            "pool_size": settings.db_pool_size,
+            "max_overflow": settings.db_max_overflow,
+            "pool_timeout": settings.db_pool_timeout,
+            "pool_recycle": settings.db_pool_recycle,
+        }
+    else:
+        raise ValueError(f"Unknown DB_POOL_MODE {settings.db_pool_mode!r}")
+    options["pool_pre_ping"] = settings.db_pool_pre_ping
+    if is_async and settings.db_pgbouncer and make_url(settings.database_url).get_backend_name() == "postgresql":
+        # transaction pooling hands each transaction a different server connection
+        options["connect_args"] = {"statement_cache_size": 0, "prepared_statement_cache_size": 0}
+    return options
+
+def _instrument(engine):
+    """Pool counters always; per-statement timing when METRICS_ENABLED."""
+    instrument(engine)
+    if settings.metrics_enabled:
+        instrument_queries(engine, settings.slow_query_ms)
+    return engine
+
+# Engines are built on first use, so importing the app (a worker boot or a
+# serverless cold start) neither loads the DBAPI driver nor connects. There is
+# one per URL and pool mode: two apps with different profiles can share a process.
+_engines = {}
 
-# Create database engine
-engine = create_engine(
-    settings.database_url,
-    echo=settings.debug,
-    pool_size=10,
-    max_overflow=20,
-)
+def _engine_key(url: str):
+    return url, settings.db_pool_mode
 
-# Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def get_engine() -> Engine:
+    key = _engine_key(settings.database_url)
+    engine = _engines.get(key)
+    if engine is None:
+        engine = _engines[key] = _instrument(create_engine(
+            settings.database_url,
+            echo=settings.debug,
+            **pool_options(),
+        ))
+    return engine
+
+def __getattr__(name):
+    # `from app.database import engine` keeps working, building the engine at that point
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+_session_factory = sessionmaker(autocommit=False, autoflush=False)
+
+def SessionLocal(**kwargs) -> Session:
+    """A new sync Session bound to the (lazily created) engine."""
+    return _session_factory(bind=get_engine(), **kwargs)
 
 # Create declarative base
 Base = declarative_base()
@@ -24,3 +113,274 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# Async engine, only built when DB_ASYNC is enabled (or explicitly requested)
+_ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+# (async engine, sessionmaker) per URL and pool mode, like the sync engines
+_async_engines = {}
+
+
+def async_database_url(url: str) -> str:
+    """Swap the sync DBAPI driver in `url` for its asyncio counterpart."""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in _ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for {backend!r} URLs")
+    return parsed.set(drivername=_ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+
+def get_async_sessionmaker():
+    key = _engine_key(settings.database_url)
+    if key not in _async_engines:
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+        async_engine = create_async_engine(
+            async_database_url(settings.database_url),
+            echo=settings.debug,
+            **pool_options(is_async=True),
+        )
+        _instrument(async_engine.sync_engine)
+        session_factory = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=True)
+        _async_engines[key] = (async_engine, session_factory)
+    return _async_engines[key][1]
+
+
+async def dispose_async_engine():
+    """Close pooled async connections (aiosqlite keeps a thread per connection)."""
+    while _async_engines:
+        _, (async_engine, _) = _async_engines.popitem()
+        await async_engine.dispose()
+    for replica in _replicas or []:
+        while replica.async_engines:
+            await replica.async_engines.popitem()[1].dispose()
+
+
+# Dependency to get an async database session
+async def get_async_db():
+    async with get_async_sessionmaker()() as db:
+        yield db
+
+
+# Either kind of session, depending on DB_ASYNC (the asyncio extension is only
+# imported once an async engine is built)
+DbSession = Union[Session, "AsyncSession"]
+
+# Dependency used by the routers: async sessions when DB_ASYNC is set, sync otherwise.
+# DB_ASYNC is read per request rather than at import, so it follows the app's
+# settings overrides (app.factory profiles) like every other setting.
+async def get_session():
+    if settings.db_async:
+        async with asynccontextmanager(get_async_db)() as db:
+            yield db
+    else:
+        async with contextmanager_in_threadpool(contextmanager(get_db)()) as db:
+            yield db
+
+
+# Read replicas (DATABASE_REPLICA_URLS). Read-only handlers take their session
+# from get_read_session, which picks a healthy replica in turn. It uses the
+# primary when there are none, when every replica is marked down, or when the
+# client wrote within DB_REPLICA_STICKY_SECONDS (READ_PRIMARY_COOKIE, set by
+# ReadYourWritesMiddleware), so a writer never reads from a replica that has
+# not caught up yet.
+READ_PRIMARY_COOKIE = "db_read_primary"
+
+
+class Replica:
+    """One replica URL, its engines (built on first use) and its health."""
+
+    def __init__(self, name: str, url: str):
+        self.name = name
+        self.url = url
+        # keyed like the primary's engines (_engine_key)
+        self.engines: Dict[tuple, Engine] = {}
+        self.async_engines: Dict[tuple, object] = {}
+        self.down_until = 0.0
+
+    def healthy(self) -> bool:
+        return time.monotonic() >= self.down_until
+
+    def mark_down(self, reason: str):
+        """Skip this replica for DB_REPLICA_RETRY_SECONDS."""
+        if self.healthy():
+            logger.warning("read replica %s is unavailable (%s); using the primary for %.0fs",
+                           self.name, reason, settings.db_replica_retry_seconds)
+        self.down_until = time.monotonic() + settings.db_replica_retry_seconds
+
+    def _watch(self, engine: Engine) -> Engine:
+        @event.listens_for(engine, "handle_error")
+        def _on_error(context):
+            if context.is_disconnect:
+                self.mark_down("connection lost")
+        return engine
+
+    def get_engine(self) -> Engine:
+        key = _engine_key(self.url)
+        if key not in self.engines:
+            self.engines[key] = self._watch(_instrument(create_engine(self.url, echo=settings.debug, **pool_options())))
+        return self.engines[key]
+
+    def get_async_engine(self):
+        key = _engine_key(self.url)
+        if key not in self.async_engines:
+            from sqlalchemy.ext.asyncio import create_async_engine
+            async_engine = create_async_engine(
+                async_database_url(self.url),
+                echo=settings.debug,
+                **pool_options(is_async=True),
+            )
+            self._watch(_instrument(async_engine.sync_engine))
+            self.async_engines[key] = async_engine
+        return self.async_engines[key]
+
+
+_replicas: Optional[List[Replica]] = None
+_rotation = itertools.count()
+
+
+def get_replicas() -> List[Replica]:
+    global _replicas
+    if _replicas is None:
+        _replicas = [Replica(f"replica{i}", url) for i, url in enumerate(settings.database_replica_urls)]
+    return _replicas
+
+
+def _next_healthy_replica() -> Optional[Replica]:
+    replicas = get_replicas()
+    for _ in range(len(replicas)):
+        replica = replicas[next(_rotation) % len(replicas)]
+        if replica.healthy():
+            return replica
+    return None
+
+
+def read_primary_until(sticky_seconds: int) -> int:
+    """READ_PRIMARY_COOKIE value for a write made now."""
+    return math.ceil(time.time() + sticky_seconds)
+
+
+def _read_replica(request: Request) -> Optional[Replica]:
+    """The replica to serve this read from, or None for the primary."""
+    if not settings.database_replica_urls:
+        return None
+    pinned = request.cookies.get(READ_PRIMARY_COOKIE, "")
+    if pinned.isdigit() and int(pinned) > time.time():
+        # handlers serving cached JSON rebuild it from the primary instead (ResponseCache.cached_json)
+        request.state.read_primary = True
+        return None
+    return _next_healthy_replica()
+
+
+def get_read_db(request: Request):
+    replica = _read_replica(request)
+    while replica is not None:
+        try:
+            connection = replica.get_engine().connect()
+            break
+        except DBAPIError as exc:
+            replica.mark_down(type(exc.orig).__name__)
+            replica = _next_healthy_replica()
+    else:
+        yield from get_db()
+        return
+    # ResponseCache.cached_json does not cache what a lagging replica returned right after a write
+    request.state.read_replica = True
+    db = _session_factory(bind=connection)
+    try:
+        yield db
+    finally:
+        db.close()
+        connection.close()
+
+
+async def get_async_read_db(request: Request):
+    replica = _read_replica(request)
+    while replica is not None:
+        try:
+            connection = await replica.get_async_engine().connect()
+            break
+        except DBAPIError as exc:
+            replica.mark_down(type(exc.orig).__name__)
+            replica = _next_healthy_replica()
+    else:
+        async with get_async_sessionmaker()() as db:
+            yield db
+        return
+    request.state.read_replica = True
+    from sqlalchemy.ext.asyncio import AsyncSession
+    try:
+        async with AsyncSession(bind=connection, autoflush=False, expire_on_commit=True) as db:
+            yield db
+    finally:
+        await connection.close()
+
+
+# Dependency for read-only handlers: a replica session when replicas are configured
+async def get_read_session(request: Request):
+    if settings.db_async:
+        async with asynccontextmanager(get_async_read_db)(request) as db:
+            yield db
+    else:
+        async with contextmanager_in_threadpool(contextmanager(get_read_db)(request)) as db:
+            yield db
+
+
+async def run_db(db: DbSession, fn, *args, **kwargs):
+    """
+    Run `fn(session, *args, **kwargs)`, written against the sync Session API,
+    without blocking the event loop.
+
+    With an AsyncSession the function runs through `run_sync`, so every query it
+    makes (lazy loads included) goes over the async driver. With a sync Session
+    it runs on the threadpool.
+    """
+    if not isinstance(db, Session):
+        return await db.run_sync(fn, *args, **kwargs)
+    return await run_in_threadpool(fn, db, *args, **kwargs)
+
+
+async def stream_rows(db: DbSession, stmt, chunk_size: int = 1000):
+    """
+    Yield the result of `stmt` as lists of row mappings, `chunk_size` at a time.
+
+    Rows come from a server-side cursor where the driver supports one
+    (psycopg2, asyncpg), so a large table is never held in memory at once.
+    """
+    if not isinstance(db, Session):
+        result = await db.stream(stmt.execution_options(yield_per=chunk_size))
+        async for chunk in result.mappings().partitions():
+            yield chunk
+        return
+    result = await run_in_threadpool(db.execute, stmt.execution_options(yield_per=chunk_size))
+    partitions = result.mappings().partitions()
+    while True:
+        chunk = await run_in_threadpool(next, partitions, None)
+        if chunk is None:
+            break
+        yield chunk
+
+
+_DIALECT_INSERTS = {"postgresql": "sqlalchemy.dialects.postgresql", "sqlite": "sqlalchemy.dialects.sqlite"}
+
+
+def dialect_insert(db: Session, table):
+    """INSERT construct for the session's database, with `on_conflict_do_*` available."""
+    return importlib.import_module(_DIALECT_INSERTS[db.get_bind().dialect.name]).insert(table)
+
+
+def database_pools() -> dict:
+    """Pool status of the engines this app's settings use that were built so far, for /health."""
+    pools = {}
+    key = _engine_key(settings.database_url)
+    if key in _engines:
+        pools["primary"] = pool_status(_engines[key])
+    if key in _async_engines:
+        pools["async"] = pool_status(_async_engines[key][0].sync_engine)
+    for replica in _replicas or []:
+        key = _engine_key(replica.url)
+        if key in replica.engines:
+            pools[replica.name] = pool_status(replica.engines[key])
+        if key in replica.async_engines:
+            pools[f"{replica.name}_async"] = pool_status(replica.async_engines[key].sync_engine)
+    return pools
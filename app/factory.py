@@ -0,0 +1,166 @@
+"""
+Application factory shared by both entry points.
+
+app/main.py (uvicorn workers) and api/main.py (the Vercel function) both call
+`create_app`, so middleware, CORS, routers, /health and shutdown hooks are
+defined once. The profile only changes what suits that kind of deployment:
+
+- "worker": a long-running process. It uses a pooled engine, background
+  flushers (view buffer, live feed LISTEN/NOTIFY) and fills the response
+  cache from CACHE_WARM_PATHS at startup.
+- "serverless": instances come and go and can be frozen between requests.
+  It uses NullPool, writes views directly instead of buffering them, and
+  keeps no LISTEN connection open. Nothing is warmed, and responses are not
+  cached: a per-instance memory cache would only see its own writes. Image
+  variants are not rendered after the response either, since a frozen
+  instance would never finish them; `python -m app.cli generate-variants`
+  backfills them.
+
+A profile changes settings only where their env var is unset (environment
+or .env), so an explicit DB_POOL_MODE, VIEW_BUFFER_ENABLED, ... still wins.
+APP_PROFILE overrides the profile chosen by the entry point. Neither profile
+runs DDL: tables come from `alembic upgrade head` (or `python -m app.cli
+bootstrap` for a development database).
+
+The global `settings` object is never modified. Each app reads it through
+its profile's values (app.config.override_settings) while it is built and,
+via SettingsOverrideMiddleware, for every request and lifespan event, so two
+apps imported into one process keep their own profiles. Engines and response
+caches are built per distinct setting, not once per process.
+"""
+import asyncio
+from typing import Dict, NamedTuple, Optional
+
+from fastapi import FastAPI
+from fastapi.middleware.cors import CORSMiddleware
+
+from app.config import is_configured, override_settings, settings
+
+VERSION = "1.0.0"
+
+
+class Profile(NamedTuple):
+    name: str
+    # Settings attribute -> value, applied unless the matching env var is set
+    settings: Dict[str, object]
+    warm_cache: bool
+
+
+PROFILES = {
+    "worker": Profile("worker", {"db_pool_mode": "queue"}, warm_cache=True),
+    "serverless": Profile(
+        "serverless",
+        {"db_pool_mode": "null", "view_buffer_enabled": False, "live_feed_pg_notify": False,
+         "cache_backend": "none", "image_variants_enabled": False},
+        warm_cache=False,
+    ),
+}
+
+
+def get_profile(name: str) -> Profile:
+    try:
+        return PROFILES[name]
+    except KeyError:
+        raise ValueError(f"Unknown APP_PROFILE {name!r}; expected one of {', '.join(PROFILES)}") from None
+
+
+def profile_overrides(profile: Profile) -> Dict[str, object]:
+    """The profile's values for settings whose env var is unset."""
+    return {attribute: value for attribute, value in profile.settings.items()
+            if not is_configured(attribute.upper())}
+
+
+def create_app(profile: Optional[str] = None) -> FastAPI:
+    """Build the API for `profile` ("worker" unless APP_PROFILE or the caller says otherwise)."""
+    from app.middleware import SettingsOverrideMiddleware
+
+    profile = get_profile(settings.app_profile or profile or "worker")
+    overrides = profile_overrides(profile)
+    with override_settings(overrides):
+        app = _build_app(profile)
+    # outermost, so every other middleware, handler and lifespan hook sees the profile
+    app.add_middleware(SettingsOverrideMiddleware, overrides=overrides)
+    return app
+
+
+def _build_app(profile: Profile) -> FastAPI:
+    from app.database import READ_PRIMARY_COOKIE, database_pools, dispose_async_engine
+    from app.middleware import BodySizeLimitMiddleware, ReadYourWritesMiddleware, RequestMetricsMiddleware
+    from app.routes import admin, documents, metrics, posts, search
+    from app.services import images, live_feed, view_buffer
+
+    app = FastAPI(
+        title=settings.app_name,
+        debug=settings.debug,
+        version=VERSION,
+        description="HR Policies Management API",
+    )
+    app.state.profile = profile.name
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=settings.allowed_origins,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["X-Next-Cursor"],
+    )
+    app.add_middleware(BodySizeLimitMiddleware, max_body_size=settings.max_request_size)
+    if settings.database_replica_urls:
+        app.add_middleware(ReadYourWritesMiddleware, sticky_seconds=settings.db_replica_sticky_seconds,
+                           cookie=READ_PRIMARY_COOKIE)
+    if settings.metrics_enabled:
+        # outermost, so rejected and failed requests are timed too
+        app.add_middleware(RequestMetricsMiddleware)
+
+    app.include_router(documents.router)
+    app.include_router(posts.router)
+    app.include_router(search.router)
+    app.include_router(admin.router)
+    if settings.metrics_enabled:
+        app.include_router(metrics.router)
+
+    warmers = set()
+
+    if profile.warm_cache and settings.cache_backend != "none" and settings.cache_warm_paths:
+        @app.on_event("startup")
+        async def _warm_cache():
+            from app.services.cache_warmer import warm
+
+            # in the background: the worker takes traffic while the cache fills
+            task = asyncio.get_running_loop().create_task(warm(app, settings.cache_warm_paths))
+            warmers.add(task)
+            task.add_done_callback(warmers.discard)
+
+    @app.on_event("shutdown")
+    async def _shutdown_workers():
+        for task in list(warmers):
+            task.cancel()
+        await view_buffer.shutdown()
+        await live_feed.shutdown()
+        images.shutdown()
+        await dispose_async_engine()
+
+    @app.get("/")
+    def read_root():
+        """Root endpoint"""
+        return {
+            "message": "Welcome to Intranet API",
+            "app_name": settings.app_name,
+            "version": VERSION,
+            "profile": profile.name,
+            "docs": "/docs",
+            "redoc": "/redoc",
+        }
+
+    @app.get("/health")
+    def health_check():
+        """Health check endpoint"""
+        return {
+            "status": "healthy",
+            "app_name": settings.app_name,
+            "profile": profile.name,
+            "database": database_pools(),
+        }
+
+    return app
@@ -1,52 +1,10 @@
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
 from app.config import settings
-from app.database import Base, engine
-from app.routes import documents
-from app.routes import posts
+from app.factory import create_app
 
-# Create all database tables
-Base.metadata.create_all(bind=engine)
-
-# Create FastAPI app
-app = FastAPI(
-    title=settings.app_name,
-    debug=settings.debug,
-    version="1.0.0",
-    description="HR Policies Management API"
-)
-
-# Add CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Include routes
-app.include_router(documents.router)
-app.include_router(posts.router)
-
-@app.get("/")
-def read_root():
-    """Root endpoint"""
-    return {
-        "message": "Welcome to Intranet API",
-        "app_name": settings.app_name,
-        "version": "1.0.0",
-        "docs": "/docs",
-        "redoc": "/redoc"
-    }
-
-@app.get("/health")
-def health_check():
-    """Health check endpoint"""
-    return {
-        "status": "healthy",
-        "app_name": settings.app_name
-    }
+# Long-running uvicorn workers. Everything shared with the Vercel entry point
+# (api/main.py) lives in app/factory.py; importing the app does not touch the
+# database, tables come from `alembic upgrade head` or `python -m app.cli bootstrap`
+app = create_app("worker")
 
 if __name__ == "__main__":
     import uvicorn
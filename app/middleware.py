@@ -0,0 +1,163 @@
+"""
+ASGI middleware shared by both entry points (app/main.py and api/main.py).
+"""
+import time
+
+from fastapi import HTTPException, status
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import override_settings
+from app.database import read_primary_until
+from app.services import request_metrics
+
+
+class SettingsOverrideMiddleware:
+    """Serve every request and lifespan event with an app's own settings values (see app.factory)."""
+
+    def __init__(self, app: ASGIApp, overrides: dict):
+        self.app = app
+        self.overrides = overrides
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        with override_settings(self.overrides):
+            await self.app(scope, receive, send)
+
+
+class RequestTooLarge(HTTPException):
+    def __init__(self, limit: int):
+        super().__init__(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Request body exceeds the {limit} byte limit",
+        )
+
+
+class BodySizeLimitMiddleware:
+    """
+    Reject request bodies larger than `max_body_size` bytes with 413.
+
+    A Content-Length over the limit is refused before any of the body is read.
+    Chunked or under-declared bodies are counted as they stream in, and
+    reading stops at the first chunk past the limit. RequestTooLarge is an
+    HTTPException, so FastAPI's body/form parsing re-raises it as is instead
+    of turning it into a 400.
+    """
+
+    def __init__(self, app: ASGIApp, max_body_size: int):
+        self.app = app
+        self.max_body_size = max_body_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        declared = Headers(scope=scope).get("content-length")
+        if declared is not None and declared.isdigit() and int(declared) > self.max_body_size:
+            exc = RequestTooLarge(self.max_body_size)
+            response = JSONResponse({"detail": exc.detail}, status_code=exc.status_code)
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body_size:
+                    raise RequestTooLarge(self.max_body_size)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+class RequestMetricsMiddleware:
+    """
+    Time each request and count its SQL statements (app.services.request_metrics).
+
+    Adds a `Server-Timing` header (`app` = time to response start, `db` = SQL
+    time and statement count so far) and records the full duration, up to the
+    last body chunk, in the per-route histograms served by /metrics. Routes
+    are labelled by their path template, and unmatched paths share one label,
+    so the number of series stays bounded.
+    """
+
+    UNMATCHED = "<unmatched>"
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self._route_paths = None
+
+    def _route(self, scope: Scope) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return self.UNMATCHED
+        if self._route_paths is None:
+            self._route_paths = {
+                route.endpoint: route.path
+                for route in scope["app"].routes if getattr(route, "endpoint", None) is not None
+            }
+        return self._route_paths.get(endpoint, self.UNMATCHED)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        stats, token = request_metrics.begin_request()
+        status_code = 500
+
+        async def timed_send(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", request_metrics.server_timing(time.perf_counter() - start, stats))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, timed_send)
+        finally:
+            request_metrics.end_request(token)
+            request_metrics.registry.record_request(
+                scope["method"], self._route(scope), status_code, time.perf_counter() - start, stats)
+
+
+class ReadYourWritesMiddleware:
+    """
+    Keep a client's reads on the primary for a while after it writes.
+
+    A successful unsafe request (POST, PUT, PATCH, DELETE) sets `cookie` to
+    the time until which get_read_session (app.database) bypasses the read
+    replicas for this client, `sticky_seconds` from now. Replicas usually
+    catch up well within that.
+    """
+
+    SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+    def __init__(self, app: ASGIApp, sticky_seconds: int, cookie: str):
+        self.app = app
+        self.sticky_seconds = sticky_seconds
+        self.cookie = cookie
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] in self.SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+        # the frontend is served from another site, which needs SameSite=None (and so Secure);
+        # behind a TLS-terminating proxy the scheme only shows in X-Forwarded-Proto
+        forwarded = Headers(scope=scope).get("x-forwarded-proto", "").split(",")[0].strip()
+        same_site = "None; Secure" if "https" in (scope["scheme"], forwarded) else "Lax"
+
+        async def pinning_send(message: Message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                until = read_primary_until(self.sticky_seconds)
+                MutableHeaders(scope=message).append(
+                    "Set-Cookie",
+                    f"{self.cookie}={until}; Max-Age={self.sticky_seconds}; Path=/; HttpOnly; SameSite={same_site}",
+                )
+            await send(message)
+
+        await self.app(scope, receive, pinning_send)
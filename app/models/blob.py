@@ -0,0 +1,24 @@
+from sqlalchemy import BigInteger, Column, DateTime, Integer, String
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class Blob(Base):
+    """
+    One stored object in the blob store, keyed by its SHA-256.
+
+    `ref_count` is the number of attachment and variant rows pointing at it.
+    When it drops to zero `released_at` is set, and `python -m app.cli gc-blobs`
+    deletes the object once it has been unreferenced for longer than the grace
+    period.
+    """
+    __tablename__ = "blobs"
+
+    key = Column(String(64), primary_key=True)
+    size = Column(BigInteger, nullable=False)
+    ref_count = Column(Integer, nullable=False, default=0, server_default="0")
+    created_at = Column(DateTime, nullable=False, server_default=func.now())
+    released_at = Column(DateTime, nullable=True, index=True)
+
+    def __repr__(self):
+        return f"<Blob(key={self.key}, size={self.size}, ref_count={self.ref_count})>"
@@ -1,19 +1,61 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Index, DDL, event
 from sqlalchemy.sql import func
 from app.database import Base
+from app.models.location import Location  # noqa: F401  (FK target must share the metadata)
 from datetime import datetime
 
 class Document(Base):
     __tablename__ = "documents"
+    __table_args__ = (
+        # keyset pagination for the two supported sort orders
+        Index("ix_documents_name_id", "name", "id"),
+        Index("ix_documents_updated_at_id", "updated_at", "id"),
+        # location filter + default sort
+        Index("ix_documents_location_code_name_id", "location_code", "name", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(255), nullable=False, index=True)
     description = Column(Text, nullable=True)
     location = Column(String(100), nullable=False, index=True, default='India') # Added location field
+    location_code = Column(String(64), ForeignKey("locations.code", name="fk_documents_location_code"), nullable=True)  # canonical, see app.services.locations
     last_updated = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
-    link = Column(String(500), nullable=False)  # SharePoint link
+    link = Column(String(500), nullable=False, index=True)  # SharePoint link; bulk import matches on it
     created_at = Column(DateTime, nullable=False, server_default=func.now())
     updated_at = Column(DateTime, nullable=False, server_default=func.now(), onupdate=func.now())
 
     def __repr__(self):
         return f"<Document(id={self.id}, name={self.name}, link={self.link})>"
+
+
+# Full-text search. The search vector is a generated column maintained by Postgres
+# (see migration e5b7c1d9f204); SQLite deployments get an FTS5 table kept in
+# step by triggers instead. Neither is mapped on the model.
+DOCUMENT_SEARCH_VECTOR_SQL = (
+    "setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(location, '')), 'C')"
+)
+
+for statement in (
+    f"ALTER TABLE documents ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ({DOCUMENT_SEARCH_VECTOR_SQL}) STORED",
+    "CREATE INDEX ix_documents_search_vector ON documents USING gin (search_vector)",
+):
+    event.listen(Document.__table__, "after_create", DDL(statement).execute_if(dialect="postgresql"))
+
+for statement in (
+    "CREATE VIRTUAL TABLE documents_fts USING fts5(title, body)",
+    """CREATE TRIGGER documents_fts_insert AFTER INSERT ON documents BEGIN
+        INSERT INTO documents_fts(rowid, title, body)
+        VALUES (new.id, new.name, coalesce(new.description, '') || ' ' || new.location);
+    END""",
+    """CREATE TRIGGER documents_fts_update AFTER UPDATE OF name, description, location ON documents BEGIN
+        DELETE FROM documents_fts WHERE rowid = old.id;
+        INSERT INTO documents_fts(rowid, title, body)
+        VALUES (new.id, new.name, coalesce(new.description, '') || ' ' || new.location);
+    END""",
+    """CREATE TRIGGER documents_fts_delete AFTER DELETE ON documents BEGIN
+        DELETE FROM documents_fts WHERE rowid = old.id;
+    END""",
+):
+    event.listen(Document.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
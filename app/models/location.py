@@ -0,0 +1,15 @@
+from sqlalchemy import Column, DateTime, String
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class Location(Base):
+    """Canonical document location; see app.services.locations for how input maps to a code."""
+    __tablename__ = "locations"
+
+    code = Column(String(64), primary_key=True)
+    name = Column(String(100), nullable=False)
+    created_at = Column(DateTime, nullable=False, server_default=func.now())
+
+    def __repr__(self):
+        return f"<Location(code={self.code}, name={self.name})>"
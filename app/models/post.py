@@ -1,26 +1,53 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, LargeBinary, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, LargeBinary, Boolean, UniqueConstraint, Index, DDL, event, inspect
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.database import Base
+from app.services.text import make_excerpt
+
+# length of the plain-text preview served by the summary feed
+EXCERPT_LENGTH = 200
 
 
 class Post(Base):
     __tablename__ = "posts"
+    __table_args__ = (
+        Index("ix_posts_created_at_id", "created_at", "id"),  # feed keyset pagination
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(255), nullable=False)
     description = Column(Text, nullable=True)  # HTML description
+    excerpt = Column(String(EXCERPT_LENGTH), nullable=True)  # HTML-escaped plain-text preview of description, set on flush
     author = Column(String(200), nullable=False, index=True)
     announce_type = Column(String(50), nullable=True)
     created_at = Column(DateTime, nullable=False, server_default=func.now())
     updated_at = Column(DateTime, nullable=False, server_default=func.now(), onupdate=func.now())
 
+    # engagement counters, kept in step with the child tables by app.services.counters
+    views_count = Column(Integer, nullable=False, default=0, server_default="0")
+    replies_count = Column(Integer, nullable=False, default=0, server_default="0")
+    shares_count = Column(Integer, nullable=False, default=0, server_default="0")
+    reactions_count = Column(Integer, nullable=False, default=0, server_default="0")
+
     # relationships
+    # engagement rows are removed by the ON DELETE CASCADE foreign keys rather than
+    # being loaded into the session when a post is deleted
     attachments = relationship("Attachment", back_populates="post", cascade="all, delete-orphan")
-    reactions = relationship("Reaction", back_populates="post", cascade="all, delete-orphan")
-    views = relationship("PostView", back_populates="post", cascade="all, delete-orphan")
-    replies = relationship("Reply", back_populates="post", cascade="all, delete-orphan")
-    shares = relationship("Share", back_populates="post", cascade="all, delete-orphan")
+    reactions = relationship("Reaction", back_populates="post", cascade="all, delete-orphan", passive_deletes=True)
+    views = relationship("PostView", back_populates="post", cascade="all, delete-orphan", passive_deletes=True)
+    replies = relationship("Reply", back_populates="post", cascade="all, delete-orphan", passive_deletes=True)
+    shares = relationship("Share", back_populates="post", cascade="all, delete-orphan", passive_deletes=True)
+
+
+@event.listens_for(Post, "before_insert")
+def _set_excerpt(mapper, connection, target):
+    target.excerpt = make_excerpt(target.description, EXCERPT_LENGTH) or None
+
+
+@event.listens_for(Post, "before_update")
+def _refresh_excerpt(mapper, connection, target):
+    if inspect(target).attrs.description.history.has_changes():
+        _set_excerpt(mapper, connection, target)
 
 
 class Attachment(Base):
@@ -32,14 +59,38 @@ class Attachment(Base):
     content_type = Column(String(120), nullable=False)
     size = Column(Integer, nullable=False)
     is_image = Column(Boolean, default=False)
-    data = Column(LargeBinary, nullable=False)
+    storage_key = Column(String(255), nullable=True)  # key in the configured BlobStore
+    sha256 = Column(String(64), nullable=True, index=True)
+    data = Column(LargeBinary, nullable=True)  # legacy inline bytes, only for rows not yet moved to the blob store
     created_at = Column(DateTime, nullable=False, server_default=func.now())
 
     post = relationship("Post", back_populates="attachments")
+    variants = relationship("AttachmentVariant", back_populates="attachment", cascade="all, delete-orphan", passive_deletes=True)
+
+
+class AttachmentVariant(Base):
+    __tablename__ = "post_attachment_variants"
+    __table_args__ = (UniqueConstraint("attachment_id", "name", name="uq_post_attachment_variants_attachment_name"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    attachment_id = Column(Integer, ForeignKey("post_attachments.id", ondelete="CASCADE"), nullable=False, index=True)
+    name = Column(String(50), nullable=False)  # thumb, medium, ...
+    content_type = Column(String(120), nullable=False)
+    width = Column(Integer, nullable=False)
+    height = Column(Integer, nullable=False)
+    size = Column(Integer, nullable=False)
+    storage_key = Column(String(255), nullable=False)
+    sha256 = Column(String(64), nullable=False)
+    created_at = Column(DateTime, nullable=False, server_default=func.now())
+
+    attachment = relationship("Attachment", back_populates="variants")
 
 
 class Reaction(Base):
     __tablename__ = "post_reactions"
+    __table_args__ = (
+        UniqueConstraint("post_id", "user", "reaction", name="uq_post_reactions_post_user_reaction"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     post_id = Column(Integer, ForeignKey("posts.id", ondelete="CASCADE"), nullable=False, index=True)
@@ -63,6 +114,7 @@ class PostView(Base):
 
 class Reply(Base):
     __tablename__ = "post_replies"
+    __table_args__ = (Index("ix_post_replies_post_id_created_at_id", "post_id", "created_at", "id"),)
 
     id = Column(Integer, primary_key=True, index=True)
     post_id = Column(Integer, ForeignKey("posts.id", ondelete="CASCADE"), nullable=False, index=True)
@@ -83,3 +135,37 @@ class Share(Base):
     created_at = Column(DateTime, nullable=False, server_default=func.now())
 
     post = relationship("Post", back_populates="shares")
+
+
+# Full-text search, see app/models/document.py. HTML tags and entities are
+# stripped from the description before it is indexed: by regexp_replace on
+# Postgres and by the strip_html() SQL function registered on SQLite connections.
+POST_BODY_TEXT_SQL = (
+    "regexp_replace(regexp_replace(coalesce(description, ''), '<[^>]*>', ' ', 'g'), "
+    "'&[#a-zA-Z0-9]+;', ' ', 'g')"
+)
+POST_SEARCH_VECTOR_SQL = (
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    f"setweight(to_tsvector('english', {POST_BODY_TEXT_SQL}), 'B')"
+)
+
+for statement in (
+    f"ALTER TABLE posts ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ({POST_SEARCH_VECTOR_SQL}) STORED",
+    "CREATE INDEX ix_posts_search_vector ON posts USING gin (search_vector)",
+):
+    event.listen(Post.__table__, "after_create", DDL(statement).execute_if(dialect="postgresql"))
+
+for statement in (
+    "CREATE VIRTUAL TABLE posts_fts USING fts5(title, body)",
+    """CREATE TRIGGER posts_fts_insert AFTER INSERT ON posts BEGIN
+        INSERT INTO posts_fts(rowid, title, body) VALUES (new.id, new.title, strip_html(new.description));
+    END""",
+    """CREATE TRIGGER posts_fts_update AFTER UPDATE OF title, description ON posts BEGIN
+        DELETE FROM posts_fts WHERE rowid = old.id;
+        INSERT INTO posts_fts(rowid, title, body) VALUES (new.id, new.title, strip_html(new.description));
+    END""",
+    """CREATE TRIGGER posts_fts_delete AFTER DELETE ON posts BEGIN
+        DELETE FROM posts_fts WHERE rowid = old.id;
+    END""",
+):
+    event.listen(Post.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
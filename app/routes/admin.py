@@ -0,0 +1,23 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+from app.database import DbSession, get_session, run_db
+from app.schemas.admin import StorageStats
+from app.services.blob_refs import storage_stats
+
+router = APIRouter(prefix="/api/admin", tags=["admin"])
+
+
+@router.get("/storage", response_model=StorageStats)
+async def get_storage_stats(db: DbSession = Depends(get_session)):
+    """
+    Attachment storage usage.
+
+    - **logical_bytes**: what storing every attachment and variant separately would take
+    - **stored_bytes**: what the deduplicated blob store actually holds
+    - **dedup_ratio**: logical_bytes / stored_bytes
+    - **garbage_blobs / garbage_bytes**: unreferenced blobs waiting for `gc-blobs`
+    """
+    def fetch(db: Session):
+        return StorageStats(**storage_stats(db))
+
+    return await run_db(db, fetch)
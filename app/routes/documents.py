@@ -1,16 +1,39 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
-from app.database import get_db
+from app.config import settings
+from app.database import DbSession, get_read_session, get_session, run_db, stream_rows
 from app.models.document import Document
-from app.schemas.document import DocumentCreate, DocumentUpdate, DocumentResponse, DocumentListResponse
-from typing import List
+from app.schemas.document import DEFAULT_LOCATION, DocumentCreate, DocumentUpdate, DocumentResponse, DocumentListResponse
+from app.schemas.document import BulkImportResponse, LocationFacetsResponse
+from app.services import document_io, locations
+from app.services.cache import get_response_cache
+from app.services.pagination import InvalidCursor, after, count_rows, decode_cursor, encode_cursor
+from sqlalchemy import select
+from typing import List, Optional
 
 router = APIRouter(prefix="/api/documents", tags=["documents"])
 
+def _get_or_404(db: Session, document_id: int) -> Document:
+    db_document = db.query(Document).filter(Document.id == document_id).first()
+    if not db_document:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Document with id {document_id} not found"
+        )
+    return db_document
+
+def _resolve_location(db: Session, value: str):
+    try:
+        return locations.resolve_location(db, value)
+    except locations.LocationConflict as exc:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc))
+
 @router.post("/", response_model=DocumentResponse, status_code=status.HTTP_201_CREATED)
-def create_document(
+async def create_document(
     document: DocumentCreate,
-    db: Session = Depends(get_db)
+    db: DbSession = Depends(get_session)
 ):
     """
     Create a new HR policy document
@@ -18,113 +41,248 @@ def create_document(
     - **name**: Document name (required)
     - **description**: Document description (optional)
     - **link**: SharePoint link to the document (required)
+    - **location**: Stored in canonical form ("india", "IN" -> "India")
     """
-    db_document = Document(**document.dict())
-    db.add(db_document)
-    db.commit()
-    db.refresh(db_document)
-    return db_document
+    def create(db: Session):
+        data = document.dict()
+        data["location_code"], data["location"] = _resolve_location(db, data["location"])
+        db_document = Document(**data)
+        db.add(db_document)
+        db.commit()
+        db.refresh(db_document)
+        return DocumentResponse.from_orm(db_document)
+
+    response = await run_db(db, create)
+    await get_response_cache().invalidate("documents")
+    return response
+
+# sort name -> (cursor kind, key columns, descending)
+DOCUMENT_SORTS = {
+    "name": ("name", (Document.name, Document.id), False),
+    "updated": ("updated", (Document.updated_at, Document.id), True),
+}
+
+# columns in DocumentResponse field order, for the plain-dict path
+DOCUMENT_COLUMNS = [getattr(Document, name) for name in DocumentResponse.__fields__]
+
+def _list_documents(db: Session, skip: int, limit: int, location: Optional[List[str]],
+                    cursor: Optional[str], sort: str, count: str, plain: bool = False):
+    """
+    One page of documents as a DocumentListResponse, or with `plain` as a dict
+    built directly from result rows (same JSON, no per-row models).
+    """
+    kind, key_columns, descending = DOCUMENT_SORTS[sort]
+    query = select(*DOCUMENT_COLUMNS) if plain else select(Document)
+    if location:
+        query = query.where(Document.location_code.in_(locations.codes_for(location)))
+
+    total = count_rows(db, query, count)
+
+    query = query.order_by(*[c.desc() if descending else c.asc() for c in key_columns])
+    if cursor:
+        values = decode_cursor(cursor, kind, [c.type.python_type for c in key_columns])
+        query = query.where(after(key_columns, values, descending=descending))
+    else:
+        query = query.offset(skip)
+    if plain:
+        documents = [dict(row) for row in db.execute(query.limit(limit + 1)).mappings()]
+    else:
+        documents = db.scalars(query.limit(limit + 1)).all()
+
+    next_cursor = None
+    if len(documents) > limit:
+        documents = documents[:limit]
+        last = documents[-1]
+        next_cursor = encode_cursor(kind, *[last[c.key] if plain else getattr(last, c.key) for c in key_columns])
+
+    if plain:
+        return {"total": total, "documents": documents, "next_cursor": next_cursor}
+    # Convert ORM objects to Pydantic models to satisfy response_model validation
+    docs_out = [DocumentResponse.from_orm(d) for d in documents]
+    return DocumentListResponse(total=total, documents=docs_out, next_cursor=next_cursor)
 
 @router.get("/", response_model=DocumentListResponse)
-def get_documents(
+async def get_documents(
+    request: Request,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
-    location: str = Query(None, description="Filter documents by location"),
-    db: Session = Depends(get_db)
+    location: Optional[List[str]] = Query(None, description="Filter documents by location; repeat or comma-separate for several"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page's next_cursor"),
+    sort: str = Query("name", regex="^(name|updated)$", description="Sort by name (A-Z) or most recently updated"),
+    count: Optional[str] = Query(None, regex="^(exact|estimate|none)$", description="How to compute total (default: exact without cursor, none with)"),
+    db: DbSession = Depends(get_read_session)
 ):
     """
     Get all HR policy documents with pagination and optional location filter
     
-    - **skip**: Number of documents to skip (default: 0)
+    - **skip**: Number of documents to skip (default: 0, ignored with a cursor)
     - **limit**: Maximum number of documents to return (default: 100, max: 1000)
-    - **location**: Location to filter documents by (e.g., "India", "USA")
+    - **location**: Location(s) to filter documents by (e.g., "India", "USA"; exact match after canonicalization)
+    - **cursor**: Continue after the last document of a previous page (keyset pagination)
+    - **sort**: `name` or `updated`
+    - **count**: `exact`, `estimate` or `none`
     """
-    query = db.query(Document)
-    if location:
-        query = query.filter(Document.location.ilike(f"%{location}%"))
-    
-    total = query.count()
-    documents = query.offset(skip).limit(limit).all()
+    async def build():
+        try:
+            return await run_db(db, _list_documents, skip, limit, location, cursor, sort,
+                                count or ("none" if cursor else "exact"), settings.fast_json)
+        except InvalidCursor as exc:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
 
-    # Convert ORM objects to Pydantic models to satisfy response_model validation
-    from app.schemas.document import DocumentListResponse, DocumentResponse
+    return await get_response_cache().cached_json(request, ["documents"], build)
 
-    docs_out = [DocumentResponse.from_orm(d) for d in documents]
-    return DocumentListResponse(total=total, documents=docs_out)
+def _location_facets(db: Session):
+    return LocationFacetsResponse(locations=locations.location_facets(db))
+
+@router.get("/facets", response_model=LocationFacetsResponse)
+async def get_document_facets(
+    request: Request,
+    db: DbSession = Depends(get_read_session)
+):
+    """
+    Number of HR policy documents per location (cached; refreshed on any document write)
+    """
+    return await get_response_cache().cached_json(
+        request, ["documents"], lambda: run_db(db, _location_facets))
+
+@router.post("/bulk", response_model=BulkImportResponse)
+async def import_documents(
+    request: Request,
+    format: Optional[str] = Query(None, regex="^(csv|ndjson)$", description="Defaults to the Content-Type"),
+    db: DbSession = Depends(get_session)
+):
+    """
+    Create or update many HR policy documents from an NDJSON or CSV body
+
+    - One JSON object per line (`application/x-ndjson`), or CSV with a header
+      row (`text/csv`) naming `name`, `description`, `link`, `location`
+    - Rows are matched on **link**: an existing link updates that document,
+      replacing every field (omitted ones fall back to their defaults)
+    - Rows are committed in batches; invalid rows are reported by line number
+      and skipped
+    """
+    try:
+        fmt = document_io.import_format(request.headers.get("content-type"), format)
+    except document_io.ImportFormatError as exc:
+        raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail=str(exc))
+
+    report = document_io.ImportReport()
+    async for batch in document_io.validated_batches(request.stream(), fmt, report):
+        try:
+            inserted, ids = await run_db(db, document_io.upsert_documents, [row for _, row in batch])
+        except (SQLAlchemyError, locations.LocationConflict) as exc:
+            await run_db(db, lambda session: session.rollback())
+            reason = str(exc) if isinstance(exc, locations.LocationConflict) else exc.__class__.__name__
+            for line, _ in batch:
+                report.add_error(line, [f"batch not saved: {reason}"])
+            continue
+        report.created += inserted
+        report.updated_ids.extend(ids)
+
+    if report.created or report.updated_ids:
+        await get_response_cache().invalidate("documents", *[f"document:{i}" for i in report.updated_ids])
+    return BulkImportResponse(
+        created=report.created,
+        updated=len(report.updated_ids),
+        failed=report.failed,
+        errors=sorted(report.errors, key=lambda e: e["line"]),
+    )
+
+@router.get("/export", responses={200: {"content": {"application/x-ndjson": {}, "text/csv": {}}}})
+async def export_documents(
+    format: str = Query("ndjson", regex="^(csv|ndjson)$"),
+    db: DbSession = Depends(get_read_session)
+):
+    """
+    Stream every HR policy document as NDJSON or CSV (read through a server-side cursor)
+    """
+    async def body():
+        first = True
+        async for rows in stream_rows(db, document_io.export_query(), document_io.EXPORT_CHUNK_SIZE):
+            if format == "csv":
+                yield document_io.csv_chunk(rows, header=first)
+            else:
+                yield document_io.ndjson_chunk(rows)
+            first = False
+        if first and format == "csv":
+            yield document_io.csv_chunk([], header=True)
+
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(body(), media_type=media_type, headers={
+        "Content-Disposition": f'attachment; filename="documents.{"csv" if format == "csv" else "ndjson"}"'
+    })
 
 @router.get("/{document_id}", response_model=DocumentResponse)
-def get_document(
+async def get_document(
     document_id: int,
-    db: Session = Depends(get_db)
+    request: Request,
+    db: DbSession = Depends(get_read_session)
 ):
     """
     Get a specific HR policy document by ID
     """
-    db_document = db.query(Document).filter(Document.id == document_id).first()
-    if not db_document:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Document with id {document_id} not found"
-        )
-    return db_document
+    def fetch(db: Session):
+        return DocumentResponse.from_orm(_get_or_404(db, document_id))
+
+    return await get_response_cache().cached_json(
+        request, [f"document:{document_id}"], lambda: run_db(db, fetch))
 
 @router.put("/{document_id}", response_model=DocumentResponse)
-def update_document(
+async def update_document(
     document_id: int,
     document_update: DocumentUpdate,
-    db: Session = Depends(get_db)
+    db: DbSession = Depends(get_session)
 ):
     """
     Update an HR policy document
+
+    - A `location` of null (or only whitespace) clears it back to the default
     """
-    db_document = db.query(Document).filter(Document.id == document_id).first()
-    if not db_document:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Document with id {document_id} not found"
-        )
-    
-    update_data = document_update.dict(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(db_document, field, value)
-    
-    db.add(db_document)
-    db.commit()
-    db.refresh(db_document)
-    return db_document
+    def update(db: Session):
+        db_document = _get_or_404(db, document_id)
+
+        update_data = document_update.dict(exclude_unset=True)
+        if "location" in update_data:
+            # resolved whenever it is sent, so location_code never keeps a cleared value
+            location = (update_data["location"] or "").strip() or DEFAULT_LOCATION
+            update_data["location_code"], update_data["location"] = _resolve_location(db, location)
+        for field, value in update_data.items():
+            setattr(db_document, field, value)
+
+        db.add(db_document)
+        db.commit()
+        db.refresh(db_document)
+        return DocumentResponse.from_orm(db_document)
+
+    response = await run_db(db, update)
+    await get_response_cache().invalidate("documents", f"document:{document_id}")
+    return response
 
 @router.delete("/{document_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_document(
+async def delete_document(
     document_id: int,
-    db: Session = Depends(get_db)
+    db: DbSession = Depends(get_session)
 ):
     """
     Delete an HR policy document
     """
-    db_document = db.query(Document).filter(Document.id == document_id).first()
-    if not db_document:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Document with id {document_id} not found"
-        )
-    
-    db.delete(db_document)
-    db.commit()
+    def delete(db: Session):
+        db.delete(_get_or_404(db, document_id))
+        db.commit()
+
+    await run_db(db, delete)
+    await get_response_cache().invalidate("documents", f"document:{document_id}")
     return None
 
 @router.get("/{document_id}/link")
-def get_document_link(
+async def get_document_link(
     document_id: int,
-    db: Session = Depends(get_db)
+    db: DbSession = Depends(get_read_session)
 ):
     """
     Get the SharePoint link for a document (for viewing)
     """
-    db_document = db.query(Document).filter(Document.id == document_id).first()
-    if not db_document:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Document with id {document_id} not found"
-        )
-    
-    return {"link": db_document.link}
+    def fetch(db: Session):
+        return {"link": _get_or_404(db, document_id).link}
+
+    return await run_db(db, fetch)
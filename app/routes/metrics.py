@@ -0,0 +1,13 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from app.database import database_pools
+from app.services.request_metrics import render_prometheus
+
+router = APIRouter(tags=["metrics"])
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def get_metrics():
+    """
+    Request latency, SQL and connection pool metrics in Prometheus text format
+    """
+    return PlainTextResponse(render_prometheus(database_pools()), media_type="text/plain; version=0.0.4")
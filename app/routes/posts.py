@@ -1,14 +1,66 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
-from typing import List, Optional
-from sqlalchemy.orm import Session
-from app.database import get_db
-from app.models.post import Post, Attachment, Reaction, PostView
-from app.schemas.post import PostCreate, PostResponse, PostListResponse, PostUpdate, AttachmentMeta, ReactionSchema, ReplySchema, ShareSchema
+import asyncio
+import hashlib
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Request, Query, WebSocket
+from typing import List, Optional, Union
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session, defer
+from starlette.concurrency import run_in_threadpool
+from app.config import settings
+from app.database import DbSession, get_read_session, get_session, run_db
+from app.models.post import Post, Attachment, AttachmentVariant, PostView
+from app.schemas.post import PostCreate, PostResponse, PostListResponse, PostUpdate, ReactionSchema, ReplySchema, ShareSchema
+from app.schemas.post import BulkViewsRequest, BulkViewsResponse, PostSummaryListResponse
 from app.models.post import Reply, Share
-from fastapi.responses import Response
+from app.services import blob_refs, counters, live_feed, reactions
+from app.services.cache import get_response_cache
+from app.services.feed import InvalidFields, list_post_page, get_post_response, parse_fields
+from app.services.blob_store import get_blob_store
+from app.services.uploads import StoredUpload, serving_type, store_uploads
+from app.services.conditional import IMMUTABLE_CACHE_CONTROL, VARIANT_PENDING_CACHE_CONTROL, serve_immutable
+from app.services.images import schedule_variants
+from app.services.pagination import InvalidCursor
+from app.services.replies import reply_page
+from app.services.view_buffer import ViewBufferFull, get_view_buffer, record_views
+from fastapi.responses import Response, StreamingResponse
 
 router = APIRouter(prefix="/api/posts", tags=["posts"])
 
+# replies per query when streaming a thread as NDJSON
+REPLY_EXPORT_CHUNK = 1000
+
+
+async def _invalidate_post(post_id: int):
+    """Drop cached feed pages and the post's own entry after a committed write."""
+    await get_response_cache().invalidate("posts", f"post:{post_id}")
+
+
+def _add_attachments(db: Session, post_id: int, stored: List[StoredUpload]) -> List[int]:
+    """
+    Insert the Attachment rows for uploads already in the blob store in one statement.
+
+    Returns the ids of image attachments so variants can be scheduled once the
+    caller has committed.
+    """
+    if not stored:
+        return []
+    rows = db.execute(
+        insert(Attachment).returning(Attachment.id, Attachment.is_image),
+        [
+            {
+                "post_id": post_id,
+                "filename": u.filename,
+                "content_type": u.content_type,
+                "size": u.blob.size,
+                "is_image": u.is_image,
+                "storage_key": u.blob.key,
+                "sha256": u.blob.sha256,
+            }
+            for u in stored
+        ],
+    ).all()
+    blob_refs.acquire(db, [(u.blob.key, u.blob.size) for u in stored])
+    return [att_id for att_id, is_image in rows if is_image]
+
 
 @router.post("/", response_model=PostResponse, status_code=status.HTTP_201_CREATED)
 async def create_post(
@@ -17,140 +69,267 @@ async def create_post(
     author: str = Form(...),
     announce_type: Optional[str] = Form(None),
     files: Optional[List[UploadFile]] = File(None),
-    db: Session = Depends(get_db),
+    db: DbSession = Depends(get_session),
 ):
-    """Create a post with optional attachments (multipart/form-data). Files are stored in DB."""
-    post = Post(title=title, description=description, author=author, announce_type=announce_type)
-    db.add(post)
-    db.commit()
-    db.refresh(post)
-
-    # handle files
-    if files:
-        for f in files:
-            content = await f.read()
-            att = Attachment(
-                post_id=post.id,
-                filename=f.filename,
-                content_type=f.content_type or 'application/octet-stream',
-                size=len(content),
-                is_image=(f.content_type or '').startswith('image/'),
-                data=content,
-            )
-            db.add(att)
+    """Create a post with optional attachments (multipart/form-data). Files go to the blob store."""
+    stored = await store_uploads(files, settings.max_upload_size)
+
+    def create(db: Session):
+        post = Post(title=title, description=description, author=author, announce_type=announce_type)
+        db.add(post)
+        db.flush()
+        image_ids = _add_attachments(db, post.id, stored)
         db.commit()
+        return get_post_response(db, post.id), image_ids
 
-    # eager load relations
-    db.refresh(post)
-    # compute views_count
-    views_count = db.query(PostView).filter(PostView.post_id == post.id).count()
-
-    return PostResponse(
-        id=post.id,
-        title=post.title,
-        description=post.description,
-        author=post.author,
-        announce_type=post.announce_type,
-        created_at=post.created_at,
-        updated_at=post.updated_at,
-        attachments=[AttachmentMeta.from_orm(a) for a in post.attachments],
-        reactions=[],
-        views_count=views_count,
-    )
+    response, image_ids = await run_db(db, create)
+    await _invalidate_post(response.id)
+    live_feed.publish("post.created", live_feed.post_event_data(response))
+    schedule_variants(image_ids)
+    return response
+
+
+@router.get("/", response_model=Union[PostListResponse, PostSummaryListResponse])
+async def list_posts(
+    request: Request,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page's next_cursor"),
+    count: Optional[str] = Query(None, regex="^(exact|estimate|none)$", description="How to compute total (default: exact without cursor, none with)"),
+    view: str = Query("full", regex="^(full|summary)$", description="`summary`: plain-text excerpt and counts instead of HTML and nested lists"),
+    fields: Optional[str] = Query(None, description="Comma-separated post fields to return, e.g. `id,title,excerpt`"),
+    db: DbSession = Depends(get_read_session),
+):
+    try:
+        field_list = parse_fields(fields)
+    except InvalidFields as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+    async def build():
+        try:
+            return await run_db(db, list_post_page, skip=skip, limit=limit, cursor=cursor,
+                                count=count or ("none" if cursor else "exact"), view=view, fields=field_list,
+                                plain=settings.fast_json)
+        except InvalidCursor as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+
+    return await get_response_cache().cached_json(request, ["posts"], build)
+
+
+@router.get("/stream", response_class=StreamingResponse,
+            responses={200: {"content": {"text/event-stream": {}}}})
+async def stream_posts(
+    request: Request,
+    last_event_id: Optional[str] = Query(None, description="Resume after this event id (or send a Last-Event-ID header)"),
+):
+    """
+    Server-Sent Events for the feed: `post.created`, `post.updated`,
+    `post.deleted`, and `engagement` with per-post counter deltas, coalesced
+    every LIVE_FEED_COALESCE_WINDOW seconds. A `reset` event means missed
+    events are gone and the client should reload the feed.
+    """
+    resume_from = request.headers.get("last-event-id") or last_event_id
+    feed = live_feed.get_live_feed()
 
+    async def body():
+        subscription = feed.subscribe(resume_from)
+        try:
+            yield b"retry: 3000\n\n"
+            async for event in feed.listen(subscription, settings.live_feed_heartbeat):
+                yield live_feed.encode_sse(event) if event else b": keepalive\n\n"
+        finally:
+            feed.unsubscribe(subscription)
 
-@router.get("/", response_model=PostListResponse)
-def list_posts(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    q = db.query(Post).order_by(Post.created_at.desc())
-    total = q.count()
-    items = q.offset(skip).limit(limit).all()
-    posts_out = []
-    for p in items:
-        views_count = db.query(PostView).filter(PostView.post_id == p.id).count()
-        replies_count = db.query(Reply).filter(Reply.post_id == p.id).count()
-        shares_count = db.query(Share).filter(Share.post_id == p.id).count()
-        # collect usernames who reacted with 'like'
-        liked_users = [r.user for r in p.reactions if (r.reaction or '').lower() == 'like']
-        posts_out.append(PostResponse(
-            id=p.id,
-            title=p.title,
-            description=p.description,
-            author=p.author,
-            announce_type=p.announce_type,
-            created_at=p.created_at,
-            updated_at=p.updated_at,
-            attachments=[AttachmentMeta.from_orm(a) for a in p.attachments],
-            reactions=[ReactionSchema.from_orm(r) for r in p.reactions],
-            views_count=views_count,
-            replies_count=replies_count,
-            shares_count=shares_count,
-            liked_users=liked_users,
-        ))
-
-    return PostListResponse(total=total, posts=posts_out)
+    return StreamingResponse(body(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@router.websocket("/ws")
+async def posts_socket(websocket: WebSocket, last_event_id: Optional[str] = None):
+    """The same events as /stream, one JSON message each: {"id", "event", "data"}."""
+    await websocket.accept()
+    feed = live_feed.get_live_feed()
+    subscription = feed.subscribe(last_event_id)
+
+    async def send_events():
+        async for event in feed.listen(subscription, settings.live_feed_heartbeat):
+            await websocket.send_json(event.to_json() if event else {"event": "ping"})
+
+    async def wait_for_close():
+        # clients do not send anything; reading is how a closed socket is noticed right away
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+
+    tasks = [asyncio.create_task(send_events()), asyncio.create_task(wait_for_close())]
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        feed.unsubscribe(subscription)
 
 
 @router.get("/{post_id}", response_model=PostResponse)
-def get_post(post_id: int, db: Session = Depends(get_db)):
-    p = db.query(Post).filter(Post.id == post_id).first()
-    if not p:
-        raise HTTPException(status_code=404, detail="Post not found")
-    views_count = db.query(PostView).filter(PostView.post_id == p.id).count()
-    return PostResponse(
-        id=p.id,
-        title=p.title,
-        description=p.description,
-        author=p.author,
-        announce_type=p.announce_type,
-        created_at=p.created_at,
-        updated_at=p.updated_at,
-        attachments=[AttachmentMeta.from_orm(a) for a in p.attachments],
-        reactions=[ReactionSchema.from_orm(r) for r in p.reactions],
-        views_count=views_count,
-        replies_count=db.query(Reply).filter(Reply.post_id == p.id).count(),
-        shares_count=db.query(Share).filter(Share.post_id == p.id).count(),
-        liked_users=[r.user for r in p.reactions if (r.reaction or '').lower() == 'like'],
-    )
+async def get_post(post_id: int, request: Request, db: DbSession = Depends(get_read_session)):
+    async def build():
+        p = await run_db(db, get_post_response, post_id)
+        if not p:
+            raise HTTPException(status_code=404, detail="Post not found")
+        return p
+
+    return await get_response_cache().cached_json(request, [f"post:{post_id}"], build)
 
 
 @router.get("/{post_id}/attachments/{att_id}")
-def get_attachment(post_id: int, att_id: int, db: Session = Depends(get_db)):
-    att = db.query(Attachment).filter(Attachment.id == att_id, Attachment.post_id == post_id).first()
-    if not att:
-        raise HTTPException(status_code=404, detail="Attachment not found")
-    return Response(content=att.data, media_type=att.content_type, headers={"Content-Disposition": f"inline; filename=\"{att.filename}\""})
+async def get_attachment(post_id: int, att_id: int, request: Request,
+                         variant: Optional[str] = Query(None, description="Image variant to serve, e.g. 'thumb' or 'medium'"),
+                         db: DbSession = Depends(get_read_session)):
+    """
+    Download an attachment, or one of its resized variants.
 
+    Supports conditional requests (If-None-Match / If-Modified-Since -> 304) and
+    byte ranges (single range -> 206, several -> multipart/byteranges). A
+    variant that does not exist (not generated yet, or the image is already
+    small) falls back to the original. Raster images and PDFs are shown
+    inline; anything else is sent as a download (see serving_type).
+    """
+    def lookup(db: Session):
+        att = (
+            db.query(Attachment)
+            .options(defer(Attachment.data))
+            .filter(Attachment.id == att_id, Attachment.post_id == post_id)
+            .first()
+        )
+        if not att:
+            raise HTTPException(status_code=404, detail="Attachment not found")
+        source = att
+        if variant:
+            v = (
+                db.query(AttachmentVariant)
+                .filter(AttachmentVariant.attachment_id == att.id, AttachmentVariant.name == variant)
+                .first()
+            )
+            if v:
+                source = v
+        # legacy rows not yet moved out of Postgres by the blob migration carry their bytes
+        data = att.data if source.storage_key is None else None
+        pending = bool(variant) and source is att
+        return (att.filename, source.storage_key, source.size, source.content_type, source.sha256,
+                source.created_at, data, pending)
 
-@router.get("/{post_id}/replies", response_model=List[ReplySchema])
-def list_replies(post_id: int, db: Session = Depends(get_db)):
-    p = db.query(Post).filter(Post.id == post_id).first()
-    if not p:
-        raise HTTPException(status_code=404, detail="Post not found")
-    return [ReplySchema.from_orm(r) for r in p.replies]
+    filename, storage_key, size, content_type, sha256, created_at, data, pending = await run_db(db, lookup)
+    content_type, disposition = serving_type(content_type)
+    headers = {"Content-Disposition": f"{disposition}; filename=\"{filename}\"", "X-Content-Type-Options": "nosniff"}
+    # the original standing in for a variant must not be cached for good under the variant's URL
+    cache_control = VARIANT_PENDING_CACHE_CONTROL if pending else IMMUTABLE_CACHE_CONTROL
+    if storage_key is None:
+        return await serve_immutable(
+            request,
+            open_range=lambda start, end: iter([data[start:end]]),
+            size=len(data),
+            content_type=content_type,
+            sha256=sha256 or hashlib.sha256(data).hexdigest(),
+            last_modified=created_at,
+            headers=headers,
+            cache_control=cache_control,
+        )
+    store = get_blob_store()
+    if not await run_in_threadpool(store.exists, storage_key):
+        raise HTTPException(status_code=404, detail="Attachment content missing")
+    return await serve_immutable(
+        request,
+        open_range=lambda start, end: store.open(storage_key, start, end),
+        size=size,
+        content_type=content_type,
+        sha256=sha256,
+        last_modified=created_at,
+        headers=headers,
+        cache_control=cache_control,
+    )
+
+
+@router.get("/{post_id}/replies", response_model=List[ReplySchema],
+            responses={200: {"content": {"application/x-ndjson": {}}}})
+async def list_replies(
+    post_id: int,
+    response: Response,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="Value of a previous page's X-Next-Cursor header"),
+    order: str = Query("oldest", regex="^(oldest|newest)$"),
+    format: str = Query("json", regex="^(json|ndjson)$", description="`ndjson` streams every reply (export)"),
+    db: DbSession = Depends(get_read_session),
+):
+    """
+    A page of replies; the cursor for the next page is in the X-Next-Cursor header.
+
+    With `format=ndjson` all replies after `cursor` are streamed one JSON
+    object per line, fetched in chunks of REPLY_EXPORT_CHUNK.
+    """
+    async def page(page_cursor, page_limit):
+        try:
+            result = await run_db(db, reply_page, post_id, page_limit, page_cursor, order)
+        except InvalidCursor as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+        if result is None:
+            raise HTTPException(status_code=404, detail="Post not found")
+        return result
+
+    if format == "ndjson":
+        # fetch the first chunk before streaming so a 404/400 is still a proper response
+        first = await page(cursor, REPLY_EXPORT_CHUNK)
+
+        async def lines():
+            replies, next_cursor = first
+            while True:
+                for r in replies:
+                    yield r.json() + "\n"
+                if next_cursor is None:
+                    break
+                replies, next_cursor = await page(next_cursor, REPLY_EXPORT_CHUNK)
+
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    replies, next_cursor = await page(cursor, limit)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return replies
 
 
 @router.post("/{post_id}/replies", response_model=ReplySchema, status_code=status.HTTP_201_CREATED)
-def add_reply(post_id: int, user: str = Form(...), content: str = Form(...), db: Session = Depends(get_db)):
-    p = db.query(Post).filter(Post.id == post_id).first()
-    if not p:
-        raise HTTPException(status_code=404, detail="Post not found")
-    r = Reply(post_id=post_id, user=user, content=content)
-    db.add(r)
-    db.commit()
-    db.refresh(r)
-    return ReplySchema.from_orm(r)
+async def add_reply(post_id: int, user: str = Form(...), content: str = Form(...), db: DbSession = Depends(get_session)):
+    def create(db: Session):
+        if not counters.increment(db, post_id, "replies_count"):
+            db.rollback()
+            raise HTTPException(status_code=404, detail="Post not found")
+        r = Reply(post_id=post_id, user=user, content=content)
+        db.add(r)
+        db.commit()
+        db.refresh(r)
+        return ReplySchema.from_orm(r)
+
+    response = await run_db(db, create)
+    await _invalidate_post(post_id)
+    live_feed.record_engagement(post_id, replies_count=1)
+    return response
 
 
 @router.post("/{post_id}/shares", response_model=ShareSchema, status_code=status.HTTP_201_CREATED)
-def add_share(post_id: int, user: str = Form(...), platform: Optional[str] = Form(None), db: Session = Depends(get_db)):
-    p = db.query(Post).filter(Post.id == post_id).first()
-    if not p:
-        raise HTTPException(status_code=404, detail="Post not found")
-    s = Share(post_id=post_id, user=user, platform=platform)
-    db.add(s)
-    db.commit()
-    db.refresh(s)
-    return ShareSchema.from_orm(s)
+async def add_share(post_id: int, user: str = Form(...), platform: Optional[str] = Form(None), db: DbSession = Depends(get_session)):
+    def create(db: Session):
+        if not counters.increment(db, post_id, "shares_count"):
+            db.rollback()
+            raise HTTPException(status_code=404, detail="Post not found")
+        s = Share(post_id=post_id, user=user, platform=platform)
+        db.add(s)
+        db.commit()
+        db.refresh(s)
+        return ShareSchema.from_orm(s)
+
+    response = await run_db(db, create)
+    await _invalidate_post(post_id)
+    live_feed.record_engagement(post_id, shares_count=1)
+    return response
 
 
 @router.put("/{post_id}", response_model=PostResponse)
@@ -159,76 +338,159 @@ async def update_post(post_id: int,
     description: Optional[str] = Form(None),
     announce_type: Optional[str] = Form(None),
     files: Optional[List[UploadFile]] = File(None),
-    db: Session = Depends(get_db)):
-    p = db.query(Post).filter(Post.id == post_id).first()
-    if not p:
+    db: DbSession = Depends(get_session)):
+    def exists(db: Session):
+        return db.scalar(select(Post.id).where(Post.id == post_id)) is not None
+
+    # nothing is written to the blob store for a post that does not exist; a post
+    # deleted after this check leaves its uploads to `gc-blobs`
+    if not await run_db(db, exists):
         raise HTTPException(status_code=404, detail="Post not found")
-    if title is not None:
-        p.title = title
-    if description is not None:
-        p.description = description
-    if announce_type is not None:
-        p.announce_type = announce_type
-    db.add(p)
-    db.commit()
-    # add files if provided
-    if files:
-        for f in files:
-            content = await f.read()
-            att = Attachment(
-                post_id=p.id,
-                filename=f.filename,
-                content_type=f.content_type or 'application/octet-stream',
-                size=len(content),
-                is_image=(f.content_type or '').startswith('image/'),
-                data=content,
-            )
-            db.add(att)
+    stored = await store_uploads(files, settings.max_upload_size)
+
+    def update(db: Session):
+        p = db.query(Post).filter(Post.id == post_id).first()
+        if not p:
+            raise HTTPException(status_code=404, detail="Post not found")
+        if title is not None:
+            p.title = title
+        if description is not None:
+            p.description = description
+        if announce_type is not None:
+            p.announce_type = announce_type
+        db.add(p)
+        # add files if provided
+        image_ids = _add_attachments(db, p.id, stored)
         db.commit()
-    db.refresh(p)
-    views_count = db.query(PostView).filter(PostView.post_id == p.id).count()
-    return PostResponse(
-        id=p.id,
-        title=p.title,
-        description=p.description,
-        author=p.author,
-        announce_type=p.announce_type,
-        created_at=p.created_at,
-        updated_at=p.updated_at,
-        attachments=[AttachmentMeta.from_orm(a) for a in p.attachments],
-        reactions=[ReactionSchema.from_orm(r) for r in p.reactions],
-        views_count=views_count,
-    )
+        return get_post_response(db, p.id), image_ids
+
+    response, image_ids = await run_db(db, update)
+    await _invalidate_post(post_id)
+    live_feed.publish("post.updated", live_feed.post_event_data(response))
+    schedule_variants(image_ids)
+    return response
 
 
 @router.delete("/{post_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_post(post_id: int, db: Session = Depends(get_db)):
-    p = db.query(Post).filter(Post.id == post_id).first()
-    if not p:
-        raise HTTPException(status_code=404, detail="Post not found")
-    db.delete(p)
-    db.commit()
+async def delete_post(post_id: int, db: DbSession = Depends(get_session)):
+    def delete(db: Session):
+        p = db.query(Post).filter(Post.id == post_id).first()
+        if not p:
+            raise HTTPException(status_code=404, detail="Post not found")
+        # counters live on the post row and engagement rows cascade in the database,
+        # so the counters disappear in the same statement as the post; the blobs
+        # behind its attachments lose a reference and are left for `gc-blobs`
+        keys = blob_refs.post_blob_keys(db, post_id)
+        db.delete(p)
+        blob_refs.release(db, keys)
+        db.commit()
+
+    await run_db(db, delete)
+    await _invalidate_post(post_id)
+    live_feed.publish("post.deleted", {"id": post_id})
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 
-@router.post("/{post_id}/reactions", response_model=ReactionSchema, status_code=status.HTTP_201_CREATED)
-def add_reaction(post_id: int, user: str = Form(...), reaction: str = Form(...), db: Session = Depends(get_db)):
-    p = db.query(Post).filter(Post.id == post_id).first()
-    if not p:
-        raise HTTPException(status_code=404, detail="Post not found")
-    r = Reaction(post_id=post_id, user=user, reaction=reaction)
-    db.add(r)
-    db.commit()
-    db.refresh(r)
-    return ReactionSchema.from_orm(r)
+@router.post("/{post_id}/reactions", response_model=ReactionSchema, status_code=status.HTTP_201_CREATED,
+             responses={200: {"description": "The user already had this reaction"},
+                        204: {"description": "Toggled off"}})
+async def add_reaction(post_id: int, response: Response, user: str = Form(...), reaction: str = Form(...),
+                       toggle: bool = Form(False), db: DbSession = Depends(get_session)):
+    """
+    Add a reaction (idempotent: repeating it returns the existing one with 200).
+
+    With `toggle=true` an existing reaction is removed instead (204).
+    """
+    def create(db: Session):
+        if toggle and reactions.remove_reaction(db, post_id, user, reaction):
+            return None
+        try:
+            row, created = reactions.add_reaction(db, post_id, user, reaction)
+        except reactions.PostNotFound:
+            raise HTTPException(status_code=404, detail="Post not found")
+        return ReactionSchema.from_orm(row), created
+
+    result = await run_db(db, create)
+    await _invalidate_post(post_id)
+    if result is None:
+        live_feed.record_engagement(post_id, **{"reactions_count": -1, f"reaction:{reactions.normalize(reaction)}": -1})
+        return Response(status_code=status.HTTP_204_NO_CONTENT)
+    reaction_out, created = result
+    if created:
+        live_feed.record_engagement(post_id, **{"reactions_count": 1, f"reaction:{reaction_out.reaction}": 1})
+    else:
+        response.status_code = status.HTTP_200_OK
+    return reaction_out
+
+
+@router.delete("/{post_id}/reactions", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_reaction(post_id: int, user: str = Query(...), reaction: str = Query(...),
+                          db: DbSession = Depends(get_session)):
+    if not await run_db(db, reactions.remove_reaction, post_id, user, reaction):
+        raise HTTPException(status_code=404, detail="Reaction not found")
+    await _invalidate_post(post_id)
+    live_feed.record_engagement(post_id, **{"reactions_count": -1, f"reaction:{reactions.normalize(reaction)}": -1})
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+async def _enqueue_view(post_id: int, user: str) -> bool:
+    try:
+        return await get_view_buffer().add(post_id, user)
+    except ViewBufferFull as exc:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(exc),
+                            headers={"Retry-After": "1"})
+
+
+@router.post("/views/bulk", response_model=BulkViewsResponse, status_code=status.HTTP_202_ACCEPTED)
+async def add_views_bulk(payload: BulkViewsRequest, db: DbSession = Depends(get_session)):
+    """
+    Record many views in one call.
+
+    With VIEW_BUFFER_ENABLED the events are queued (and deduplicated) like
+    single views; otherwise they are written in one transaction right away
+    and views for unknown posts are counted as `rejected`. Queued views for
+    unknown posts are dropped when the batch is written.
+    """
+    events = list(dict.fromkeys((v.post_id, v.user) for v in payload.views))
+    if settings.view_buffer_enabled:
+        accepted = 0
+        for post_id, user in events:
+            accepted += await _enqueue_view(post_id, user)
+        return BulkViewsResponse(accepted=accepted, duplicates=len(payload.views) - accepted)
+
+    added = await run_db(db, record_views, events)
+    if added:
+        await get_response_cache().invalidate("posts", *[f"post:{pid}" for pid in added])
+    for post_id, views in added.items():
+        live_feed.record_engagement(post_id, views_count=views)
+    accepted = sum(added.values())
+    return BulkViewsResponse(accepted=accepted, duplicates=len(payload.views) - len(events),
+                             rejected=len(events) - accepted)
 
 
 @router.post("/{post_id}/views", status_code=status.HTTP_201_CREATED)
-def add_view(post_id: int, user: str = Form(...), db: Session = Depends(get_db)):
-    p = db.query(Post).filter(Post.id == post_id).first()
-    if not p:
-        raise HTTPException(status_code=404, detail="Post not found")
-    v = PostView(post_id=post_id, user=user)
-    db.add(v)
-    db.commit()
+async def add_view(post_id: int, response: Response, user: str = Form(...), db: DbSession = Depends(get_session)):
+    """
+    Record a view.
+
+    With VIEW_BUFFER_ENABLED (default) the view is queued and written in a
+    batch shortly after (202); a repeat view inside the dedup window is
+    ignored. Otherwise it is inserted directly (201, 404 for unknown posts).
+    """
+    if settings.view_buffer_enabled:
+        accepted = await _enqueue_view(post_id, user)
+        response.status_code = status.HTTP_202_ACCEPTED
+        return {"status": "accepted" if accepted else "duplicate"}
+
+    def create(db: Session):
+        if not counters.increment(db, post_id, "views_count"):
+            db.rollback()
+            raise HTTPException(status_code=404, detail="Post not found")
+        v = PostView(post_id=post_id, user=user)
+        db.add(v)
+        db.commit()
+
+    await run_db(db, create)
+    await _invalidate_post(post_id)
+    live_feed.record_engagement(post_id, views_count=1)
     return {"status": "ok"}
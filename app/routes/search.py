@@ -0,0 +1,37 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from app.database import DbSession, get_read_session, run_db
+from app.schemas.search import SearchResponse
+from app.services.pagination import InvalidCursor
+from app.services.search import SEARCH_KINDS, search
+from typing import List, Optional
+
+router = APIRouter(prefix="/api/search", tags=["search"])
+
+@router.get("/", response_model=SearchResponse)
+async def search_all(
+    q: str = Query(..., min_length=1, max_length=200, description="Search terms (supports \"quoted phrases\" and -exclusions on Postgres)"),
+    type: Optional[List[str]] = Query(None, description="Restrict to 'document' and/or 'post'"),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page's next_cursor"),
+    db: DbSession = Depends(get_read_session)
+):
+    """
+    Ranked full-text search over document names/descriptions and post titles/descriptions
+
+    - **q**: Search terms
+    - **type**: Limit results to documents or posts (repeatable)
+    - **limit**: Maximum number of results (default: 20, max: 100)
+    - **cursor**: Continue after the last result of a previous page
+    """
+    kinds = type or list(SEARCH_KINDS)
+    unknown = set(kinds) - set(SEARCH_KINDS)
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown type(s): {', '.join(sorted(unknown))}"
+        )
+    try:
+        results, next_cursor = await run_db(db, search, q, kinds=kinds, limit=limit, cursor=cursor)
+    except InvalidCursor as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+    return SearchResponse(results=results, next_cursor=next_cursor)
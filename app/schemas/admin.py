@@ -0,0 +1,11 @@
+from pydantic import BaseModel
+
+
+class StorageStats(BaseModel):
+    references: int
+    unique_blobs: int
+    logical_bytes: int
+    stored_bytes: int
+    dedup_ratio: float
+    garbage_blobs: int
+    garbage_bytes: int
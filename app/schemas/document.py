@@ -2,11 +2,13 @@ from pydantic import BaseModel, Field
 from typing import Optional
 from datetime import datetime
 
+DEFAULT_LOCATION = "India"
+
 class DocumentBase(BaseModel):
     name: str = Field(..., min_length=1, max_length=255, description="Document name")
     description: Optional[str] = Field(None, description="Document description")
     link: str = Field(..., min_length=1, max_length=500, description="SharePoint link to the document")
-    location: str = Field("India", min_length=1, max_length=100, description="Location of the policy document")
+    location: str = Field(DEFAULT_LOCATION, min_length=1, max_length=100, description="Location of the policy document")
 
 class DocumentCreate(DocumentBase):
     pass
@@ -19,6 +21,7 @@ class DocumentUpdate(BaseModel):
 
 class DocumentResponse(DocumentBase):
     id: int
+    location_code: Optional[str] = None
     last_updated: datetime
     created_at: datetime
     updated_at: datetime
@@ -27,5 +30,24 @@ class DocumentResponse(DocumentBase):
         orm_mode = True
 
 class DocumentListResponse(BaseModel):
-    total: int
+    total: Optional[int]
     documents: list[DocumentResponse]
+    next_cursor: Optional[str] = None
+
+class LocationFacet(BaseModel):
+    code: str
+    name: str
+    count: int
+
+class LocationFacetsResponse(BaseModel):
+    locations: list[LocationFacet]
+
+class BulkRowError(BaseModel):
+    line: int
+    errors: list[str]
+
+class BulkImportResponse(BaseModel):
+    created: int
+    updated: int
+    failed: int
+    errors: list[BulkRowError]
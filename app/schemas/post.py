@@ -1,8 +1,18 @@
-from pydantic import BaseModel
-from typing import Optional, List
+from pydantic import BaseModel, Field
+from typing import Dict, Optional, List
 from datetime import datetime
 
 
+class AttachmentVariantMeta(BaseModel):
+    name: str
+    content_type: str
+    width: int
+    height: int
+    size: int
+    class Config:
+        orm_mode = True
+
+
 class AttachmentMeta(BaseModel):
     id: int
     filename: str
@@ -10,6 +20,7 @@ class AttachmentMeta(BaseModel):
     size: int
     is_image: bool
     created_at: datetime
+    variants: List[AttachmentVariantMeta] = []
     class Config:
         orm_mode = True
 
@@ -62,22 +73,65 @@ class PostResponse(BaseModel):
     id: int
     title: str
     description: Optional[str]
+    excerpt: Optional[str] = None
     author: str
     announce_type: Optional[str]
     created_at: datetime
     updated_at: datetime
     attachments: List[AttachmentMeta] = []
-    reactions: List[ReactionSchema] = []
+    reaction_counts: Dict[str, int] = {}
     views_count: int = 0
     replies_count: int = 0
     shares_count: int = 0
+    reactions_count: int = 0
     liked_users: List[str] = []
     class Config:
         orm_mode = True
 
 
 class PostListResponse(BaseModel):
-    total: int
+    total: Optional[int]
     posts: List[PostResponse]
+    next_cursor: Optional[str] = None
     class Config:
         orm_mode = True
+
+
+class PostSummary(BaseModel):
+    """Feed entry for `view=summary`: plain-text excerpt and counts, no nested lists."""
+    id: int
+    title: str
+    excerpt: Optional[str]  # plain text, HTML-escaped
+    author: str
+    announce_type: Optional[str]
+    created_at: datetime
+    updated_at: datetime
+    attachment_count: int = 0
+    views_count: int = 0
+    replies_count: int = 0
+    shares_count: int = 0
+    reactions_count: int = 0
+    class Config:
+        orm_mode = True
+
+
+class PostSummaryListResponse(BaseModel):
+    total: Optional[int]
+    posts: List[PostSummary]
+    next_cursor: Optional[str] = None
+
+
+class ViewEvent(BaseModel):
+    post_id: int
+    user: str = Field(..., max_length=200)
+
+
+class BulkViewsRequest(BaseModel):
+    views: List[ViewEvent] = Field(..., min_items=1, max_items=1000)
+
+
+class BulkViewsResponse(BaseModel):
+    accepted: int
+    duplicates: int
+    # views for posts that do not exist; only known when the views are written directly
+    rejected: int = 0
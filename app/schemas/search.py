@@ -0,0 +1,15 @@
+from pydantic import BaseModel
+from typing import Optional, List
+
+
+class SearchHit(BaseModel):
+    kind: str  # "document" or "post"
+    id: int
+    title: str
+    snippet: Optional[str]  # HTML-escaped text, matched terms wrapped in <mark>...</mark>
+    rank: float
+
+
+class SearchResponse(BaseModel):
+    results: List[SearchHit]
+    next_cursor: Optional[str] = None
@@ -0,0 +1,185 @@
+"""
+Reference counting for content-addressed blobs.
+
+Every attachment and variant row holds one reference to the blob named by its
+storage_key. References are taken in the transaction that inserts the rows and
+released in the transaction that deletes them, so the `blobs` table always
+agrees with the rows that point into the store. Objects are never deleted
+inline: `collect_garbage` removes blobs that have been unreferenced for longer
+than a grace period, in batches, from the CLI.
+
+Bytes are written to the store before the transaction that references them,
+so a request that fails in between (a 404, a 413 on a later file, a rollback)
+leaves an object with no `blobs` row. `collect_garbage` also sweeps those once
+they are older than the grace period.
+
+The grace period also covers the one race left. An upload finds its bytes
+already stored (so it writes nothing) just before GC deletes them, and then
+takes a new reference. That needs an identical upload to arrive exactly while
+a blob unreferenced for the whole grace period is being collected.
+"""
+import logging
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Tuple
+
+from sqlalchemy import bindparam, case, delete, func, select, update
+from sqlalchemy.orm import Session
+
+from app.database import dialect_insert
+from app.models.blob import Blob
+from app.models.post import Attachment, AttachmentVariant
+from app.services.blob_store import BlobStore
+
+logger = logging.getLogger(__name__)
+
+
+def acquire(db: Session, blobs: Iterable[Tuple[str, int]]):
+    """Take one reference per (key, size) pair; does not commit."""
+    counts = Counter()
+    sizes = {}
+    for key, size in blobs:
+        counts[key] += 1
+        sizes[key] = size
+    if not counts:
+        return
+    # a fixed key order keeps concurrent upserts from deadlocking
+    stmt = dialect_insert(db, Blob).values(
+        [{"key": key, "size": sizes[key], "ref_count": counts[key]} for key in sorted(counts)]
+    )
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[Blob.key],
+        set_={"ref_count": Blob.ref_count + stmt.excluded.ref_count, "released_at": None},
+    ))
+
+
+def release(db: Session, keys: Iterable[str]):
+    """Drop one reference per key; does not commit."""
+    counts = Counter(keys)
+    if not counts:
+        return
+    blobs = Blob.__table__
+    remaining = blobs.c.ref_count - bindparam("n")
+    db.execute(
+        update(blobs)
+        .where(blobs.c.key == bindparam("k"))
+        .values(
+            ref_count=remaining,
+            released_at=case((remaining <= 0, bindparam("now")), else_=None),
+        ),
+        [{"k": key, "n": n, "now": datetime.utcnow()} for key, n in sorted(counts.items())],
+    )
+
+
+def post_blob_keys(db: Session, post_id: int) -> list:
+    """Storage keys referenced by a post's attachments and their variants."""
+    attachment_keys = select(Attachment.storage_key).where(
+        Attachment.post_id == post_id, Attachment.storage_key.isnot(None)
+    )
+    variant_keys = (
+        select(AttachmentVariant.storage_key)
+        .join(Attachment, AttachmentVariant.attachment_id == Attachment.id)
+        .where(Attachment.post_id == post_id)
+    )
+    return list(db.scalars(attachment_keys.union_all(variant_keys)))
+
+
+def collect_garbage(db: Session, store: BlobStore, batch_size: int = 500,
+                    grace_seconds: int = 3600) -> Tuple[int, int]:
+    """
+    Delete blobs unreferenced for more than `grace_seconds`, `batch_size` at a time.
+
+    Rows are deleted and committed before the objects, so a failure part way
+    leaves orphaned objects (harmless) rather than rows without content; the
+    final pass over the store removes such objects, and those left by failed
+    uploads, once they are older than the grace period. Returns (blobs
+    deleted, bytes freed).
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=grace_seconds)
+    deleted = freed = 0
+    while True:
+        candidates = (
+            select(Blob.key)
+            .where(Blob.ref_count <= 0, Blob.released_at < cutoff)
+            .order_by(Blob.key)
+            .limit(batch_size)
+        )
+        if db.get_bind().dialect.name == "postgresql":
+            candidates = candidates.with_for_update(skip_locked=True)
+        keys = list(db.scalars(candidates))
+        if not keys:
+            break
+        rows = db.execute(
+            delete(Blob)
+            .where(Blob.key.in_(keys), Blob.ref_count <= 0)
+            .returning(Blob.key, Blob.size)
+        ).all()
+        db.commit()
+        for key, size in rows:
+            try:
+                store.delete(key)
+            except Exception:
+                logger.exception("Could not delete blob %s from storage", key)
+                continue
+            deleted += 1
+            freed += size
+        if len(keys) < batch_size:
+            break
+    orphans_deleted, orphans_freed = _sweep_orphans(db, store, cutoff, batch_size)
+    return deleted + orphans_deleted, freed + orphans_freed
+
+
+def _sweep_orphans(db: Session, store: BlobStore, cutoff: datetime, batch_size: int) -> Tuple[int, int]:
+    """Delete stored objects last written before `cutoff` that have no `blobs` row."""
+    deleted = freed = 0
+    batch = {}
+
+    def flush():
+        nonlocal deleted, freed
+        known = set(db.scalars(select(Blob.key).where(Blob.key.in_(list(batch)))))
+        db.rollback()  # end the read transaction between batches
+        for key, size in batch.items():
+            if key in known:
+                continue
+            try:
+                store.delete(key)
+            except Exception:
+                logger.exception("Could not delete orphaned blob %s from storage", key)
+                continue
+            deleted += 1
+            freed += size
+        batch.clear()
+
+    for key, size, modified in store.iter_keys():
+        if modified < cutoff:
+            batch[key] = size
+            if len(batch) >= batch_size:
+                flush()
+    if batch:
+        flush()
+    return deleted, freed
+
+
+def storage_stats(db: Session) -> Dict[str, float]:
+    """Logical vs physical attachment storage, for the admin stats endpoint."""
+    referenced = Blob.ref_count > 0
+    row = db.execute(
+        select(
+            func.count().filter(referenced),
+            func.coalesce(func.sum(Blob.ref_count).filter(referenced), 0),
+            func.coalesce(func.sum(Blob.size * Blob.ref_count).filter(referenced), 0),
+            func.coalesce(func.sum(Blob.size).filter(referenced), 0),
+            func.count().filter(~referenced),
+            func.coalesce(func.sum(Blob.size).filter(~referenced), 0),
+        )
+    ).one()
+    unique_blobs, references, logical_bytes, stored_bytes, garbage_blobs, garbage_bytes = row
+    return {
+        "references": int(references),
+        "unique_blobs": int(unique_blobs),
+        "logical_bytes": int(logical_bytes),
+        "stored_bytes": int(stored_bytes),
+        "dedup_ratio": round(logical_bytes / stored_bytes, 3) if stored_bytes else 1.0,
+        "garbage_blobs": int(garbage_blobs),
+        "garbage_bytes": int(garbage_bytes),
+    }
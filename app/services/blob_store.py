@@ -0,0 +1,243 @@
+"""
+Pluggable storage for attachment bytes.
+
+Blobs are content-addressed: the key of a stored blob is the hex SHA-256 of its
+bytes, so uploading the same file twice stores it once. Both backends consume
+uploads in fixed-size chunks and serve downloads as chunk iterators, so no
+attachment is ever held in memory as a whole.
+
+Backends:
+- LocalBlobStore: files under BLOB_ROOT, sharded as ab/cd/abcd...
+- S3BlobStore: any S3-compatible service (AWS, MinIO, a local moto server);
+  needs the optional `boto3` package.
+"""
+import hashlib
+import os
+import tempfile
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import BinaryIO, Iterator, NamedTuple, Optional, Tuple
+
+from app.config import settings
+
+CHUNK_SIZE = 64 * 1024
+
+
+class StoredBlob(NamedTuple):
+    key: str
+    sha256: str
+    size: int
+
+
+class BlobNotFound(Exception):
+    pass
+
+
+class BlobTooLarge(Exception):
+    pass
+
+
+class BlobStore:
+    """Interface implemented by every backend."""
+
+    def put(self, fileobj: BinaryIO, max_size: Optional[int] = None) -> StoredBlob:
+        """
+        Store the remaining contents of `fileobj`, reading it in chunks.
+
+        Raises BlobTooLarge (storing nothing) once more than `max_size` bytes were read.
+        """
+        raise NotImplementedError
+
+    def open(self, key: str, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        """Yield the bytes of `key` from `start` up to `end` (exclusive, None = EOF)."""
+        raise NotImplementedError
+
+    def exists(self, key: str) -> bool:
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def iter_keys(self) -> Iterator[Tuple[str, int, datetime]]:
+        """Yield (key, size, last written as naive UTC) for every stored blob, for garbage collection."""
+        raise NotImplementedError
+
+
+def _spool(fileobj: BinaryIO, dest: BinaryIO, max_size: Optional[int] = None):
+    """Copy `fileobj` into `dest` chunk by chunk, returning (sha256, size)."""
+    digest = hashlib.sha256()
+    size = 0
+    while True:
+        chunk = fileobj.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        digest.update(chunk)
+        dest.write(chunk)
+        size += len(chunk)
+        if max_size is not None and size > max_size:
+            raise BlobTooLarge(size)
+    return digest.hexdigest(), size
+
+
+class LocalBlobStore(BlobStore):
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        self.tmp_dir = os.path.join(self.root, "tmp")
+        os.makedirs(self.tmp_dir, exist_ok=True)
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key[2:4], key)
+
+    def put(self, fileobj: BinaryIO, max_size: Optional[int] = None) -> StoredBlob:
+        fd, tmp_path = tempfile.mkstemp(dir=self.tmp_dir)
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                sha256, size = _spool(fileobj, tmp, max_size)
+            path = self.path_for(sha256)
+            if os.path.exists(path):
+                os.unlink(tmp_path)
+                # a re-upload counts as a fresh write, so GC's grace period starts over
+                os.utime(path)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        return StoredBlob(key=sha256, sha256=sha256, size=size)
+
+    def open(self, key: str, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        try:
+            f = open(self.path_for(key), "rb")
+        except FileNotFoundError:
+            raise BlobNotFound(key)
+        return self._iter_file(f, start, end)
+
+    @staticmethod
+    def _iter_file(f, start, end):
+        with f:
+            f.seek(start)
+            remaining = None if end is None else end - start
+            while remaining is None or remaining > 0:
+                chunk = f.read(CHUNK_SIZE if remaining is None else min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self.path_for(key))
+
+    def delete(self, key: str) -> None:
+        try:
+            os.unlink(self.path_for(key))
+        except FileNotFoundError:
+            pass
+
+    def iter_keys(self) -> Iterator[Tuple[str, int, datetime]]:
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            if dirpath == self.root:
+                dirnames[:] = [d for d in dirnames if os.path.join(dirpath, d) != self.tmp_dir]
+            for name in filenames:
+                try:
+                    st = os.stat(os.path.join(dirpath, name))
+                except FileNotFoundError:
+                    continue
+                yield name, st.st_size, datetime.fromtimestamp(st.st_mtime, timezone.utc).replace(tzinfo=None)
+
+
+def _is_missing(exc: Exception) -> bool:
+    """True for the botocore error S3 raises for a key that does not exist."""
+    return getattr(exc, "response", {}).get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound")
+
+
+class S3BlobStore(BlobStore):
+    def __init__(self, bucket: str, prefix: str = "", endpoint_url: Optional[str] = None,
+                 region: Optional[str] = None, client=None):
+        if client is None:
+            try:
+                import boto3
+            except ImportError as exc:
+                raise RuntimeError("BLOB_BACKEND=s3 requires the 'boto3' package") from exc
+            client = boto3.client("s3", endpoint_url=endpoint_url, region_name=region)
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix
+
+    def _object_key(self, key: str) -> str:
+        return f"{self.prefix}{key[:2]}/{key[2:4]}/{key}"
+
+    def put(self, fileobj: BinaryIO, max_size: Optional[int] = None) -> StoredBlob:
+        # the key is the content hash, so spool to a local temp file first and
+        # upload once the hash is known; upload_fileobj streams it in parts
+        with tempfile.TemporaryFile() as tmp:
+            sha256, size = _spool(fileobj, tmp, max_size)
+            if not self._touch(sha256):
+                tmp.seek(0)
+                self.client.upload_fileobj(tmp, self.bucket, self._object_key(sha256))
+        return StoredBlob(key=sha256, sha256=sha256, size=size)
+
+    def _touch(self, key: str) -> bool:
+        """
+        Bump an existing object's LastModified; False if there is no such object.
+
+        Like the local store's utime: the orphan sweep keys its grace period on
+        that time, so a re-upload of a blob whose row was just released must
+        look fresh while its new `blobs` row is being committed.
+        """
+        object_key = self._object_key(key)
+        try:
+            # a copy onto itself is only accepted when something changes, hence REPLACE
+            self.client.copy_object(Bucket=self.bucket, Key=object_key, MetadataDirective="REPLACE",
+                                    CopySource={"Bucket": self.bucket, "Key": object_key})
+        except Exception as exc:
+            if _is_missing(exc):
+                return False
+            raise
+        return True
+
+    def open(self, key: str, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        params = {"Bucket": self.bucket, "Key": self._object_key(key)}
+        if start or end is not None:
+            params["Range"] = f"bytes={start}-{'' if end is None else end - 1}"
+        try:
+            obj = self.client.get_object(**params)
+        except self.client.exceptions.NoSuchKey:
+            raise BlobNotFound(key)
+        return obj["Body"].iter_chunks(CHUNK_SIZE)
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._object_key(key))
+        except Exception as exc:
+            if _is_missing(exc):
+                return False
+            raise
+        return True
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=self._object_key(key))
+
+    def iter_keys(self) -> Iterator[Tuple[str, int, datetime]]:
+        pages = self.client.get_paginator("list_objects_v2").paginate(Bucket=self.bucket, Prefix=self.prefix)
+        for page in pages:
+            for obj in page.get("Contents", []):
+                modified = obj["LastModified"].astimezone(timezone.utc).replace(tzinfo=None)
+                yield obj["Key"].rsplit("/", 1)[-1], obj["Size"], modified
+
+
+@lru_cache(maxsize=1)
+def get_blob_store() -> BlobStore:
+    """The configured blob store (built once per process)."""
+    if settings.blob_backend == "s3":
+        return S3BlobStore(
+            bucket=settings.blob_s3_bucket,
+            prefix=settings.blob_s3_prefix,
+            endpoint_url=settings.blob_s3_endpoint_url,
+            region=settings.blob_s3_region,
+        )
+    if settings.blob_backend == "local":
+        return LocalBlobStore(settings.blob_root)
+    raise RuntimeError(f"Unknown BLOB_BACKEND {settings.blob_backend!r}")
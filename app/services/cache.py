@@ -0,0 +1,359 @@
+"""
+Response cache for read endpoints.
+
+Entries are keyed on route path + normalized query string and carry tags
+("documents", "post:42", ...). Write paths invalidate by tag after they commit.
+Each tag also has a version number: an entry is only stored if none of its
+tags were invalidated while it was being built, so a slow reader can never put
+pre-write data back into the cache. A response read from a replica is not
+stored either while one of its tags was invalidated less than
+DB_REPLICA_STICKY_SECONDS ago: the replica may not have the write yet.
+
+Cold keys are rebuilt once: concurrent requests in a worker share a single
+in-flight build, and the Redis backend adds a short `SET NX` lock so other
+workers wait for the first one instead of all hitting the database (stampede
+protection).
+
+Backends:
+- MemoryCache: per-process TTL + LRU. Invalidation only reaches the process
+  that handled the write, so other workers serve stale entries until their
+  TTL runs out; use it with a single worker (or accept CACHE_TTL staleness)
+- RedisCache: anything speaking the Redis protocol via the optional `redis`
+  package (a `fakeredis` client can be passed in for local testing)
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Awaitable, Callable, Dict, Iterable, Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.services.serialization import render
+
+logger = logging.getLogger(__name__)
+
+
+class CacheBackend:
+    # backends doing network I/O are called from the threadpool
+    blocking = False
+
+    def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: bytes, ttl: int, tags: Iterable[str], versions: Dict[str, int]) -> bool:
+        """Store `value` unless one of `tags` moved past the version in `versions`."""
+        raise NotImplementedError
+
+    def tag_versions(self, tags: Iterable[str]) -> Dict[str, int]:
+        raise NotImplementedError
+
+    def invalidate_tags(self, tags: Iterable[str]) -> None:
+        raise NotImplementedError
+
+    def invalidated_since(self, tags: Iterable[str], since: float) -> bool:
+        """True if one of `tags` was invalidated after `since` (a time.time() value)."""
+        raise NotImplementedError
+
+    def acquire_lock(self, key: str, ttl: float) -> Optional[str]:
+        raise NotImplementedError
+
+    def release_lock(self, key: str, token: str) -> None:
+        raise NotImplementedError
+
+
+class MemoryCache(CacheBackend):
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (expires_at, value, tags)
+        self._tags: Dict[str, set] = {}
+        self._versions: Dict[str, int] = {}
+        self._invalidated_at: Dict[str, float] = {}
+        self._locks: Dict[str, tuple] = {}  # key -> (expires_at, token)
+        self._mutex = threading.Lock()
+
+    def get(self, key):
+        with self._mutex:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry:
+            for tag in entry[2]:
+                keys = self._tags.get(tag)
+                if keys:
+                    keys.discard(key)
+
+    def set(self, key, value, ttl, tags, versions):
+        tags = tuple(tags)
+        with self._mutex:
+            if any(self._versions.get(t, 0) != versions.get(t, 0) for t in tags):
+                return False
+            self._drop(key)
+            self._entries[key] = (time.monotonic() + ttl, value, tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+            return True
+
+    def tag_versions(self, tags):
+        with self._mutex:
+            return {t: self._versions.get(t, 0) for t in tags}
+
+    def invalidate_tags(self, tags):
+        now = time.time()
+        with self._mutex:
+            for tag in tags:
+                self._versions[tag] = self._versions.get(tag, 0) + 1
+                self._invalidated_at[tag] = now
+                for key in list(self._tags.pop(tag, ())):
+                    self._drop(key)
+
+    def invalidated_since(self, tags, since):
+        with self._mutex:
+            return any(self._invalidated_at.get(t, 0) > since for t in tags)
+
+    def acquire_lock(self, key, ttl):
+        now = time.monotonic()
+        with self._mutex:
+            held = self._locks.get(key)
+            if held and held[0] > now:
+                return None
+            token = uuid.uuid4().hex
+            self._locks[key] = (now + ttl, token)
+            return token
+
+    def release_lock(self, key, token):
+        with self._mutex:
+            if self._locks.get(key, (0, None))[1] == token:
+                del self._locks[key]
+
+
+# KEYS: entry, version keys..., tag keys... ARGV: value, ttl, cache key, expected versions...
+# The version check and the write run as one script, so no invalidation can land in between.
+_SET_IF_CURRENT = """
+local n = (#KEYS - 1) / 2
+for i = 1, n do
+    if tonumber(redis.call('get', KEYS[1 + i]) or '0') ~= tonumber(ARGV[3 + i]) then
+        return 0
+    end
+end
+redis.call('set', KEYS[1], ARGV[1], 'EX', ARGV[2])
+for i = 1, n do
+    redis.call('sadd', KEYS[1 + n + i], ARGV[3])
+    redis.call('expire', KEYS[1 + n + i], tonumber(ARGV[2]) * 2)
+end
+return 1
+"""
+
+# KEYS: version, tag, invalidated-at. ARGV: entry key prefix, time.time().
+# Bumps the version and drops the tagged entries together.
+_INVALIDATE_TAG = """
+redis.call('incr', KEYS[1])
+redis.call('set', KEYS[3], ARGV[2])
+for _, key in ipairs(redis.call('smembers', KEYS[2])) do
+    redis.call('del', ARGV[1] .. key)
+end
+redis.call('del', KEYS[2])
+return 1
+"""
+
+_RELEASE_LOCK = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class RedisCache(CacheBackend):
+    blocking = True
+
+    def __init__(self, url: Optional[str] = None, prefix: str = "intranet:cache:", client=None):
+        if client is None:
+            try:
+                import redis
+            except ImportError as exc:
+                raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package") from exc
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.prefix = prefix
+
+    def _k(self, kind, name):
+        return f"{self.prefix}{kind}:{name}"
+
+    def get(self, key):
+        return self.client.get(self._k("entry", key))
+
+    def tag_versions(self, tags):
+        tags = list(tags)
+        if not tags:
+            return {}
+        values = self.client.mget([self._k("version", t) for t in tags])
+        return {t: int(v or 0) for t, v in zip(tags, values)}
+
+    def set(self, key, value, ttl, tags, versions):
+        tags = list(tags)
+        keys = [self._k("entry", key)] + [self._k("version", t) for t in tags] + [self._k("tag", t) for t in tags]
+        args = [value, int(ttl), key] + [versions.get(t, 0) for t in tags]
+        return bool(self.client.eval(_SET_IF_CURRENT, len(keys), *keys, *args))
+
+    def invalidate_tags(self, tags):
+        for tag in tags:
+            self.client.eval(_INVALIDATE_TAG, 3, self._k("version", tag), self._k("tag", tag),
+                             self._k("invalidated", tag), self._k("entry", ""), repr(time.time()))
+
+    def invalidated_since(self, tags, since):
+        tags = list(tags)
+        if not tags:
+            return False
+        values = self.client.mget([self._k("invalidated", t) for t in tags])
+        return any(float(v) > since for v in values if v)
+
+    def acquire_lock(self, key, ttl):
+        token = uuid.uuid4().hex
+        if self.client.set(self._k("lock", key), token, nx=True, px=int(ttl * 1000)):
+            return token
+        return None
+
+    def release_lock(self, key, token):
+        self.client.eval(_RELEASE_LOCK, 1, self._k("lock", key), token)
+
+
+class ResponseCache:
+    def __init__(self, backend: Optional[CacheBackend], ttl: int = 60, lock_timeout: float = 5.0,
+                 replica_lag: float = 0):
+        self.backend = backend
+        self.ttl = ttl
+        self.lock_timeout = lock_timeout
+        # how long after an invalidation a replica may still return the old data
+        self.replica_lag = replica_lag
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    async def _call(self, method, *args):
+        if self.backend.blocking:
+            return await run_in_threadpool(method, *args)
+        return method(*args)
+
+    @staticmethod
+    def key_for(request: Request) -> str:
+        """Route path + query parameters sorted, with empty values dropped."""
+        params = sorted((k, v) for k, v in request.query_params.multi_items() if v != "")
+        query = "&".join(f"{k}={v}" for k, v in params)
+        return f"{request.url.path}?{query}"
+
+    async def cached_json(self, request: Request, tags: Iterable[str],
+                          build: Callable[[], Awaitable]) -> Response:
+        """Serve the JSON for `request` from cache, building it with `build()` on a miss."""
+        if self.backend is None:
+            return Response(content=render(await build()), media_type="application/json")
+        key = self.key_for(request)
+        tags = tuple(tags)
+        if getattr(request.state, "read_primary", False):
+            # the client wrote moments ago and reads from the primary (app.database.get_read_session):
+            # an entry built from a lagging replica must not hide its write, so rebuild and replace it
+            versions = await self._call(self.backend.tag_versions, tags)
+            body = render(await build())
+            await self._call(self.backend.set, key, body, self.ttl, tags, versions)
+            return Response(content=body, media_type="application/json", headers={"X-Cache": "BYPASS"})
+        body = await self._call(self.backend.get, key)
+        if body is not None:
+            return Response(content=body, media_type="application/json", headers={"X-Cache": "HIT"})
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            body = await asyncio.shield(inflight)
+        else:
+            future = asyncio.get_running_loop().create_future()
+            self._inflight[key] = future
+            try:
+                body = await self._fill(key, tags, build, getattr(request.state, "read_replica", False))
+                future.set_result(body)
+            except BaseException as exc:
+                future.set_exception(exc)
+                # nobody else may be waiting; don't log "exception never retrieved"
+                future.exception()
+                raise
+            finally:
+                del self._inflight[key]
+        return Response(content=body, media_type="application/json", headers={"X-Cache": "MISS"})
+
+    async def _fill(self, key, tags, build, from_replica: bool = False) -> bytes:
+        token = await self._call(self.backend.acquire_lock, key, self.lock_timeout)
+        if token is None:
+            # another worker is rebuilding this key: wait for its result, or for
+            # the lock if it did not store one
+            deadline = time.monotonic() + self.lock_timeout
+            while time.monotonic() < deadline:
+                await asyncio.sleep(0.05)
+                body = await self._call(self.backend.get, key)
+                if body is not None:
+                    return body
+                token = await self._call(self.backend.acquire_lock, key, self.lock_timeout)
+                if token is not None:
+                    break
+        try:
+            versions = await self._call(self.backend.tag_versions, tags)
+            store = not (from_replica and await self._call(
+                self.backend.invalidated_since, tags, time.time() - self.replica_lag))
+            body = render(await build())
+            if store:
+                await self._call(self.backend.set, key, body, self.ttl, tags, versions)
+            return body
+        finally:
+            if token is not None:
+                await self._call(self.backend.release_lock, key, token)
+
+    def invalidate_now(self, *tags: str):
+        """Drop every entry carrying one of `tags` (blocking; for worker threads)."""
+        if self.backend is not None:
+            try:
+                self.backend.invalidate_tags(tags)
+            except Exception:
+                logger.exception("Cache invalidation failed for %s", tags)
+
+    async def invalidate(self, *tags: str):
+        """Drop every entry carrying one of `tags`; call after the write has committed."""
+        if self.backend is not None:
+            if self.backend.blocking:
+                await run_in_threadpool(self.invalidate_now, *tags)
+            else:
+                self.invalidate_now(*tags)
+
+
+def get_response_cache() -> ResponseCache:
+    """The response cache for the configured CACHE_BACKEND (one per backend and process)."""
+    return _build_response_cache(settings.cache_backend)
+
+
+@lru_cache(maxsize=None)
+def _build_response_cache(name: str) -> ResponseCache:
+    if name == "memory":
+        if int(os.environ.get("WEB_CONCURRENCY", "1")) > 1:
+            logger.warning("CACHE_BACKEND=memory is per process: writes only invalidate the worker that "
+                           "handled them, so other workers may serve entries up to CACHE_TTL seconds old. "
+                           "Use CACHE_BACKEND=redis with several workers.")
+        backend = MemoryCache(max_entries=settings.cache_max_entries)
+    elif name == "redis":
+        backend = RedisCache(settings.cache_redis_url)
+    elif name == "none":
+        backend = None
+    else:
+        raise RuntimeError(f"Unknown CACHE_BACKEND {name!r}")
+    return ResponseCache(backend, ttl=settings.cache_ttl, lock_timeout=settings.cache_lock_timeout,
+                         replica_lag=settings.db_replica_sticky_seconds)
@@ -0,0 +1,60 @@
+"""
+Fill the response cache right after a worker starts.
+
+Each path in CACHE_WARM_PATHS is requested once through the application
+itself, with no socket and no HTTP client. Middleware, routing and
+ResponseCache.cached_json run exactly as for a real request, so the entries
+land under the keys that clients will ask for. A path only warms the cache
+for the query string it is listed with.
+"""
+import logging
+from typing import Dict, Iterable
+
+logger = logging.getLogger(__name__)
+
+
+async def _get(app, target: str) -> int:
+    """GET `target` ("/path?query") through the ASGI app; returns the response status."""
+    path, _, query = target.partition("?")
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "root_path": "",
+        "headers": [(b"host", b"cache-warmer"), (b"accept", b"application/json")],
+        "client": ("127.0.0.1", 0),
+        "server": ("cache-warmer", 80),
+    }
+    status = 0
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+async def warm(app, paths: Iterable[str]) -> Dict[str, int]:
+    """Request every path in turn; failures are logged and do not stop the rest."""
+    results = {}
+    for path in paths:
+        try:
+            results[path] = await _get(app, path)
+        except Exception:
+            logger.exception("cache warm-up request for %s failed", path)
+            results[path] = 500
+            continue
+        if results[path] >= 400:
+            logger.warning("cache warm-up request for %s returned %d", path, results[path])
+    logger.info("cache warmed: %s", results)
+    return results
@@ -0,0 +1,196 @@
+"""
+HTTP validators, conditional GET and byte-range support for attachment downloads.
+
+Attachments never change once uploaded (an attachment id always maps to the same
+bytes), so the content hash recorded at upload time is a strong ETag and the
+response can be cached by the browser indefinitely.
+
+Opening a blob can be a network round-trip (S3 get_object), so streams are
+opened in the threadpool, never on the event loop; StreamingResponse already
+iterates sync iterators there.
+"""
+import secrets
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+# Attachment ids are never reused and their bytes never change.
+IMMUTABLE_CACHE_CONTROL = "private, max-age=31536000, immutable"
+# A requested image variant that is not rendered yet is answered with the
+# original; the same URL serves the variant shortly after, so it must not stick.
+VARIANT_PENDING_CACHE_CONTROL = "private, max-age=60"
+MAX_RANGES = 16
+
+# (start, end) with `end` exclusive
+ByteRange = Tuple[int, int]
+# open_range(start, end) -> iterator over those bytes
+RangeReader = Callable[[int, int], Iterator[bytes]]
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def make_etag(sha256: str) -> str:
+    return f'"{sha256}"'
+
+
+def http_date(dt: datetime) -> str:
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return format_datetime(dt.astimezone(timezone.utc), usegmt=True)
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison function
+    candidates = [c.strip() for c in header.split(",")]
+    return any(c[2:] == etag if c.startswith("W/") else c == etag for c in candidates)
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    """Evaluate If-None-Match, falling back to If-Modified-Since (RFC 9110 13.2.2)."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        modified = last_modified if last_modified.tzinfo else last_modified.replace(tzinfo=timezone.utc)
+        return modified.replace(microsecond=0) <= since
+    return False
+
+
+def parse_range(header: str, size: int) -> Optional[List[ByteRange]]:
+    """
+    Parse a `Range: bytes=...` header against a resource of `size` bytes.
+
+    Returns None when the header should be ignored (other units, malformed),
+    raises RangeNotSatisfiable when no range overlaps the resource.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or not spec:
+        return None
+    ranges = []
+    for part in spec.split(","):
+        first, sep, last = part.strip().partition("-")
+        if not sep:
+            return None
+        try:
+            if first == "":
+                suffix = int(last)
+                if suffix == 0:
+                    continue
+                start, end = max(size - suffix, 0), size
+            else:
+                start = int(first)
+                if last == "":
+                    end = size
+                else:
+                    last_pos = int(last)
+                    if last_pos < start:
+                        return None
+                    end = min(last_pos + 1, size)
+        except ValueError:
+            return None
+        if start < size and start < end:
+            ranges.append((start, end))
+    if not ranges:
+        raise RangeNotSatisfiable()
+    if len(ranges) > MAX_RANGES:
+        # too many small ranges is a known amplification trick; coalesce instead
+        ranges = [(min(r[0] for r in ranges), max(r[1] for r in ranges))]
+    return _coalesce(ranges)
+
+
+def _coalesce(ranges: List[ByteRange]) -> List[ByteRange]:
+    merged: List[ByteRange] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _multipart_body(open_range: RangeReader, ranges: List[ByteRange], size: int,
+                    content_type: str, boundary: str):
+    parts = []
+    for start, end in ranges:
+        head = (
+            f"\r\n--{boundary}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Range: bytes {start}-{end - 1}/{size}\r\n\r\n"
+        ).encode("latin-1")
+        parts.append((head, start, end))
+    tail = f"\r\n--{boundary}--\r\n".encode("latin-1")
+    length = sum(len(head) + end - start for head, start, end in parts) + len(tail)
+
+    # opens each range lazily, while StreamingResponse iterates it in the threadpool
+    def body():
+        for head, start, end in parts:
+            yield head
+            yield from open_range(start, end)
+        yield tail
+
+    return body(), length
+
+
+async def serve_immutable(request: Request, *, open_range: RangeReader, size: int, content_type: str,
+                    sha256: str, last_modified: Optional[datetime], headers: dict,
+                    cache_control: str = IMMUTABLE_CACHE_CONTROL) -> Response:
+    """Build a 200/206/304/416 response for immutable content."""
+    etag = make_etag(sha256)
+    headers = dict(headers)
+    headers.update({"ETag": etag, "Cache-Control": cache_control, "Accept-Ranges": "bytes"})
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+
+    if is_not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and if_range is not None and if_range.strip() not in (etag, headers.get("Last-Modified")):
+        # the client's copy is stale: send the whole thing
+        range_header = None
+
+    ranges = None
+    if range_header:
+        try:
+            ranges = parse_range(range_header, size)
+        except RangeNotSatisfiable:
+            headers["Content-Range"] = f"bytes */{size}"
+            return Response(status_code=416, headers=headers)
+
+    if not ranges:
+        headers["Content-Length"] = str(size)
+        stream = await run_in_threadpool(open_range, 0, size)
+        return StreamingResponse(stream, media_type=content_type, headers=headers)
+
+    if len(ranges) == 1:
+        start, end = ranges[0]
+        headers["Content-Range"] = f"bytes {start}-{end - 1}/{size}"
+        headers["Content-Length"] = str(end - start)
+        stream = await run_in_threadpool(open_range, start, end)
+        return StreamingResponse(stream, status_code=206, media_type=content_type, headers=headers)
+
+    boundary = secrets.token_hex(16)
+    body, length = _multipart_body(open_range, ranges, size, content_type, boundary)
+    headers["Content-Length"] = str(length)
+    return StreamingResponse(
+        body,
+        status_code=206,
+        media_type=f"multipart/byteranges; boundary={boundary}",
+        headers=headers,
+    )
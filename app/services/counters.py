@@ -0,0 +1,60 @@
+"""
+Write-through engagement counters stored on the `posts` row.
+
+Counters are bumped with `UPDATE posts SET <counter> = <counter> + n` inside the
+same transaction as the row that caused the change, so a commit either records
+both or neither. `reconcile` recomputes them from the child tables to repair
+any drift (manual SQL, partial restores, etc.).
+"""
+from typing import Dict
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from app.models.post import Post, PostView, Reply, Share, Reaction
+
+# counter column -> table it counts
+COUNTER_SOURCES = {
+    "views_count": PostView,
+    "replies_count": Reply,
+    "shares_count": Share,
+    "reactions_count": Reaction,
+}
+
+
+def increment(db: Session, post_id: int, counter: str, delta: int = 1) -> bool:
+    """
+    Add `delta` to one counter of a post.
+
+    Returns False when the post does not exist, which lets write endpoints use
+    the UPDATE itself as the existence check.
+    """
+    column = getattr(Post, counter)
+    result = db.execute(
+        update(Post)
+        .where(Post.id == post_id)
+        .values({counter: column + delta})
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount > 0
+
+
+def reconcile(db: Session) -> Dict[str, int]:
+    """Recompute every counter from its source table; returns rows fixed per counter."""
+    fixed = {}
+    for counter, model in COUNTER_SOURCES.items():
+        actual = (
+            select(func.count(model.id))
+            .where(model.post_id == Post.id)
+            .correlate(Post)
+            .scalar_subquery()
+        )
+        result = db.execute(
+            update(Post)
+            .where(getattr(Post, counter) != actual)
+            .values({counter: actual})
+            .execution_options(synchronize_session=False)
+        )
+        fixed[counter] = result.rowcount
+    db.commit()
+    return fixed
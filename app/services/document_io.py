@@ -0,0 +1,205 @@
+"""
+Bulk import and export of HR policy documents.
+
+Import reads an NDJSON or CSV request body as it streams in, validates each
+row with DocumentCreate and writes the rows in batches, one transaction per
+batch. Rows are matched on `link`: a link that already exists updates that
+document, and a new one inserts a document. A bad row is reported with its
+line number and does not stop the rest.
+
+Export streams the table through a server-side cursor as NDJSON or CSV.
+"""
+import codecs
+import csv
+import io
+import json
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import bindparam, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.models.document import Document
+from app.schemas.document import DocumentCreate, DocumentResponse
+from app.services.locations import ensure_locations
+from app.services.serialization import dumps
+
+IMPORT_FORMATS = {
+    "text/csv": "csv",
+    "application/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+}
+IMPORT_BATCH_SIZE = 500
+EXPORT_CHUNK_SIZE = 1000
+# a huge file of bad rows should not produce a huge response
+MAX_REPORTED_ERRORS = 1000
+
+DOCUMENT_FIELDS = list(DocumentCreate.__fields__)
+WRITE_FIELDS = DOCUMENT_FIELDS + ["location_code"]
+EXPORT_FIELDS = list(DocumentResponse.__fields__)
+
+
+class ImportFormatError(ValueError):
+    pass
+
+
+def import_format(content_type: Optional[str], requested: Optional[str]) -> str:
+    if requested:
+        return requested
+    fmt = IMPORT_FORMATS.get((content_type or "").split(";")[0].strip().lower())
+    if fmt is None:
+        raise ImportFormatError("Send text/csv or application/x-ndjson, or pass ?format=csv|ndjson")
+    return fmt
+
+
+async def _lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, str]]:
+    """(line number, line) pairs from a byte stream; a UTF-8 BOM is skipped."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    number = 0
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *complete, pending = pending.split("\n")
+        for line in complete:
+            number += 1
+            yield number, line
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield number + 1, pending
+
+
+async def _ndjson_records(chunks) -> AsyncIterator[Tuple[int, object]]:
+    async for number, line in _lines(chunks):
+        if not line.strip():
+            continue
+        try:
+            yield number, json.loads(line)
+        except ValueError as exc:
+            yield number, exc
+
+
+async def _csv_records(chunks) -> AsyncIterator[Tuple[int, object]]:
+    header = None
+    record, start = "", 0
+    async for number, line in _lines(chunks):
+        if not record:
+            start = number
+            if not line.strip():
+                continue
+        record += line + "\n"
+        # a quoted field can span lines; quotes are doubled inside fields, so an
+        # odd running count means the record continues on the next line
+        if record.count('"') % 2:
+            continue
+        values = next(csv.reader([record]))
+        record = ""
+        if header is None:
+            header = [h.strip().lower() for h in values]
+            continue
+        if len(values) != len(header):
+            yield start, ValueError(f"expected {len(header)} columns, got {len(values)}")
+            continue
+        # empty cells mean "not given", so defaults (e.g. location) apply
+        yield start, {k: v for k, v in zip(header, values) if v != ""}
+    if record:
+        yield start, ValueError("unterminated quoted field")
+
+
+class ImportReport:
+    """Running totals for an import; keeps the first MAX_REPORTED_ERRORS row errors."""
+
+    def __init__(self):
+        self.created = 0
+        self.updated_ids: List[int] = []
+        self.failed = 0
+        self.errors: List[dict] = []
+
+    def add_error(self, line: int, messages: List[str]):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "errors": messages})
+
+
+def _error_messages(exc: Exception) -> List[str]:
+    if isinstance(exc, ValidationError):
+        return [f"{'.'.join(str(part) for part in e['loc'])}: {e['msg']}" for e in exc.errors()]
+    return [str(exc)]
+
+
+async def validated_batches(chunks, fmt: str, report: ImportReport,
+                            batch_size: int = IMPORT_BATCH_SIZE) -> AsyncIterator[List[Tuple[int, dict]]]:
+    """
+    Batches of (line, validated document dict). Rows that fail parsing or
+    validation are recorded on `report` instead.
+    """
+    records = _csv_records(chunks) if fmt == "csv" else _ndjson_records(chunks)
+    batch = []
+    async for line, record in records:
+        try:
+            if isinstance(record, Exception):
+                raise record
+            if not isinstance(record, dict):
+                raise ValueError("expected a JSON object")
+            batch.append((line, DocumentCreate(**record).dict()))
+        except (ValueError, TypeError) as exc:
+            report.add_error(line, _error_messages(exc))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def upsert_documents(db: Session, rows: Iterable[dict]) -> Tuple[int, List[int]]:
+    """
+    Insert or update documents matched by link in one transaction.
+
+    A link that appears twice in `rows` keeps the last one. Locations are
+    canonicalized like single writes. Returns (number inserted, ids of updated
+    documents).
+    """
+    by_link: Dict[str, dict] = {row["link"]: dict(row) for row in rows}
+    if not by_link:
+        return 0, []
+    resolved = ensure_locations(db, [row["location"] for row in by_link.values()])
+    for row in by_link.values():
+        row["location_code"], row["location"] = resolved[row["location"]]
+    existing = db.execute(select(Document.link, Document.id).where(Document.link.in_(list(by_link)))).all()
+    existing_links = {link for link, _ in existing}
+    inserts = [row for link, row in by_link.items() if link not in existing_links]
+    updates = [row for link, row in by_link.items() if link in existing_links]
+    if inserts:
+        db.execute(insert(Document), inserts)
+    if updates:
+        documents = Document.__table__
+        db.execute(
+            update(documents)
+            .where(documents.c.link == bindparam("b_link"))
+            .values({name: bindparam(f"b_{name}") for name in WRITE_FIELDS if name != "link"}),
+            [{f"b_{name}": row[name] for name in WRITE_FIELDS} for row in updates],
+        )
+    db.commit()
+    return len(inserts), [doc_id for _, doc_id in existing]
+
+
+def export_query():
+    return select(*[getattr(Document, name) for name in EXPORT_FIELDS]).order_by(Document.id)
+
+
+def ndjson_chunk(rows) -> bytes:
+    return b"".join(dumps(dict(row)) + b"\n" for row in rows)
+
+
+def csv_chunk(rows, header: bool = False) -> bytes:
+    out = io.StringIO()
+    writer = csv.writer(out)
+    if header:
+        writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        writer.writerow([
+            "" if row[name] is None else row[name].isoformat() if hasattr(row[name], "isoformat") else row[name]
+            for name in EXPORT_FIELDS
+        ])
+    return out.getvalue().encode("utf-8")
@@ -0,0 +1,192 @@
+"""
+Feed query layer for posts.
+
+A page of posts is loaded in a fixed number of statements no matter how many
+posts it holds: one for the total (unless skipped), one for the page itself (engagement counts
+are the materialized counter columns on `posts`), one selectin load each for
+attachment metadata and image variants, one GROUP BY for per-type reaction
+counts and one for the users who liked each post.
+
+Pages can be projected: `view=summary` swaps the HTML description and nested
+lists for the stored plain-text excerpt and counts, and `fields=` narrows
+either view further. Only the columns and child queries a projection needs are
+loaded; attachment bytes are never selected by any of them.
+"""
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Union
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session, load_only, selectinload
+
+from app.models.post import Post, Attachment, Reaction
+from app.services.pagination import after, count_rows, decode_cursor, encode_cursor
+from app.schemas.post import (
+    PostResponse, PostListResponse, PostSummary, PostSummaryListResponse, AttachmentMeta, AttachmentVariantMeta,
+)
+from app.services.reactions import reaction_counts_by_post
+
+# Columns needed for AttachmentMeta; the `data` blob is never selected.
+ATTACHMENT_META_COLUMNS = (
+    Attachment.id,
+    Attachment.post_id,
+    Attachment.filename,
+    Attachment.content_type,
+    Attachment.size,
+    Attachment.is_image,
+    Attachment.created_at,
+)
+
+# response field -> posts column
+POST_COLUMNS = {
+    "id": Post.id,
+    "title": Post.title,
+    "description": Post.description,
+    "excerpt": Post.excerpt,
+    "author": Post.author,
+    "announce_type": Post.announce_type,
+    "created_at": Post.created_at,
+    "updated_at": Post.updated_at,
+    "views_count": Post.views_count,
+    "replies_count": Post.replies_count,
+    "shares_count": Post.shares_count,
+    "reactions_count": Post.reactions_count,
+}
+
+VIEWS = {"full": PostResponse, "summary": PostSummary}
+# AttachmentMeta / AttachmentVariantMeta fields in declaration order, for plain dicts
+ATTACHMENT_FIELDS = [f for f in AttachmentMeta.__fields__ if f != "variants"]
+VARIANT_FIELDS = list(AttachmentVariantMeta.__fields__)
+PROJECTABLE_FIELDS = set(PostResponse.__fields__) | set(PostSummary.__fields__)
+
+
+class InvalidFields(ValueError):
+    pass
+
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """Validate a comma-separated `fields=` value; None means the whole view."""
+    if not fields:
+        return None
+    names = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in names if f not in PROJECTABLE_FIELDS]
+    if unknown:
+        raise InvalidFields(f"Unknown field(s): {', '.join(unknown)}")
+    return names
+
+
+def _posts_select(wanted: Sequence[str] = tuple(PostResponse.__fields__)):
+    # id and created_at are always loaded: they key the feed cursor
+    columns = {Post.id, Post.created_at} | {POST_COLUMNS[f] for f in wanted if f in POST_COLUMNS}
+    stmt = select(Post).options(load_only(*columns))
+    if "attachments" in wanted:
+        stmt = stmt.options(
+            selectinload(Post.attachments).options(
+                load_only(*ATTACHMENT_META_COLUMNS),
+                selectinload(Attachment.variants),
+            ),
+        )
+    return stmt
+
+
+def liked_users_by_post(db: Session, post_ids: List[int]) -> Dict[int, List[str]]:
+    """Return the users who reacted with 'like', grouped by post id."""
+    if not post_ids:
+        return {}
+    rows = db.execute(
+        select(Reaction.post_id, Reaction.user)
+        .where(Reaction.post_id.in_(post_ids), Reaction.reaction == "like")
+        .order_by(Reaction.post_id, Reaction.id)
+    )
+    liked: Dict[int, List[str]] = {}
+    for post_id, user in rows:
+        liked.setdefault(post_id, []).append(user)
+    return liked
+
+
+def attachment_counts_by_post(db: Session, post_ids: List[int]) -> Dict[int, int]:
+    if not post_ids:
+        return {}
+    rows = db.execute(
+        select(Attachment.post_id, func.count())
+        .where(Attachment.post_id.in_(post_ids))
+        .group_by(Attachment.post_id)
+    )
+    return dict(rows.all())
+
+
+def _post_values(p: Post, wanted: Sequence[str], liked: Dict[int, List[str]],
+                 reaction_counts: Dict[int, Dict[str, int]], attachment_counts: Dict[int, int],
+                 model: bool = True) -> dict:
+    values = {}
+    for name in wanted:
+        if name in POST_COLUMNS:
+            value = getattr(p, name)
+            values[name] = (value or 0) if name.endswith("_count") else value
+        elif name == "attachments":
+            values[name] = [AttachmentMeta.from_orm(a) for a in p.attachments] if model else [
+                {**{f: getattr(a, f) for f in ATTACHMENT_FIELDS},
+                 "variants": [{f: getattr(v, f) for f in VARIANT_FIELDS} for v in a.variants]}
+                for a in p.attachments
+            ]
+        elif name == "liked_users":
+            values[name] = liked.get(p.id, [])
+        elif name == "reaction_counts":
+            values[name] = reaction_counts.get(p.id, {})
+        elif name == "attachment_count":
+            values[name] = attachment_counts.get(p.id, 0)
+    return values
+
+
+def _build_responses(db: Session, posts: List[Post], view: str = "full",
+                     fields: Optional[List[str]] = None, plain: bool = False) -> list:
+    """Response models for `view`, or plain dicts (holding just `fields` when given)."""
+    model = VIEWS[view]
+    wanted = fields or list(model.__fields__)
+    ids = [p.id for p in posts]
+    liked = liked_users_by_post(db, ids) if "liked_users" in wanted else {}
+    reaction_counts = reaction_counts_by_post(db, ids) if "reaction_counts" in wanted else {}
+    attachment_counts = attachment_counts_by_post(db, ids) if "attachment_count" in wanted else {}
+    as_dicts = plain or bool(fields)
+    values = [_post_values(p, wanted, liked, reaction_counts, attachment_counts, model=not as_dicts) for p in posts]
+    if as_dicts:
+        return values
+    return [model(**v) for v in values]
+
+
+def list_post_page(db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None,
+                   count: str = "exact", view: str = "full", fields: Optional[List[str]] = None,
+                   plain: bool = False) -> Union[PostListResponse, PostSummaryListResponse, dict]:
+    """
+    Newest-first page of posts in a constant number of statements.
+
+    With `cursor` the page starts after the post the cursor points at and
+    `skip` is ignored; `count` picks exact / estimated / no total. `view` and
+    `fields` choose the projection (see the module docstring); with `fields`
+    or `plain` the page is returned as a plain dict (same JSON, no models).
+    """
+    stmt = select(Post)
+    total = count_rows(db, stmt, count)
+    page = _posts_select(fields or list(VIEWS[view].__fields__)).order_by(Post.created_at.desc(), Post.id.desc())
+    if cursor:
+        created_at, post_id = decode_cursor(cursor, "created", (datetime, int))
+        page = page.where(after((Post.created_at, Post.id), (created_at, post_id), descending=True))
+    else:
+        page = page.offset(skip)
+    posts = db.scalars(page.limit(limit + 1)).all()
+    next_cursor = None
+    if len(posts) > limit:
+        posts = posts[:limit]
+        next_cursor = encode_cursor("created", posts[-1].created_at, posts[-1].id)
+    entries = _build_responses(db, posts, view, fields, plain)
+    if fields or plain:
+        return {"total": total, "posts": entries, "next_cursor": next_cursor}
+    response_model = PostSummaryListResponse if view == "summary" else PostListResponse
+    return response_model(total=total, posts=entries, next_cursor=next_cursor)
+
+
+def get_post_response(db: Session, post_id: int) -> Optional[PostResponse]:
+    """Single post with the same shape as a feed entry, or None if missing."""
+    posts = db.scalars(_posts_select().where(Post.id == post_id)).all()
+    if not posts:
+        return None
+    return _build_responses(db, posts)[0]
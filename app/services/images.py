@@ -0,0 +1,163 @@
+"""
+Responsive variants (thumbnail, medium, ...) for image attachments.
+
+Variants are rendered off the request path on a small thread pool: the upload
+handlers only schedule attachment ids after their transaction commits. Widths
+and output format come from IMAGE_VARIANTS / IMAGE_VARIANT_FORMAT. Images that
+are already narrower than a variant width get no variant of that name; the
+attachment route then falls back to the original.
+"""
+import io
+import logging
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session, selectinload
+
+from app.config import settings
+from app.database import SessionLocal, dialect_insert
+from app.models.post import Attachment, AttachmentVariant
+from app.services import blob_refs
+from app.services.blob_store import BlobStore, get_blob_store
+from app.services.cache import get_response_cache
+
+logger = logging.getLogger(__name__)
+
+_FORMATS = {
+    "webp": ("WEBP", "image/webp"),
+    "jpeg": ("JPEG", "image/jpeg"),
+}
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def variant_specs() -> List[Tuple[str, int]]:
+    """Parse IMAGE_VARIANTS ("thumb:320,medium:1024") into (name, width) pairs."""
+    specs = []
+    for item in settings.image_variants.split(","):
+        name, _, width = item.strip().partition(":")
+        if name and width:
+            specs.append((name, int(width)))
+    return specs
+
+
+def render_variants(store: BlobStore, att: Attachment) -> List[AttachmentVariant]:
+    """Render the missing variants of one attachment and store their bytes."""
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        logger.warning("Pillow is not installed; skipping image variants")
+        return []
+
+    pil_format, content_type = _FORMATS[settings.image_variant_format]
+    existing = {v.name for v in att.variants}
+    wanted = [(name, width) for name, width in variant_specs() if name not in existing]
+    if not wanted or att.storage_key is None:
+        return []
+
+    created = []
+    with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as src:
+        for chunk in store.open(att.storage_key):
+            src.write(chunk)
+        src.seek(0)
+        with Image.open(src) as original:
+            image = ImageOps.exif_transpose(original)
+            if pil_format == "JPEG" and image.mode not in ("RGB", "L"):
+                image = image.convert("RGB")
+            elif image.mode not in ("RGB", "RGBA", "L"):
+                image = image.convert("RGBA")
+            for name, width in wanted:
+                if image.width <= width:
+                    continue
+                resized = image.copy()
+                resized.thumbnail((width, width * 10), Image.LANCZOS)
+                out = io.BytesIO()
+                resized.save(out, pil_format, quality=settings.image_variant_quality)
+                out.seek(0)
+                blob = store.put(out)
+                created.append(AttachmentVariant(
+                    attachment_id=att.id,
+                    name=name,
+                    content_type=content_type,
+                    width=resized.width,
+                    height=resized.height,
+                    size=blob.size,
+                    storage_key=blob.key,
+                    sha256=blob.sha256,
+                ))
+    return created
+
+
+def generate_variants(db: Session, attachment_ids: Iterable[int]) -> int:
+    """Generate and persist variants for the given attachments; returns how many were created."""
+    store = get_blob_store()
+    attachments = db.scalars(
+        select(Attachment)
+        .options(selectinload(Attachment.variants))
+        .where(Attachment.id.in_(list(attachment_ids)), Attachment.is_image.is_(True))
+    ).all()
+    created = 0
+    for att in attachments:
+        try:
+            variants = render_variants(store, att)
+        except Exception:
+            logger.exception("Could not render variants for attachment %s", att.id)
+            continue
+        inserted = _insert_variants(db, variants)
+        db.commit()
+        if inserted:
+            # cached post responses list the attachment's variants
+            get_response_cache().invalidate_now("posts", f"post:{att.post_id}")
+        created += inserted
+    return created
+
+
+def _insert_variants(db: Session, variants: List[AttachmentVariant]) -> int:
+    """
+    Insert the rendered variants, skipping any another worker (an upload job or
+    the backfill command) inserted first; returns how many rows were added.
+
+    Every stored blob gets a `blobs` row: a reference for each inserted
+    variant, and a released one for a variant that lost the race, so GC
+    reclaims its bytes instead of leaving them orphaned.
+    """
+    if not variants:
+        return 0
+    columns = ("attachment_id", "name", "content_type", "width", "height", "size", "storage_key", "sha256")
+    stmt = dialect_insert(db, AttachmentVariant).values([{c: getattr(v, c) for c in columns} for v in variants])
+    inserted = set(db.execute(
+        stmt.on_conflict_do_nothing(index_elements=["attachment_id", "name"]).returning(AttachmentVariant.name)
+    ).scalars())
+    blob_refs.acquire(db, [(v.storage_key, v.size) for v in variants])
+    blob_refs.release(db, [v.storage_key for v in variants if v.name not in inserted])
+    return len(inserted)
+
+
+def _run_job(attachment_ids: List[int]):
+    db = SessionLocal()
+    try:
+        generate_variants(db, attachment_ids)
+    except Exception:
+        logger.exception("Image variant job failed for attachments %s", attachment_ids)
+    finally:
+        db.close()
+
+
+def schedule_variants(attachment_ids: List[int]):
+    """Queue variant generation on the background pool (call after commit)."""
+    global _executor
+    if not attachment_ids or not settings.image_variants_enabled:
+        return
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=settings.image_workers, thread_name_prefix="image-variants")
+    _executor.submit(_run_job, list(attachment_ids))
+
+
+def shutdown(wait: bool = True):
+    """Let queued variant jobs finish; called on application shutdown."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=wait)
+        _executor = None
@@ -0,0 +1,338 @@
+"""
+Live post feed: new, edited and deleted posts plus engagement deltas, pushed
+to clients over SSE (`GET /api/posts/stream`) or a WebSocket
+(`/api/posts/ws`) instead of re-polling the feed.
+
+Write paths in app/routes/posts.py publish post events after their commit.
+Engagement (views, reactions, replies, shares) is not sent per write. Deltas
+are summed per post and emitted as one `engagement` event per post every
+LIVE_FEED_COALESCE_WINDOW seconds, e.g.
+`{"post_id": 7, "views_count": 12, "reaction_counts": {"like": 2}}`.
+
+Every event has an id, and the last LIVE_FEED_HISTORY events are kept. A
+client that reconnects with Last-Event-ID (sent automatically by
+EventSource) gets what it missed. A client whose id has aged out gets a
+`reset` event and should reload the feed.
+
+On PostgreSQL each worker publishes through NOTIFY and delivers what it
+hears on LISTEN. Every worker then sees every event, with the same ids, so
+a client can resume on any of them. Other databases deliver in-process
+only.
+
+A subscriber that falls LIVE_FEED_QUEUE_SIZE events behind is disconnected.
+It reconnects and resumes from history rather than holding memory for a
+stalled client.
+"""
+import asyncio
+import json
+import logging
+import os
+import queue
+import select
+import socket
+import threading
+import time
+from collections import Counter, deque
+from typing import AsyncIterator, Deque, Dict, List, NamedTuple, Optional, Set
+
+from fastapi.encoders import jsonable_encoder
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "posts_feed"
+# PostgreSQL caps a NOTIFY payload just below 8000 bytes
+MAX_NOTIFY_PAYLOAD = 7900
+POST_EVENT_FIELDS = {"id", "title", "excerpt", "author", "announce_type", "created_at", "updated_at"}
+ENGAGEMENT_COUNTERS = ("views_count", "reactions_count", "replies_count", "shares_count")
+
+_CLOSED = object()
+
+
+class FeedEvent(NamedTuple):
+    id: Optional[str]
+    event: str
+    data: dict
+
+    def to_json(self) -> dict:
+        return {"id": self.id, "event": self.event, "data": self.data}
+
+
+def encode_sse(event: FeedEvent) -> bytes:
+    lines = [f"id: {event.id}"] if event.id is not None else []
+    lines += [f"event: {event.event}", f"data: {json.dumps(event.data, separators=(',', ':'))}"]
+    return ("\n".join(lines) + "\n\n").encode("utf-8")
+
+
+def post_event_data(post) -> dict:
+    """The small, NOTIFY-sized part of a PostResponse that feed clients need to render a new entry."""
+    return jsonable_encoder(post, include=POST_EVENT_FIELDS)
+
+
+class Subscription:
+    def __init__(self, maxsize: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+
+
+class PgNotifier(threading.Thread):
+    """
+    One dedicated psycopg2 connection that both LISTENs and NOTIFYs.
+
+    `send` queues a payload and wakes the thread. Notifications, including
+    this worker's own, are handed to `deliver` on the event loop. After a
+    connection error the thread reconnects with backoff. `connected` is False
+    until it is back, and the broker delivers locally meanwhile.
+    """
+
+    def __init__(self, engine, loop: asyncio.AbstractEventLoop, deliver):
+        super().__init__(name="live-feed-notify", daemon=True)
+        self.engine = engine
+        self.loop = loop
+        self.deliver = deliver
+        self.connected = False
+        self._outbox: "queue.Queue[str]" = queue.Queue()
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._stopping = False
+
+    def send(self, payload: str) -> bool:
+        if not self.connected:
+            return False
+        self._outbox.put(payload)
+        self._wake_w.send(b"\0")
+        return True
+
+    def stop(self):
+        self._stopping = True
+        self._wake_w.send(b"\0")
+
+    def run(self):
+        backoff = 1.0
+        while not self._stopping:
+            try:
+                self._listen()
+                backoff = 1.0
+            except Exception:
+                self.connected = False
+                logger.exception("live feed LISTEN connection lost; retrying in %.0fs", backoff)
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+
+    def _listen(self):
+        raw = self.engine.raw_connection()
+        raw.detach()  # long-lived and autocommit: keep it out of the pool
+        conn = raw.driver_connection
+        try:
+            conn.autocommit = True
+            cursor = conn.cursor()
+            cursor.execute(f"LISTEN {CHANNEL}")
+            self.connected = True
+            while not self._stopping:
+                while True:
+                    try:
+                        payload = self._outbox.get_nowait()
+                    except queue.Empty:
+                        break
+                    cursor.execute("SELECT pg_notify(%s, %s)", (CHANNEL, payload))
+                readable, _, _ = select.select([conn, self._wake_r], [], [], 5.0)
+                if self._wake_r in readable:
+                    try:
+                        self._wake_r.recv(4096)
+                    except BlockingIOError:
+                        pass
+                conn.poll()
+                while conn.notifies:
+                    notify = conn.notifies.pop(0)
+                    try:
+                        event = FeedEvent(**json.loads(notify.payload))
+                    except (TypeError, ValueError):
+                        logger.warning("ignoring malformed live feed notification")
+                        continue
+                    self.loop.call_soon_threadsafe(self.deliver, event)
+        finally:
+            self.connected = False
+            raw.close()
+
+
+class LiveFeed:
+    def __init__(self, coalesce_window: float = 1.0, history_size: int = 1000, queue_size: int = 256,
+                 notify_engine=None):
+        self.coalesce_window = coalesce_window
+        self.queue_size = queue_size
+        self.notify_engine = notify_engine
+        self._history: Deque[FeedEvent] = deque(maxlen=history_size)
+        self._subscribers: Set[Subscription] = set()
+        self._pending: Dict[int, Counter] = {}
+        self._pending_lock = threading.Lock()  # engagement is also recorded from threadpool workers
+        self._last_id = 0
+        self._task: Optional[asyncio.Task] = None
+        self._notifier: Optional[PgNotifier] = None
+
+    def _start(self):
+        if self._task is not None:
+            return
+        loop = asyncio.get_running_loop()
+        self._task = loop.create_task(self._run())
+        if self.notify_engine is not None:
+            self._notifier = PgNotifier(self.notify_engine, loop, self._deliver)
+            self._notifier.start()
+
+    def _next_id(self) -> str:
+        # microseconds since the epoch, so ids from different workers interleave sensibly;
+        # the pid suffix keeps two workers from minting the same id
+        self._last_id = max(self._last_id + 1, time.time_ns() // 1000)
+        return f"{self._last_id}-{os.getpid()}"
+
+    def publish(self, event: str, data: dict):
+        """Send an event to every subscriber (on all workers when NOTIFY is available)."""
+        self._start()
+        feed_event = FeedEvent(self._next_id(), event, data)
+        if self._notifier is not None:
+            payload = json.dumps(feed_event.to_json(), separators=(",", ":"), default=str)
+            if len(payload) <= MAX_NOTIFY_PAYLOAD and self._notifier.send(payload):
+                return
+        self._deliver(feed_event)
+
+    def record_engagement(self, post_id: int, **deltas: int):
+        """Add to a post's pending deltas; safe to call from any thread."""
+        with self._pending_lock:
+            self._pending.setdefault(post_id, Counter()).update(deltas)
+        if self._task is None:
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                return  # a worker thread; the next call from the event loop starts the flusher
+            self._start()
+
+    def _deliver(self, event: FeedEvent):
+        self._history.append(event)
+        for subscription in list(self._subscribers):
+            try:
+                subscription.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                self._drop(subscription)
+
+    def _drop(self, subscription: Subscription):
+        self._subscribers.discard(subscription)
+        while not subscription.queue.empty():
+            subscription.queue.get_nowait()
+        subscription.queue.put_nowait(_CLOSED)
+
+    def _close(self, subscription: Subscription):
+        """End a subscriber's stream after the events already queued for it."""
+        self._subscribers.discard(subscription)
+        if subscription.queue.full():
+            subscription.queue.get_nowait()  # it resumes from history with Last-Event-ID
+        subscription.queue.put_nowait(_CLOSED)
+
+    def _flush_engagement(self):
+        with self._pending_lock:
+            pending, self._pending = self._pending, {}
+        for post_id, deltas in pending.items():
+            data = {"post_id": post_id}
+            data.update({name: deltas[name] for name in ENGAGEMENT_COUNTERS if deltas[name]})
+            reactions = {name[len("reaction:"):]: n for name, n in deltas.items() if name.startswith("reaction:") and n}
+            if reactions:
+                data["reaction_counts"] = reactions
+            if len(data) > 1:
+                self.publish("engagement", data)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.coalesce_window)
+            try:
+                self._flush_engagement()
+            except Exception:
+                logger.exception("live feed engagement flush failed")
+
+    def subscribe(self, last_event_id: Optional[str] = None) -> Subscription:
+        """
+        Register a subscriber, pre-loaded with the events after `last_event_id`.
+
+        An id that is no longer in the history yields a single `reset` event.
+        """
+        self._start()
+        subscription = Subscription(self.queue_size)
+        if last_event_id:
+            history: List[FeedEvent] = list(self._history)
+            ids = [event.id for event in history]
+            if last_event_id in ids:
+                backlog = history[ids.index(last_event_id) + 1:]
+            else:
+                latest = history[-1].id if history else None
+                backlog = [FeedEvent(latest, "reset", {"reason": "missed events are no longer available"})]
+            for event in backlog[-self.queue_size:]:
+                subscription.queue.put_nowait(event)
+        self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self._subscribers.discard(subscription)
+
+    async def listen(self, subscription: Subscription, heartbeat: float) -> AsyncIterator[Optional[FeedEvent]]:
+        """Yield events as they arrive, and None every `heartbeat` idle seconds; ends if dropped."""
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), heartbeat)
+            except asyncio.TimeoutError:
+                yield None
+                continue
+            if event is _CLOSED:
+                return
+            yield event
+
+    async def shutdown(self):
+        """Send pending engagement and stop the background task and LISTEN thread."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._flush_engagement()
+        self._task = None
+        if self._notifier is not None:
+            self._notifier.stop()
+            self._notifier = None
+        for subscription in list(self._subscribers):
+            # not _drop: the engagement flushed above is still delivered
+            self._close(subscription)
+
+
+# one feed per process, or one per LIVE_FEED_PG_NOTIFY value when apps with
+# different profiles share a process
+_feeds: Dict[bool, LiveFeed] = {}
+
+
+def get_live_feed() -> LiveFeed:
+    pg_notify = settings.live_feed_pg_notify
+    if pg_notify not in _feeds:
+        notify_engine = None
+        if pg_notify:
+            from app.database import get_engine
+            engine = get_engine()
+            if engine.dialect.name == "postgresql" and engine.dialect.driver == "psycopg2":
+                notify_engine = engine
+        _feeds[pg_notify] = LiveFeed(
+            coalesce_window=settings.live_feed_coalesce_window,
+            history_size=settings.live_feed_history,
+            queue_size=settings.live_feed_queue_size,
+            notify_engine=notify_engine,
+        )
+    return _feeds[pg_notify]
+
+
+def publish(event: str, data: dict):
+    get_live_feed().publish(event, data)
+
+
+def record_engagement(post_id: int, **deltas: int):
+    """Queue engagement deltas for the next coalesced event; thread-safe."""
+    get_live_feed().record_engagement(post_id, **deltas)
+
+
+async def shutdown():
+    for feed in list(_feeds.values()):
+        await feed.shutdown()
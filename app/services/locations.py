@@ -0,0 +1,105 @@
+"""
+Canonical document locations.
+
+Free-text input ("India", "india ", "IN") is mapped to a location code. Known
+places go through the alias table below. Anything else gets a code derived
+from the whole text (upper-cased, punctuation and spaces folded to "_"), so
+the same spelling always lands on the same code and filtering is an exact
+match on the indexed documents.location_code column. Names too long for the
+column keep a prefix plus a hash of the full text, never a bare truncation.
+Writes make sure the Location row exists and store its display name in
+documents.location, which keeps API responses and search text unchanged; a
+code already held by a name that does not map back to it is refused.
+"""
+import hashlib
+import re
+from typing import Dict, Iterable, List, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.database import dialect_insert
+from app.models.document import Document
+from app.models.location import Location
+
+# code -> (display name, aliases); aliases are compared case- and space-insensitively
+KNOWN_LOCATIONS = {
+    "IN": ("India", ("india", "in", "ind", "bharat")),
+    "US": ("USA", ("usa", "us", "u.s.", "u.s.a.", "united states", "united states of america", "america")),
+    "GB": ("UK", ("uk", "gb", "united kingdom", "great britain", "england", "britain")),
+}
+
+_ALIASES = {alias: code for code, (_, aliases) in KNOWN_LOCATIONS.items() for alias in aliases}
+_NON_CODE = re.compile(r"[\W_]+")
+CODE_LENGTH = 64
+_HASH_LENGTH = 8
+
+
+class LocationConflict(ValueError):
+    pass
+
+
+def _key(value: str) -> str:
+    return " ".join(value.split()).casefold()
+
+
+def canonical(value: str) -> Tuple[str, str]:
+    """(code, display name) for a location as typed by a user."""
+    key = _key(value)
+    code = _ALIASES.get(key)
+    if code:
+        return code, KNOWN_LOCATIONS[code][0]
+    code = _NON_CODE.sub("_", key.upper()).strip("_") or "UNKNOWN"
+    if len(code) > CODE_LENGTH:
+        digest = hashlib.sha256(code.encode()).hexdigest()[:_HASH_LENGTH].upper()
+        code = f"{code[:CODE_LENGTH - _HASH_LENGTH - 1]}_{digest}"
+    return code, " ".join(value.split())
+
+
+def codes_for(values: Iterable[str]) -> List[str]:
+    """Location codes to filter on; accepts repeated and comma-separated values."""
+    codes = []
+    for value in values:
+        for part in value.split(","):
+            if part.strip():
+                codes.append(canonical(part)[0])
+    return list(dict.fromkeys(codes))
+
+
+def ensure_locations(db: Session, values: Iterable[str]) -> Dict[str, Tuple[str, str]]:
+    """
+    Make sure a Location row exists for each value; does not commit.
+
+    Returns {value: (code, stored display name)}. Raises LocationConflict when
+    a code is already stored under a name that maps to a different code.
+    """
+    resolved = {value: canonical(value) for value in set(values)}
+    if not resolved:
+        return {}
+    wanted = dict(resolved.values())
+    db.execute(
+        dialect_insert(db, Location)
+        .values([{"code": code, "name": name} for code, name in sorted(wanted.items())])
+        .on_conflict_do_nothing(index_elements=[Location.code])
+    )
+    names = dict(db.execute(select(Location.code, Location.name).where(Location.code.in_(list(wanted)))).all())
+    for value, (code, _) in resolved.items():
+        if canonical(names[code])[0] != code:
+            raise LocationConflict(f"Location {value!r} clashes with existing location {names[code]!r}")
+    return {value: (code, names[code]) for value, (code, _) in resolved.items()}
+
+
+def resolve_location(db: Session, value: str) -> Tuple[str, str]:
+    """(code, display name) for one written location; creates the Location if new."""
+    return ensure_locations(db, [value])[value]
+
+
+def location_facets(db: Session) -> List[dict]:
+    """Document count per location, largest first."""
+    rows = db.execute(
+        select(Location.code, Location.name, func.count(Document.id).label("count"))
+        .join(Document, Document.location_code == Location.code)
+        .group_by(Location.code, Location.name)
+        .order_by(func.count(Document.id).desc(), Location.name)
+    )
+    return [dict(row) for row in rows.mappings()]
@@ -0,0 +1,98 @@
+"""
+Keyset (cursor) pagination helpers.
+
+A cursor is an opaque, URL-safe token holding the sort key of the last row of
+the previous page, e.g. ("created", "2025-12-12T10:00:00", 42). The next page
+is fetched with a row-value comparison on the matching composite index, so it
+costs the same at page 1 and page 10,000.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, Optional, Sequence, Tuple
+
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.orm import Session
+
+COUNT_MODES = ("exact", "estimate", "none")
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _encode_value(value: Any):
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    return value
+
+
+def _decode_value(value: Any, expected: type):
+    if expected is datetime:
+        if not (isinstance(value, dict) and isinstance(value.get("dt"), str)):
+            raise TypeError("expected a datetime")
+        return datetime.fromisoformat(value["dt"])
+    if isinstance(value, bool):
+        raise TypeError("booleans are not sort keys")
+    if expected is float and isinstance(value, int):
+        return float(value)
+    if not isinstance(value, expected):
+        raise TypeError(f"expected {expected.__name__}")
+    return value
+
+
+def encode_cursor(kind: str, *values: Any) -> str:
+    payload = json.dumps([kind, *[_encode_value(v) for v in values]], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, kind: str, types: Sequence[type]) -> Tuple[Any, ...]:
+    """
+    Decode a cursor produced by `encode_cursor(kind, ...)`.
+
+    `types` lists the expected type of each sort key (str, int, float or
+    datetime), so a tampered cursor fails here as InvalidCursor (a 400)
+    rather than later in the comparison or on the database.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise InvalidCursor("Malformed cursor")
+    if not isinstance(payload, list) or len(payload) != len(types) + 1 or payload[0] != kind:
+        raise InvalidCursor("Cursor does not match this listing or sort order")
+    try:
+        return tuple(_decode_value(v, t) for v, t in zip(payload[1:], types))
+    except (ValueError, TypeError):
+        raise InvalidCursor("Malformed cursor")
+
+
+def after(columns: Sequence, values: Sequence, descending: bool = False):
+    """WHERE clause selecting rows strictly after `values` in (columns) order."""
+    key = tuple_(*columns)
+    return key < tuple_(*values) if descending else key > tuple_(*values)
+
+
+def count_rows(db: Session, stmt, mode: str) -> Optional[int]:
+    """
+    Total for a listing.
+
+    - exact: COUNT(*) over the filtered statement
+    - estimate: the planner's row estimate on Postgres (cheap, approximate);
+      falls back to exact on other databases
+    - none: skip counting altogether
+    """
+    if mode == "none":
+        return None
+    count_stmt = select(func.count()).select_from(stmt.order_by(None).subquery())
+    if mode == "estimate" and db.bind.dialect.name == "postgresql":
+        compiled = stmt.order_by(None).compile(
+            dialect=db.bind.dialect, compile_kwargs={"render_postcompile": True}
+        )
+        plan = db.connection().exec_driver_sql(
+            "EXPLAIN (FORMAT JSON) " + str(compiled), compiled.params
+        ).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+    return db.scalar(count_stmt)
@@ -0,0 +1,101 @@
+"""
+Connection pool instrumentation.
+
+The queue pools below time every checkout, so we can see how long requests
+wait for a connection and how often the pool runs dry. Together with the
+pool's own size/checked-out/overflow counters this is what /health reports.
+"""
+import threading
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+
+class PoolMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record_wait(self, seconds: float, timed_out: bool = False):
+        with self._lock:
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+            if timed_out:
+                self.timeouts += 1
+
+    def record_checkout(self):
+        with self._lock:
+            self.checkouts += 1
+
+    def record_connect(self):
+        with self._lock:
+            self.connects += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "connects": self.connects,
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_seconds_total": round(self.wait_seconds_total, 6),
+                "wait_seconds_max": round(self.wait_seconds_max, 6),
+            }
+
+
+class _TimedCheckoutMixin:
+    """Times how long a checkout waits for a free connection."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            pool_metrics(self).record_wait(time.perf_counter() - start, timed_out)
+
+
+class InstrumentedQueuePool(_TimedCheckoutMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def pool_metrics(pool) -> PoolMetrics:
+    metrics = getattr(pool, "_intranet_metrics", None)
+    if metrics is None:
+        metrics = pool._intranet_metrics = PoolMetrics()
+    return metrics
+
+
+def instrument(engine):
+    """Attach connect/checkout counters to an engine's pool (works for any pool class)."""
+    pool = engine.pool
+    event.listen(pool, "connect", lambda *args: pool_metrics(pool).record_connect())
+    event.listen(pool, "checkout", lambda *args: pool_metrics(pool).record_checkout())
+    return engine
+
+
+def pool_status(engine) -> dict:
+    """Current occupancy of an engine's pool plus the accumulated metrics."""
+    pool = engine.pool
+    status = {"pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update({
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": pool._max_overflow,
+        })
+    status.update(pool_metrics(pool).snapshot())
+    return status
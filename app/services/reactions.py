@@ -0,0 +1,81 @@
+"""
+Idempotent post reactions.
+
+A user holds at most one row per (post, reaction type), which the
+uq_post_reactions_post_user_reaction constraint enforces. Adding a reaction
+uses INSERT ... ON CONFLICT DO NOTHING, so a double-click is a no-op. The
+reactions_count counter only moves when a row was actually inserted or
+deleted.
+"""
+from typing import Dict, List, Tuple
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.database import dialect_insert
+from app.models.post import Reaction
+from app.services import counters
+
+class PostNotFound(Exception):
+    pass
+
+
+def normalize(reaction: str) -> str:
+    return reaction.strip().lower()
+
+
+def add_reaction(db: Session, post_id: int, user: str, reaction: str) -> Tuple[Reaction, bool]:
+    """
+    Add a reaction unless the user already has it; commits.
+
+    Returns (row, created). Raises PostNotFound for unknown posts.
+    """
+    reaction = normalize(reaction)
+    try:
+        inserted = db.execute(
+            dialect_insert(db, Reaction)
+            .values(post_id=post_id, user=user, reaction=reaction)
+            .on_conflict_do_nothing(index_elements=["post_id", "user", "reaction"])
+            .returning(Reaction.id)
+        ).scalar()
+    except IntegrityError:  # foreign key: the post does not exist
+        db.rollback()
+        raise PostNotFound(post_id)
+    if inserted is not None and not counters.increment(db, post_id, "reactions_count"):
+        # no FK enforcement (SQLite): the counter UPDATE is the existence check
+        db.rollback()
+        raise PostNotFound(post_id)
+    db.commit()
+    row = db.scalars(
+        select(Reaction).where(Reaction.post_id == post_id, Reaction.user == user, Reaction.reaction == reaction)
+    ).one()
+    return row, inserted is not None
+
+
+def remove_reaction(db: Session, post_id: int, user: str, reaction: str) -> bool:
+    """Delete a user's reaction; commits. Returns False if there was nothing to delete."""
+    result = db.execute(
+        delete(Reaction)
+        .where(Reaction.post_id == post_id, Reaction.user == user, Reaction.reaction == normalize(reaction))
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount:
+        counters.increment(db, post_id, "reactions_count", -result.rowcount)
+    db.commit()
+    return bool(result.rowcount)
+
+
+def reaction_counts_by_post(db: Session, post_ids: List[int]) -> Dict[int, Dict[str, int]]:
+    """Return {post_id: {reaction: count}} for the given posts in one GROUP BY."""
+    if not post_ids:
+        return {}
+    rows = db.execute(
+        select(Reaction.post_id, Reaction.reaction, func.count())
+        .where(Reaction.post_id.in_(post_ids))
+        .group_by(Reaction.post_id, Reaction.reaction)
+    )
+    counts: Dict[int, Dict[str, int]] = {}
+    for post_id, reaction, n in rows:
+        counts.setdefault(post_id, {})[reaction] = n
+    return counts
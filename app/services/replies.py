@@ -0,0 +1,71 @@
+"""
+Keyset-paginated reply threads.
+
+Pages are read with the (post_id, created_at, id) index, in either direction.
+Each page is a single statement: posts LEFT JOIN post_replies. A post with no
+replies (or none left after the cursor) still yields one row with a NULL reply,
+so "post missing" and "no more replies" are told apart without a separate
+existence query.
+
+On SQLite stand-ins created_at is stored as text in two shapes: the server
+default writes "YYYY-MM-DD HH:MM:SS", rows given a Python datetime get
+microseconds appended. Compared as strings those never line up with the
+cursor value, so there both the ordering and the cursor comparison go
+through strftime(), which reads either shape.
+"""
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import and_, func, select
+from sqlalchemy.orm import Session
+
+from app.models.post import Post, Reply
+from app.schemas.post import ReplySchema
+from app.services.pagination import after, decode_cursor, encode_cursor
+
+REPLY_ORDERS = ("oldest", "newest")
+
+_SQLITE_TIMESTAMP = "%Y-%m-%d %H:%M:%f"
+
+
+def _cursor_kind(order: str) -> str:
+    return f"replies-{order}"
+
+
+def _timestamp(db: Session, value):
+    """created_at (or a cursor value) in a form that compares the same whichever way it was written."""
+    if db.bind.dialect.name == "sqlite":
+        return func.strftime(_SQLITE_TIMESTAMP, value)
+    return value
+
+
+def reply_page(db: Session, post_id: int, limit: int = 50, cursor: Optional[str] = None,
+               order: str = "oldest") -> Optional[Tuple[List[ReplySchema], Optional[str]]]:
+    """
+    One page of a post's replies and the cursor for the next page.
+
+    Returns None if the post does not exist. Raises InvalidCursor for a cursor
+    from another post ordering.
+    """
+    descending = order == "newest"
+    key_columns = (_timestamp(db, Reply.created_at), Reply.id)
+    join_on = [Reply.post_id == Post.id]
+    if cursor:
+        created_at, reply_id = decode_cursor(cursor, _cursor_kind(order), (datetime, int))
+        join_on.append(after(key_columns, (_timestamp(db, created_at), reply_id), descending=descending))
+    rows = db.execute(
+        select(Post.id, Reply)
+        .select_from(Post)
+        .outerjoin(Reply, and_(*join_on))
+        .where(Post.id == post_id)
+        .order_by(*[c.desc() if descending else c.asc() for c in key_columns])
+        .limit(limit + 1)
+    ).all()
+    if not rows:
+        return None
+    replies = [reply for _, reply in rows if reply is not None]
+    next_cursor = None
+    if len(replies) > limit:
+        replies = replies[:limit]
+        next_cursor = encode_cursor(_cursor_kind(order), replies[-1].created_at, replies[-1].id)
+    return [ReplySchema.from_orm(r) for r in replies], next_cursor
@@ -0,0 +1,224 @@
+"""
+Request and SQL instrumentation.
+
+RequestMetricsMiddleware (app/middleware.py) opens a RequestStats for each
+request in a context variable. The cursor events attached by
+`instrument_queries` add every statement's count and time to it. Context
+variables follow run_in_threadpool and AsyncSession.run_sync, so queries made
+by route code on either database path are counted. When the response is
+done, the request's latency and statement count go into per-route
+histograms. /metrics renders those histograms, the per-statement timings and
+the connection pool counters in Prometheus text format.
+
+Metrics are kept per process; with several workers, scrape each one.
+"""
+import contextvars
+import logging
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+
+logger = logging.getLogger("app.sql.slow")
+
+# seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+# statements per request
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+MAX_LOGGED_STATEMENT = 2000
+
+
+class Histogram:
+    """Cumulative-bucket histogram (Prometheus semantics: `le` upper bounds)."""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            total += count
+            yield bound, total
+
+
+class RequestStats:
+    __slots__ = ("sql_count", "sql_seconds")
+
+    def __init__(self):
+        self.sql_count = 0
+        self.sql_seconds = 0.0
+
+
+_current: contextvars.ContextVar[Optional[RequestStats]] = contextvars.ContextVar("request_stats", default=None)
+
+
+def begin_request() -> Tuple[RequestStats, contextvars.Token]:
+    stats = RequestStats()
+    return stats, _current.set(stats)
+
+
+def end_request(token: contextvars.Token):
+    _current.reset(token)
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latency: Dict[Tuple[str, str, str], Histogram] = {}
+        self.statements: Dict[Tuple[str, str], Histogram] = {}
+        self.request_sql_seconds: Dict[Tuple[str, str], float] = {}
+        self.queries = Histogram(QUERY_BUCKETS)
+        self.slow_queries = 0
+
+    def record_request(self, method: str, route: str, status: int, seconds: float, stats: RequestStats):
+        with self._lock:
+            key = (method, route, str(status))
+            if key not in self.latency:
+                self.latency[key] = Histogram(LATENCY_BUCKETS)
+            self.latency[key].observe(seconds)
+            route_key = (method, route)
+            if route_key not in self.statements:
+                self.statements[route_key] = Histogram(STATEMENT_BUCKETS)
+            self.statements[route_key].observe(stats.sql_count)
+            self.request_sql_seconds[route_key] = self.request_sql_seconds.get(route_key, 0.0) + stats.sql_seconds
+
+    def record_query(self, seconds: float, slow: bool):
+        with self._lock:
+            self.queries.observe(seconds)
+            if slow:
+                self.slow_queries += 1
+
+
+registry = Registry()
+
+
+def redact_parameters(parameters, executemany: bool = False):
+    """Bound parameters with each value replaced by its type name."""
+    if executemany:
+        return f"<{len(parameters)} parameter sets>"
+    if isinstance(parameters, dict):
+        return {key: f"<{type(value).__name__}>" for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [f"<{type(value).__name__}>" for value in parameters]
+    return "<redacted>"
+
+
+def instrument_queries(engine, slow_query_ms: float):
+    """Count and time every statement on `engine`; log the ones over `slow_query_ms`."""
+    threshold = slow_query_ms / 1000.0
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        stats = _current.get()
+        if stats is not None:
+            stats.sql_count += 1
+            stats.sql_seconds += elapsed
+        slow = threshold > 0 and elapsed >= threshold
+        registry.record_query(elapsed, slow)
+        if slow:
+            logger.warning(
+                "slow query (%.1f ms): %s params=%s",
+                elapsed * 1000,
+                " ".join(statement.split())[:MAX_LOGGED_STATEMENT],
+                redact_parameters(parameters, executemany),
+            )
+
+    return engine
+
+
+def server_timing(total_seconds: float, stats: RequestStats) -> str:
+    return (
+        f'app;dur={total_seconds * 1000:.1f}, '
+        f'db;dur={stats.sql_seconds * 1000:.1f};desc="{stats.sql_count} queries"'
+    )
+
+
+def _labels(**labels) -> str:
+    def escape(value: str) -> str:
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return ",".join(f'{name}="{escape(value)}"' for name, value in labels.items())
+
+
+def _bound(value: float) -> str:
+    return "+Inf" if value == float("inf") else repr(float(value))
+
+
+def _histogram_lines(name: str, histogram: Histogram, labels: dict):
+    prefix = _labels(**labels)
+    sep = "," if prefix else ""
+    for bound, total in histogram.cumulative():
+        yield f'{name}_bucket{{{prefix}{sep}le="{_bound(bound)}"}} {total}'
+    suffix = f"{{{prefix}}}" if prefix else ""
+    yield f"{name}_sum{suffix} {histogram.sum!r}"
+    yield f"{name}_count{suffix} {histogram.count}"
+
+
+def render_prometheus(pools: dict) -> str:
+    """All request, SQL and pool metrics in Prometheus text exposition format (0.0.4)."""
+    lines = []
+    with registry._lock:
+        lines += [
+            "# HELP http_request_duration_seconds Time from request start to the last response byte.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for (method, route, status), histogram in sorted(registry.latency.items()):
+            lines += _histogram_lines("http_request_duration_seconds", histogram,
+                                      {"method": method, "route": route, "status": status})
+        lines += [
+            "# HELP http_request_sql_statements SQL statements executed per request.",
+            "# TYPE http_request_sql_statements histogram",
+        ]
+        for (method, route), histogram in sorted(registry.statements.items()):
+            lines += _histogram_lines("http_request_sql_statements", histogram, {"method": method, "route": route})
+        lines += [
+            "# HELP http_request_sql_seconds_total Time spent in SQL statements, by route.",
+            "# TYPE http_request_sql_seconds_total counter",
+        ]
+        for (method, route), seconds in sorted(registry.request_sql_seconds.items()):
+            lines.append(f"http_request_sql_seconds_total{{{_labels(method=method, route=route)}}} {seconds!r}")
+        lines += [
+            "# HELP db_query_duration_seconds Duration of every SQL statement, in or out of a request.",
+            "# TYPE db_query_duration_seconds histogram",
+        ]
+        lines += _histogram_lines("db_query_duration_seconds", registry.queries, {})
+        lines += [
+            "# HELP db_slow_queries_total Statements slower than SLOW_QUERY_MS.",
+            "# TYPE db_slow_queries_total counter",
+            f"db_slow_queries_total {registry.slow_queries}",
+        ]
+
+    gauges = {
+        "size": "Configured pool size.",
+        "checked_out": "Connections currently checked out.",
+        "overflow": "Connections open beyond the pool size.",
+    }
+    counters = {
+        "connects": "Connections opened.",
+        "checkouts": "Connection checkouts.",
+        "timeouts": "Checkouts that timed out waiting for a connection.",
+        "wait_seconds_total": "Time spent waiting for a connection.",
+    }
+    for key, help_text in gauges.items():
+        lines += [f"# HELP db_pool_{key} {help_text}", f"# TYPE db_pool_{key} gauge"]
+        lines += [f'db_pool_{key}{{pool="{name}"}} {status[key]}' for name, status in pools.items() if key in status]
+    for key, help_text in counters.items():
+        metric = key if key.endswith("_total") else f"{key}_total"
+        lines += [f"# HELP db_pool_{metric} {help_text}", f"# TYPE db_pool_{metric} counter"]
+        lines += [f'db_pool_{metric}{{pool="{name}"}} {status[key]}' for name, status in pools.items()]
+    return "\n".join(lines) + "\n"
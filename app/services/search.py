@@ -0,0 +1,126 @@
+"""
+Ranked full-text search over documents and posts.
+
+On Postgres the query runs against the generated `search_vector` columns and
+their GIN indexes (websearch_to_tsquery + ts_rank_cd, snippets from
+ts_headline). SQLite stand-ins use the FTS5 tables maintained by triggers
+(bm25 + snippet). Both backends order by (rank desc, kind, id) and page with
+the same keyset cursor. ts_rank_cd returns float4; it is cast to float8 so the
+rank stored in the cursor compares equal to the row it came from, and hits
+that tie on rank are neither skipped nor repeated at a page boundary.
+
+Snippets are built from stored text, which may itself contain markup (a
+description with "&lt;img ...&gt;" is indexed as "<img ...>"). The database
+marks matches with private-use sentinel characters; the whole snippet is then
+HTML-escaped and only the sentinels become <mark> tags.
+"""
+import html
+from typing import List, Optional, Sequence, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.models.post import POST_BODY_TEXT_SQL
+from app.schemas.search import SearchHit
+from app.services.pagination import decode_cursor, encode_cursor
+
+SEARCH_KINDS = ("document", "post")
+
+# match delimiters handed to ts_headline/snippet, swapped for <mark> after escaping
+MARK_START = "\ue000"
+MARK_STOP = "\ue001"
+
+_KEYSET = "WHERE rank < :c_rank OR (rank = :c_rank AND (kind > :c_kind OR (kind = :c_kind AND id > :c_id)))"
+
+_PG_HITS = {
+    "document": (
+        "SELECT 'document' AS kind, d.id, ts_rank_cd(d.search_vector, q.query)::float8 AS rank "
+        "FROM documents d, q WHERE d.search_vector @@ q.query"
+    ),
+    "post": (
+        "SELECT 'post' AS kind, p.id, ts_rank_cd(p.search_vector, q.query)::float8 AS rank "
+        "FROM posts p, q WHERE p.search_vector @@ q.query"
+    ),
+}
+
+_PG_SQL = """
+WITH q AS (SELECT websearch_to_tsquery('english', :q) AS query),
+hits AS ({hits}),
+page AS (SELECT * FROM hits {keyset} ORDER BY rank DESC, kind, id LIMIT :limit)
+SELECT page.kind, page.id, page.rank,
+       coalesce(d.name, p.title) AS title,
+       ts_headline(
+           'english',
+           CASE WHEN page.kind = 'document' THEN coalesce(d.description, '')
+                ELSE {post_body} END,
+           q.query,
+           :headline_options
+       ) AS snippet
+FROM page
+CROSS JOIN q
+LEFT JOIN documents d ON page.kind = 'document' AND d.id = page.id
+LEFT JOIN posts p ON page.kind = 'post' AND p.id = page.id
+ORDER BY page.rank DESC, page.kind, page.id
+"""
+
+_SQLITE_HITS = {
+    "document": (
+        "SELECT 'document' AS kind, rowid AS id, -bm25(documents_fts) AS rank, title, "
+        "snippet(documents_fts, 1, :mark_start, :mark_stop, '...', 24) AS snippet "
+        "FROM documents_fts WHERE documents_fts MATCH :q"
+    ),
+    "post": (
+        "SELECT 'post' AS kind, rowid AS id, -bm25(posts_fts) AS rank, title, "
+        "snippet(posts_fts, 1, :mark_start, :mark_stop, '...', 24) AS snippet "
+        "FROM posts_fts WHERE posts_fts MATCH :q"
+    ),
+}
+
+_SQLITE_SQL = "SELECT * FROM ({hits}) {keyset} ORDER BY rank DESC, kind, id LIMIT :limit"
+
+
+def _fts5_query(q: str) -> str:
+    """Quote every term so user input can never be parsed as FTS5 syntax."""
+    return " ".join('"' + term.replace('"', '""') + '"' for term in q.split())
+
+
+def _snippet_html(snippet: Optional[str]) -> Optional[str]:
+    """Escape a raw snippet, keeping only the match markers as <mark> tags."""
+    if snippet is None:
+        return None
+    return html.escape(snippet).replace(MARK_START, "<mark>").replace(MARK_STOP, "</mark>")
+
+
+def search(db: Session, q: str, kinds: Sequence[str] = SEARCH_KINDS, limit: int = 20,
+           cursor: Optional[str] = None) -> Tuple[List[SearchHit], Optional[str]]:
+    """Return one page of hits and the cursor for the next page (None on the last page)."""
+    params = {"limit": limit + 1}
+    keyset = ""
+    if cursor:
+        params["c_rank"], params["c_kind"], params["c_id"] = decode_cursor(cursor, "search", (float, str, int))
+        keyset = _KEYSET
+
+    if db.bind.dialect.name == "postgresql":
+        params["q"] = q
+        params["headline_options"] = (
+            f"StartSel={MARK_START}, StopSel={MARK_STOP}, MaxWords=35, MinWords=15, MaxFragments=2"
+        )
+        sql = _PG_SQL.format(
+            hits=" UNION ALL ".join(_PG_HITS[k] for k in kinds),
+            keyset=keyset,
+            post_body=POST_BODY_TEXT_SQL.replace("description", "p.description"),
+        )
+    else:
+        params["q"] = _fts5_query(q)
+        if not params["q"]:
+            return [], None
+        params["mark_start"], params["mark_stop"] = MARK_START, MARK_STOP
+        sql = _SQLITE_SQL.format(hits=" UNION ALL ".join(_SQLITE_HITS[k] for k in kinds), keyset=keyset)
+
+    rows = db.execute(text(sql), params).mappings().all()
+    hits = [SearchHit(**{**row, "snippet": _snippet_html(row["snippet"])}) for row in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        last = hits[-1]
+        next_cursor = encode_cursor("search", last.rank, last.kind, last.id)
+    return hits, next_cursor
@@ -0,0 +1,45 @@
+"""
+JSON encoding for response bodies.
+
+FastAPI's default path builds a Pydantic model per row and runs it through
+`jsonable_encoder` before `json.dumps`. With FAST_JSON enabled the list
+endpoints build plain dicts straight from query results instead, and those are
+encoded here in one call, by orjson when it is installed and by the stdlib
+otherwise. Both paths produce the same bytes: compact separators, UTF-8,
+ISO-8601 datetimes.
+"""
+import json
+from datetime import date, datetime
+from typing import Any
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # optional speed-up
+    orjson = None
+
+
+def _default(obj: Any):
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, BaseModel):
+        return obj.dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """Encode plain data (dicts, lists, scalars, datetimes) to compact UTF-8 JSON."""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default)
+    return json.dumps(content, default=_default, ensure_ascii=False, allow_nan=False,
+                      separators=(",", ":")).encode("utf-8")
+
+
+def render(content: Any) -> bytes:
+    """Response body for `content`: plain data takes the fast encoder, models FastAPI's."""
+    if isinstance(content, (dict, list)):
+        return dumps(content)
+    return JSONResponse(jsonable_encoder(content)).body
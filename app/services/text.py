@@ -0,0 +1,68 @@
+"""Plain-text helpers shared by search indexing and feed excerpts."""
+import re
+from html import escape, unescape
+from html.parser import HTMLParser
+
+_WHITESPACE = re.compile(r"\s+")
+
+# tags whose text is never shown to the reader
+_SKIP_TAGS = {"script", "style", "head", "title"}
+
+
+class _TextExtractor(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self._skip = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _SKIP_TAGS:
+            self._skip += 1
+        # block-level tags separate words even without whitespace in the source
+        self.parts.append(" ")
+
+    def handle_endtag(self, tag):
+        if tag in _SKIP_TAGS and self._skip:
+            self._skip -= 1
+        self.parts.append(" ")
+
+    def handle_data(self, data):
+        if not self._skip:
+            self.parts.append(data)
+
+
+def strip_html(html) -> str:
+    """Visible text of an HTML fragment with entities decoded and whitespace collapsed."""
+    if not html:
+        return ""
+    parser = _TextExtractor()
+    try:
+        parser.feed(html)
+        parser.close()
+        text = "".join(parser.parts)
+    except Exception:
+        text = unescape(re.sub(r"<[^>]*>", " ", html))
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def make_excerpt(html, length: int = 200) -> str:
+    """
+    HTML-escaped plain-text preview of an HTML fragment, cut at a word boundary.
+
+    strip_html decodes entities, so text the author wrote as "&lt;img ...&gt;"
+    comes back as markup; escaping again keeps the excerpt safe to render like
+    the description it came from. The result, ellipsis included, is at most
+    `length` characters once escaped.
+    """
+    text = strip_html(html)
+    if len(escape(text)) <= length:
+        return escape(text)
+    used = 0
+    for end, char in enumerate(text):
+        used += len(escape(char))
+        if used > length - 1:  # keep room for the ellipsis
+            break
+    cut = text[:end]
+    if " " in cut:
+        cut = cut[:cut.rindex(" ")]
+    return escape(cut.rstrip(" ,;:.-")) + "…"
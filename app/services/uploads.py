@@ -0,0 +1,139 @@
+"""
+Upload ingestion: size limits, MIME sniffing and storage.
+
+Each file is copied into the blob store chunk by chunk. The same pass hashes
+the bytes and keeps the first few hundred bytes for content sniffing, so
+nothing ever holds a whole file in memory. A post's files are stored
+concurrently in the threadpool.
+
+The content type is sniffed from magic numbers. The client's declared type is
+only kept to name a sniffed zip/OLE container more precisely (a .docx or .xls),
+and only for office document types. Anything sniffing does not recognise is
+stored as application/octet-stream, so neither `is_image` nor the type the
+attachment is served with can be chosen by the uploader (an SVG or HTML file
+declared as such stays a download).
+"""
+import asyncio
+from typing import BinaryIO, List, NamedTuple, Optional, Tuple
+
+from fastapi import HTTPException, UploadFile, status
+from starlette.concurrency import run_in_threadpool
+
+from app.services.blob_store import BlobTooLarge, StoredBlob, get_blob_store
+
+SNIFF_BYTES = 512
+
+# (offset, magic bytes, content type)
+MAGIC_NUMBERS = (
+    (0, b"\x89PNG\r\n\x1a\n", "image/png"),
+    (0, b"\xff\xd8\xff", "image/jpeg"),
+    (0, b"GIF87a", "image/gif"),
+    (0, b"GIF89a", "image/gif"),
+    (8, b"WEBP", "image/webp"),
+    (0, b"BM", "image/bmp"),
+    (0, b"II*\x00", "image/tiff"),
+    (0, b"MM\x00*", "image/tiff"),
+    (0, b"%PDF-", "application/pdf"),
+    (0, b"PK\x03\x04", "application/zip"),
+    (0, b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1", "application/x-ole-storage"),  # legacy .doc/.xls/.ppt
+)
+
+# raster formats browsers render as images without running anything
+RASTER_IMAGE_TYPES = frozenset(t for _, _, t in MAGIC_NUMBERS if t.startswith("image/"))
+
+# served inline; every other type is sent as a download
+INLINE_TYPES = RASTER_IMAGE_TYPES | {"application/pdf"}
+
+# containers whose declared type may be more specific than what sniffing can
+# tell (a .docx is a zip, a .xls an OLE file): declared-type prefixes accepted
+_GENERIC_CONTAINERS = {
+    "application/zip": ("application/vnd.openxmlformats-officedocument.", "application/vnd.oasis.opendocument."),
+    "application/x-ole-storage": ("application/msword", "application/vnd.ms-"),
+}
+
+_SNIFFED_TYPES = frozenset(t for _, _, t in MAGIC_NUMBERS)
+_REFINED_PREFIXES = tuple(p for prefixes in _GENERIC_CONTAINERS.values() for p in prefixes)
+
+UNKNOWN_CONTENT_TYPE = "application/octet-stream"
+
+
+def sniff_content_type(head: bytes) -> Optional[str]:
+    for offset, magic, content_type in MAGIC_NUMBERS:
+        if head[offset:offset + len(magic)] == magic:
+            if content_type == "image/webp" and not head.startswith(b"RIFF"):
+                continue
+            return content_type
+    return None
+
+
+def _refine_container(sniffed: str, declared: Optional[str]) -> str:
+    prefixes = _GENERIC_CONTAINERS.get(sniffed)
+    if prefixes and declared and declared.startswith(prefixes):
+        return declared
+    return sniffed
+
+
+def serving_type(content_type: Optional[str]) -> Tuple[str, str]:
+    """
+    (Content-Type, Content-Disposition type) to serve a stored attachment with.
+
+    Rows stored before sniffing was enforced may carry any declared type, so
+    only types `_store_one` can produce are passed through.
+    """
+    content_type = content_type or UNKNOWN_CONTENT_TYPE
+    if content_type not in _SNIFFED_TYPES and not content_type.startswith(_REFINED_PREFIXES):
+        content_type = UNKNOWN_CONTENT_TYPE
+    return content_type, "inline" if content_type in INLINE_TYPES else "attachment"
+
+
+class _HeadRecorder:
+    """File wrapper that remembers the first SNIFF_BYTES bytes read through it."""
+
+    def __init__(self, fileobj: BinaryIO):
+        self.fileobj = fileobj
+        self.head = b""
+
+    def read(self, size: int = -1) -> bytes:
+        chunk = self.fileobj.read(size)
+        if len(self.head) < SNIFF_BYTES:
+            self.head += chunk[:SNIFF_BYTES - len(self.head)]
+        return chunk
+
+
+class StoredUpload(NamedTuple):
+    filename: Optional[str]
+    content_type: str
+    is_image: bool
+    blob: StoredBlob
+
+
+def _too_large(filename: Optional[str], max_file_size: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"File {filename!r} exceeds the {max_file_size} byte upload limit",
+    )
+
+
+def _store_one(f: UploadFile, max_file_size: int) -> StoredUpload:
+    reader = _HeadRecorder(f.file)
+    try:
+        blob = get_blob_store().put(reader, max_size=max_file_size)
+    except BlobTooLarge:
+        raise _too_large(f.filename, max_file_size)
+    sniffed = sniff_content_type(reader.head)
+    content_type = _refine_container(sniffed, f.content_type) if sniffed else UNKNOWN_CONTENT_TYPE
+    return StoredUpload(f.filename, content_type, content_type in RASTER_IMAGE_TYPES, blob)
+
+
+async def store_uploads(files: Optional[List[UploadFile]], max_file_size: int) -> List[StoredUpload]:
+    """
+    Store every upload in the blob store, all files concurrently.
+
+    Raises 413 before any copying when the parser already knows a file is too
+    big, or as soon as a copy passes `max_file_size` bytes.
+    """
+    files = files or []
+    for f in files:
+        if f.size is not None and f.size > max_file_size:
+            raise _too_large(f.filename, max_file_size)
+    return list(await asyncio.gather(*[run_in_threadpool(_store_one, f, max_file_size) for f in files]))
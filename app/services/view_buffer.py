@@ -0,0 +1,175 @@
+"""
+Buffered ingestion for post views.
+
+`POST /api/posts/{id}/views` used to cost a SELECT, an INSERT and a commit per
+view. Views now go into a bounded in-memory queue and a background task
+writes them in batches: one multi-row INSERT into post_views plus one counter
+UPDATE per affected post, in a single transaction. A batch is flushed once it
+reaches VIEW_BUFFER_BATCH_SIZE or VIEW_BUFFER_FLUSH_INTERVAL seconds after its
+first view, and whatever is left is flushed on shutdown.
+
+Repeat views of the same post by the same user inside VIEW_DEDUP_WINDOW seconds
+are dropped before they reach the queue. The window is tracked per process.
+
+When the queue is full, producers wait up to VIEW_BUFFER_ENQUEUE_TIMEOUT
+seconds and then get `ViewBufferFull` (the routes answer 503) instead of
+growing memory without bound.
+"""
+import asyncio
+import logging
+import time
+from collections import Counter, OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import bindparam, insert, select, update
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.post import Post, PostView
+from app.services import live_feed
+from app.services.cache import get_response_cache
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class ViewBufferFull(Exception):
+    pass
+
+
+def record_views(db: Session, events: Iterable[Tuple[int, str]]) -> Dict[int, int]:
+    """
+    Insert view rows and bump views_count for each post in one transaction.
+
+    Views for posts that no longer exist are dropped. Returns {post_id: views
+    added} for the posts that were updated.
+    """
+    events = list(events)
+    if not events:
+        return {}
+    existing = set(db.scalars(select(Post.id).where(Post.id.in_({pid for pid, _ in events}))))
+    rows = [{"post_id": pid, "user": user} for pid, user in events if pid in existing]
+    if not rows:
+        return {}
+    db.execute(insert(PostView.__table__).values(rows))
+    posts = Post.__table__
+    added = Counter(r["post_id"] for r in rows)
+    db.execute(
+        update(posts)
+        .where(posts.c.id == bindparam("pid"))
+        .values(views_count=posts.c.views_count + bindparam("n")),
+        [{"pid": pid, "n": n} for pid, n in added.items()],
+    )
+    db.commit()
+    return dict(added)
+
+
+def _flush_batch(events: List[Tuple[int, str]]):
+    db = SessionLocal()
+    try:
+        post_ids = record_views(db, events)
+    finally:
+        db.close()
+    if post_ids:
+        get_response_cache().invalidate_now("posts", *[f"post:{pid}" for pid in post_ids])
+    for post_id, views in post_ids.items():
+        live_feed.record_engagement(post_id, views_count=views)
+
+
+class ViewBuffer:
+    def __init__(self, batch_size: int = 500, flush_interval: float = 1.0, max_queue: int = 10000,
+                 dedup_window: float = 1800, dedup_max_keys: int = 100000, enqueue_timeout: float = 1.0):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dedup_window = dedup_window
+        self.dedup_max_keys = dedup_max_keys
+        self.enqueue_timeout = enqueue_timeout
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._seen: "OrderedDict[Tuple[int, str], float]" = OrderedDict()
+        self._task: Optional[asyncio.Task] = None
+
+    def _is_duplicate(self, key: Tuple[int, str]) -> bool:
+        now = time.monotonic()
+        # entries are kept in insertion (= time) order, so expired ones sit at the front
+        while self._seen:
+            oldest, seen_at = next(iter(self._seen.items()))
+            if seen_at > now - self.dedup_window and len(self._seen) < self.dedup_max_keys:
+                break
+            del self._seen[oldest]
+        if key in self._seen:
+            return True
+        self._seen[key] = now
+        return False
+
+    async def add(self, post_id: int, user: str) -> bool:
+        """Queue one view; returns False if it was a duplicate inside the window."""
+        if self._is_duplicate((post_id, user)):
+            return False
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        try:
+            await asyncio.wait_for(self._queue.put((post_id, user)), self.enqueue_timeout)
+        except asyncio.TimeoutError:
+            # not recorded, so a retry must not be treated as a duplicate
+            self._seen.pop((post_id, user), None)
+            raise ViewBufferFull("View queue is full, retry later")
+        return True
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            try:
+                await run_in_threadpool(_flush_batch, batch)
+            except Exception:
+                logger.exception("Dropped a batch of %d views", len(batch))
+
+    async def shutdown(self):
+        """Flush everything queued so far and stop the background task."""
+        if self._task is None:
+            return
+        await self._queue.put(_STOP)
+        await self._task
+        self._task = None
+
+
+_buffer: Optional[ViewBuffer] = None
+
+
+def get_view_buffer() -> ViewBuffer:
+    global _buffer
+    if _buffer is None:
+        _buffer = ViewBuffer(
+            batch_size=settings.view_buffer_batch_size,
+            flush_interval=settings.view_buffer_flush_interval,
+            max_queue=settings.view_buffer_max_queue,
+            dedup_window=settings.view_dedup_window,
+            enqueue_timeout=settings.view_buffer_enqueue_timeout,
+        )
+    return _buffer
+
+
+async def shutdown():
+    """Flush pending views; called on application shutdown."""
+    if _buffer is not None:
+        await _buffer.shutdown()
@@ -0,0 +1,95 @@
+"""
+Throughput of the sync (threadpool) and async (AsyncSession) database paths
+under concurrent mixed read/write load.
+
+Each mode runs in its own interpreter because DB_ASYNC is read at import time.
+Requests go through the ASGI app in-process via httpx, so the numbers measure
+the app and the database rather than the network. The database must already
+have its tables (alembic upgrade head, or python -m app.cli bootstrap).
+
+    python -m bench.db_modes --database-url postgresql://... --concurrency 50 --requests 2000
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+
+async def _drive(concurrency: int, total: int, write_ratio: float) -> dict:
+    import httpx
+    from app.database import dispose_async_engine
+    from app.main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        seed = await client.post("/api/posts/", data={"title": "bench", "author": "bench"})
+        post_id = seed.json()["id"]
+        latencies = []
+        errors = 0
+        remaining = iter(range(total))
+
+        async def worker():
+            nonlocal errors
+            for _ in remaining:
+                start = time.perf_counter()
+                if random.random() < write_ratio:
+                    r = await client.post(f"/api/posts/{post_id}/replies", data={"user": "bench", "content": "x"})
+                else:
+                    r = await client.get("/api/posts/", params={"limit": 20})
+                latencies.append(time.perf_counter() - start)
+                if r.status_code >= 400:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*[worker() for _ in range(concurrency)])
+        elapsed = time.perf_counter() - started
+    await dispose_async_engine()
+
+    latencies.sort()
+    return {
+        "requests": total,
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(total / elapsed, 1),
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 2),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95)] * 1000, 2),
+    }
+
+
+def _run_child(args):
+    result = asyncio.run(_drive(args.concurrency, args.requests, args.write_ratio))
+    print(json.dumps(result))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=os.environ.get("DATABASE_URL"))
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        return _run_child(args)
+
+    for mode in ("sync", "async"):
+        env = dict(os.environ, DB_ASYNC="true" if mode == "async" else "false", APP_DEBUG="false")
+        if args.database_url:
+            env["DATABASE_URL"] = args.database_url
+        out = subprocess.run(
+            [sys.executable, "-m", "bench.db_modes", "--child",
+             "--concurrency", str(args.concurrency),
+             "--requests", str(args.requests),
+             "--write-ratio", str(args.write_ratio)],
+            env=env, capture_output=True, text=True, check=True,
+        )
+        print(f"{mode:>5}: {out.stdout.strip().splitlines()[-1]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+"""
+Per-endpoint latency, throughput and SQL statement counts.
+
+Each scenario fires --requests requests at --concurrency and is measured on
+its own. The SQL count comes from the Server-Timing header
+(RequestMetricsMiddleware), so it needs METRICS_ENABLED on the server. Two
+drivers share the scenarios:
+
+- `inprocess` imports the app and calls it through httpx's ASGI transport:
+  no network and no server process. The response cache is off unless
+  --cache is given, so every request reaches the database.
+- `http` targets a running server at --base-url.
+
+Seed a database first (python -m bench.seed). Use --out to store the results
+as a baseline, and --compare on a later run to flag endpoints whose p95 or SQL
+count got worse. The exit status is 1 when anything regressed.
+
+    python -m bench.load --database-url sqlite:///bench.db --out bench/baseline.json
+    python -m bench.load --database-url sqlite:///bench.db --compare bench/baseline.json
+    python -m bench.load --driver http --base-url http://localhost:8000 --concurrency 50
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import re
+import sys
+import time
+from typing import Callable, Dict, List, NamedTuple
+
+_SQL_COUNT = re.compile(r'db;dur=[\d.]+;desc="(\d+) queries"')
+
+
+class Scenario(NamedTuple):
+    name: str
+    method: str
+    # (sampled ids, rng) -> (path, httpx request kwargs)
+    request: Callable[[dict, random.Random], tuple]
+    write: bool = False
+
+
+SCENARIOS = [
+    Scenario("documents.list", "GET", lambda ids, rng: ("/api/documents/", {"params": {"limit": 50}})),
+    Scenario("documents.by_location", "GET", lambda ids, rng: (
+        "/api/documents/", {"params": [("location", "India"), ("location", "UK"), ("limit", 50)]})),
+    Scenario("documents.facets", "GET", lambda ids, rng: ("/api/documents/facets", {})),
+    Scenario("documents.detail", "GET", lambda ids, rng: (f"/api/documents/{rng.choice(ids['documents'])}", {})),
+    Scenario("posts.feed", "GET", lambda ids, rng: ("/api/posts/", {"params": {"limit": 20}})),
+    Scenario("posts.feed_summary", "GET", lambda ids, rng: (
+        "/api/posts/", {"params": {"limit": 50, "view": "summary"}})),
+    Scenario("posts.detail", "GET", lambda ids, rng: (f"/api/posts/{rng.choice(ids['posts'])}", {})),
+    Scenario("posts.replies", "GET", lambda ids, rng: (
+        f"/api/posts/{rng.choice(ids['posts'])}/replies", {"params": {"limit": 20}})),
+    Scenario("search", "GET", lambda ids, rng: (
+        "/api/search/", {"params": {"q": rng.choice(["leave", "travel policy", "security", "benefits"])}})),
+    Scenario("posts.react", "POST", lambda ids, rng: (
+        f"/api/posts/{rng.choice(ids['posts'])}/reactions",
+        {"data": {"user": f"bench{rng.randrange(10 ** 6)}", "reaction": "like"}}), write=True),
+    Scenario("posts.view", "POST", lambda ids, rng: (
+        f"/api/posts/{rng.choice(ids['posts'])}/views", {"data": {"user": f"bench{rng.randrange(10 ** 6)}"}}),
+        write=True),
+]
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+async def _discover_ids(client) -> dict:
+    """A sample of existing ids, fetched through the API so both drivers work the same way."""
+    documents = (await client.get("/api/documents/", params={"limit": 500, "count": "none"})).json()["documents"]
+    posts = (await client.get("/api/posts/", params={"limit": 100, "fields": "id", "count": "none"})).json()["posts"]
+    if not documents or not posts:
+        sys.exit("no documents or posts found; seed the database first (python -m bench.seed)")
+    return {"documents": [d["id"] for d in documents], "posts": [p["id"] for p in posts]}
+
+
+async def _run_scenario(client, scenario: Scenario, ids: dict, requests: int, concurrency: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    latencies, sql_counts = [], []
+    errors = 0
+    remaining = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            path, kwargs = scenario.request(ids, rng)
+            start = time.perf_counter()
+            response = await client.request(scenario.method, path, **kwargs)
+            latencies.append(time.perf_counter() - start)
+            if not response.is_success:
+                errors += 1
+            match = _SQL_COUNT.search(response.headers.get("server-timing", ""))
+            if match:
+                sql_counts.append(int(match.group(1)))
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "errors": errors,
+        "throughput_rps": round(requests / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "sql_per_request": round(sum(sql_counts) / len(sql_counts), 2) if sql_counts else None,
+    }
+
+
+async def run(client, scenarios: List[Scenario], requests: int, concurrency: int, seed: int) -> Dict[str, dict]:
+    ids = await _discover_ids(client)
+    # one untimed request per scenario warms connections and caches
+    for scenario in scenarios:
+        path, kwargs = scenario.request(ids, random.Random(seed))
+        await client.request(scenario.method, path, **kwargs)
+    return {
+        scenario.name: await _run_scenario(client, scenario, ids, requests, concurrency, seed)
+        for scenario in scenarios
+    }
+
+
+async def _inprocess(args, scenarios) -> Dict[str, dict]:
+    import httpx
+    from app.database import dispose_async_engine
+    from app.main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        results = await run(client, scenarios, args.requests, args.concurrency, args.seed)
+    await dispose_async_engine()
+    return results
+
+
+async def _http(args, scenarios) -> Dict[str, dict]:
+    import httpx
+
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=60) as client:
+        return await run(client, scenarios, args.requests, args.concurrency, args.seed)
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], tolerance: float, min_delta_ms: float) -> List[str]:
+    """Regressions of `results` against `baseline`, one message each."""
+    problems = []
+    for name, current in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        if current["errors"] > before["errors"]:
+            problems.append(f"{name}: errors {before['errors']} -> {current['errors']}")
+        limit = before["p95_ms"] * (1 + tolerance)
+        if current["p95_ms"] > limit and current["p95_ms"] - before["p95_ms"] >= min_delta_ms:
+            problems.append(f"{name}: p95 {before['p95_ms']} ms -> {current['p95_ms']} ms")
+        if None not in (current["sql_per_request"], before["sql_per_request"]) \
+                and current["sql_per_request"] > before["sql_per_request"] + 0.5:
+            problems.append(f"{name}: SQL statements/request {before['sql_per_request']} -> {current['sql_per_request']}")
+    return problems
+
+
+def _print_table(results: Dict[str, dict]):
+    print(f"{'endpoint':<24}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'sql/req':>9}{'errors':>8}")
+    for name, r in results.items():
+        sql = "-" if r["sql_per_request"] is None else r["sql_per_request"]
+        print(f"{name:<24}{r['throughput_rps']:>9}{r['p50_ms']:>9}{r['p95_ms']:>9}{r['p99_ms']:>9}{sql:>9}{r['errors']:>8}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--driver", choices=["inprocess", "http"], default="inprocess")
+    parser.add_argument("--database-url", default=os.environ.get("DATABASE_URL"), help="inprocess driver only")
+    parser.add_argument("--base-url", default="http://localhost:8000", help="http driver only")
+    parser.add_argument("--requests", type=int, default=200, help="per scenario")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--scenarios", help="comma-separated names (default: all)")
+    parser.add_argument("--read-only", action="store_true", help="skip scenarios that write")
+    parser.add_argument("--cache", action="store_true", help="keep the response cache on (inprocess driver)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", help="write results as JSON (usable as a baseline)")
+    parser.add_argument("--compare", help="baseline JSON from an earlier --out")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p95 growth (0.2 = 20%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0, help="ignore p95 changes smaller than this")
+    args = parser.parse_args(argv)
+
+    scenarios = SCENARIOS
+    if args.scenarios:
+        wanted = set(args.scenarios.split(","))
+        unknown = wanted - {s.name for s in SCENARIOS}
+        if unknown:
+            parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+        scenarios = [s for s in SCENARIOS if s.name in wanted]
+    if args.read_only:
+        scenarios = [s for s in scenarios if not s.write]
+
+    if args.driver == "inprocess":
+        if args.database_url:
+            os.environ["DATABASE_URL"] = args.database_url
+        os.environ.setdefault("APP_DEBUG", "false")
+        os.environ["METRICS_ENABLED"] = "true"
+        if not args.cache:
+            os.environ["CACHE_BACKEND"] = "none"
+        results = asyncio.run(_inprocess(args, scenarios))
+    else:
+        results = asyncio.run(_http(args, scenarios))
+
+    _print_table(results)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"driver": args.driver, "concurrency": args.concurrency, "requests": args.requests,
+                       "endpoints": results}, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["endpoints"]
+        problems = compare(results, baseline, args.tolerance, args.min_delta_ms)
+        for problem in problems:
+            print(f"REGRESSION {problem}")
+        if problems:
+            sys.exit(1)
+        print(f"no regressions against {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+Seed a database with a synthetic intranet: documents spread over locations
+and posts with long-tailed engagement (a few posts collect most of the
+views, reactions, replies and shares), plus attachments backed by real blobs.
+
+Rows go through the app's models and services: posts are added through the
+ORM so their excerpts are set, locations are canonicalized, blob references
+are counted and the engagement counters are reconciled at the end. The same
+--seed gives the same data.
+
+    python -m bench.seed --database-url sqlite:///bench.db --documents 5000 --posts 2000
+"""
+import argparse
+import io
+import os
+import random
+from datetime import datetime, timedelta
+
+LOCATIONS = [("India", 55), ("USA", 25), ("UK", 10), ("Singapore", 5), ("Berlin", 3), ("Tokyo", 2)]
+REACTIONS = [("like", 70), ("love", 15), ("celebrate", 10), ("insightful", 5)]
+PLATFORMS = ["teams", "email", "slack", None]
+TOPICS = ["leave", "travel", "expense", "security", "onboarding", "benefits", "payroll", "remote work",
+          "holiday", "training", "wellness", "procurement", "code of conduct", "relocation"]
+ATTACHMENT_KINDS = [("pdf", "application/pdf", False), ("docx",
+                    "application/vnd.openxmlformats-officedocument.wordprocessingml.document", False),
+                    ("png", "image/png", True), ("jpg", "image/jpeg", True)]
+BATCH_SIZE = 1000
+
+
+def _weighted(rng: random.Random, choices):
+    values, weights = zip(*choices)
+    return rng.choices(values, weights)[0]
+
+
+def _popularity(rng: random.Random) -> float:
+    """Pareto-distributed: most posts get a handful of views, a few reach most users."""
+    return min(rng.paretovariate(1.16), 400.0)
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(TOPICS) for _ in range(words)).capitalize()
+
+
+def _blob_pool(rng: random.Random, size: int):
+    """Store `size` small payloads and return [(key, size, kind)]; uploads of the same file share a blob."""
+    from app.services.blob_store import get_blob_store
+
+    store = get_blob_store()
+    pool = []
+    for i in range(size):
+        kind = ATTACHMENT_KINDS[i % len(ATTACHMENT_KINDS)]
+        payload = f"bench attachment {i} ".encode() * rng.randint(50, 5000)
+        stored = store.put(io.BytesIO(payload))
+        pool.append((stored.key, stored.size, kind))
+    return pool
+
+
+def _insert(db, model, rows):
+    from sqlalchemy import insert
+
+    for start in range(0, len(rows), BATCH_SIZE):
+        db.execute(insert(model), rows[start:start + BATCH_SIZE])
+
+
+def seed_documents(db, rng: random.Random, count: int):
+    from app.models.document import Document
+    from app.services.locations import ensure_locations
+
+    resolved = ensure_locations(db, [name for name, _ in LOCATIONS])
+    now = datetime.utcnow()
+    rows = []
+    for i in range(count):
+        code, location = resolved[_weighted(rng, LOCATIONS)]
+        topic = rng.choice(TOPICS)
+        updated = now - timedelta(days=rng.uniform(0, 730))
+        rows.append({
+            "name": f"{topic.title()} policy {i:06d}",
+            "description": f"{_sentence(rng, rng.randint(8, 40))}.",
+            "link": f"https://sharepoint.example/sites/hr/{topic.replace(' ', '-')}/{i}.pdf",
+            "location": location,
+            "location_code": code,
+            "last_updated": updated,
+            "updated_at": updated,
+        })
+    _insert(db, Document, rows)
+    db.commit()
+
+
+def seed_posts(db, rng: random.Random, count: int, users: int, blob_pool_size: int):
+    from app.models.post import Attachment, Post, PostView, Reaction, Reply, Share
+    from app.services import blob_refs, counters
+
+    pool = _blob_pool(rng, blob_pool_size)
+    now = datetime.utcnow()
+    user_names = [f"user{i:05d}" for i in range(users)]
+    for start in range(0, count, BATCH_SIZE):
+        posts = []
+        for i in range(start, min(start + BATCH_SIZE, count)):
+            created = now - timedelta(days=rng.uniform(0, 365))
+            paragraphs = "".join(f"<p>{_sentence(rng, rng.randint(10, 60))}.</p>" for _ in range(rng.randint(1, 6)))
+            posts.append(Post(
+                title=f"{_sentence(rng, rng.randint(2, 6))} update {i}",
+                description=paragraphs,
+                author=rng.choice(user_names[:50]),
+                announce_type=rng.choice([None, "news", "event", "policy"]),
+                created_at=created,
+                updated_at=created,
+            ))
+        db.add_all(posts)
+        db.flush()
+
+        views, reactions, replies, shares, attachments = [], [], [], [], []
+        for post in posts:
+            reach = _popularity(rng)
+            viewers = rng.sample(user_names, min(users, int(reach * 5)))
+            views += [{"post_id": post.id, "user": user} for user in viewers]
+            for user in viewers[:int(len(viewers) * rng.uniform(0.05, 0.25))]:
+                reactions.append({"post_id": post.id, "user": user, "reaction": _weighted(rng, REACTIONS)})
+            replies += [{"post_id": post.id, "user": rng.choice(viewers), "content": _sentence(rng, rng.randint(3, 30))}
+                        for _ in range(int(len(viewers) * rng.uniform(0, 0.05)))]
+            shares += [{"post_id": post.id, "user": rng.choice(viewers), "platform": rng.choice(PLATFORMS)}
+                       for _ in range(int(len(viewers) * rng.uniform(0, 0.02)))]
+            for n in range(rng.choices([0, 1, 2, 4], [50, 30, 15, 5])[0]):
+                key, size, (ext, content_type, is_image) = rng.choice(pool)
+                attachments.append({
+                    "post_id": post.id, "filename": f"attachment-{post.id}-{n}.{ext}",
+                    "content_type": content_type, "size": size, "is_image": is_image,
+                    "storage_key": key, "sha256": key,
+                })
+        _insert(db, PostView, views)
+        _insert(db, Reaction, reactions)
+        _insert(db, Reply, replies)
+        _insert(db, Share, shares)
+        _insert(db, Attachment, attachments)
+        blob_refs.acquire(db, [(a["storage_key"], a["size"]) for a in attachments])
+        db.commit()
+    counters.reconcile(db)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=os.environ.get("DATABASE_URL"))
+    parser.add_argument("--documents", type=int, default=5000)
+    parser.add_argument("--posts", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=1000, help="distinct viewers/reactors")
+    parser.add_argument("--blobs", type=int, default=32, help="distinct attachment files")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    os.environ.setdefault("APP_DEBUG", "false")
+    from app.database import Base, SessionLocal, get_engine
+    import app.models.blob  # noqa: F401
+    import app.models.post  # noqa: F401
+    import app.models.document  # noqa: F401
+
+    Base.metadata.create_all(bind=get_engine())
+    rng = random.Random(args.seed)
+    db = SessionLocal()
+    try:
+        seed_documents(db, rng, args.documents)
+        seed_posts(db, rng, args.posts, args.users, args.blobs)
+    finally:
+        db.close()
+    print(f"seeded {args.documents} documents and {args.posts} posts")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Cost per item of building and encoding list responses: Pydantic models +
+jsonable_encoder (the default) against plain dicts + orjson (FAST_JSON).
+
+Both paths call the same listing functions the routes use, in-process and
+without HTTP, and the output is checked to be byte-identical. The database is
+seeded on first use.
+
+    python -m bench.serialization --database-url sqlite:///bench.db --documents 1000 --posts 100
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+
+def _seed(documents: int, posts: int):
+    from sqlalchemy import func, select
+    from app.database import Base, SessionLocal, get_engine
+    from app.models.document import Document
+    from app.models.post import Attachment, Post, Reaction
+
+    Base.metadata.create_all(bind=get_engine())
+    db = SessionLocal()
+    try:
+        have = db.scalar(select(func.count()).select_from(Document))
+        db.add_all(Document(name=f"Policy {i:05d}", description="Leave, travel and expense rules " * 4,
+                            link=f"https://sharepoint.example/{i}", location="India")
+                   for i in range(have, documents))
+        have = db.scalar(select(func.count()).select_from(Post))
+        for i in range(have, posts):
+            post = Post(title=f"Announcement {i}", author="hr", description="<p>Hello <b>team</b></p>" * 10)
+            db.add(post)
+            db.flush()
+            db.add_all(Attachment(post_id=post.id, filename=f"f{j}.pdf", content_type="application/pdf",
+                                  size=1000, is_image=False, storage_key="0" * 64) for j in range(3))
+            db.add_all(Reaction(post_id=post.id, user=f"u{j}", reaction="like") for j in range(5))
+        db.commit()
+    finally:
+        db.close()
+
+
+def _measure(fn, rounds: int) -> float:
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=os.environ.get("DATABASE_URL", "sqlite:///./bench_serialization.db"))
+    parser.add_argument("--documents", type=int, default=1000)
+    parser.add_argument("--posts", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ.setdefault("APP_DEBUG", "false")
+    from app.database import SessionLocal
+    from app.routes.documents import _list_documents
+    from app.services.feed import list_post_page
+    from app.services.serialization import orjson, render
+
+    _seed(args.documents, args.posts)
+    cases = {
+        "documents": (args.documents, lambda db, plain: _list_documents(
+            db, 0, args.documents, None, None, "name", "none", plain)),
+        "posts": (args.posts, lambda db, plain: list_post_page(db, limit=args.posts, count="none", plain=plain)),
+    }
+    print(f"encoder for the fast path: {'orjson' if orjson else 'json (install orjson for more)'}")
+    db = SessionLocal()
+    try:
+        for name, (items, listing) in cases.items():
+            bodies = {plain: render(listing(db, plain)) for plain in (False, True)}
+            if bodies[False] != bodies[True]:
+                sys.exit(f"{name}: fast path output differs from the default path")
+            results = {}
+            for plain in (False, True):
+                # build only / build + encode, so the encoder's share is visible
+                build = _measure(lambda: listing(db, plain), args.rounds)
+                total = _measure(lambda: render(listing(db, plain)), args.rounds)
+                results[plain] = (build, total)
+            (slow_build, slow_total), (fast_build, fast_total) = results[False], results[True]
+            print(f"{name} ({items} items/page)")
+            print(f"  models + jsonable_encoder: {slow_total / items * 1e6:8.1f} us/item "
+                  f"(build {slow_build / items * 1e6:.1f})")
+            print(f"  plain dicts + dumps:       {fast_total / items * 1e6:8.1f} us/item "
+                  f"(build {fast_build / items * 1e6:.1f})  x{slow_total / fast_total:.1f}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
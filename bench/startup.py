@@ -0,0 +1,92 @@
+"""
+Cold-start cost of the two entry points: app.main (uvicorn workers) and
+api.main (the Vercel function).
+
+Every run is a fresh interpreter, as a new worker or serverless instance
+would be. The child process reports:
+- the time to import the module,
+- the time to the first response from a route that needs no database,
+- the time to the first response from one that does (the connection is
+  opened there),
+and the parent adds the wall time of the whole process, interpreter start
+included. Medians over --runs are printed. The database must already have
+its tables (alembic upgrade head, or python -m app.cli bootstrap).
+
+    python -m bench.startup --database-url sqlite:///bench.db --runs 10
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# module -> (route without database access, route with database access)
+TARGETS = {
+    "app.main": ("/", "/api/documents/?limit=1&count=none"),
+    "api.main": ("/openapi.json", "/api/documents/?limit=1&count=none"),
+}
+
+
+def _child(module: str):
+    started = time.perf_counter()
+    import asyncio
+    import importlib
+
+    app = importlib.import_module(module).app
+    imported = time.perf_counter()
+
+    async def first_requests():
+        import httpx
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://startup") as client:
+            plain, with_db = TARGETS[module]
+            (await client.get(plain)).raise_for_status()
+            first = time.perf_counter()
+            (await client.get(with_db)).raise_for_status()
+            return first, time.perf_counter()
+
+    first, first_db = asyncio.run(first_requests())
+    print(json.dumps({
+        "import_ms": (imported - started) * 1000,
+        "first_response_ms": (first - started) * 1000,
+        "first_db_response_ms": (first_db - started) * 1000,
+    }))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=os.environ.get("DATABASE_URL"))
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--targets", default=",".join(TARGETS), help="comma-separated modules")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        return _child(args.child)
+
+    env = dict(os.environ, APP_DEBUG="false")
+    if args.database_url:
+        env["DATABASE_URL"] = args.database_url
+    print(f"{'target':<10}{'import ms':>11}{'first ms':>10}{'first db ms':>13}{'process ms':>12}")
+    for module in args.targets.split(","):
+        samples = []
+        for _ in range(args.runs):
+            started = time.perf_counter()
+            out = subprocess.run([sys.executable, "-m", "bench.startup", "--child", module],
+                                 env=env, capture_output=True, text=True)
+            wall = (time.perf_counter() - started) * 1000
+            if out.returncode != 0:
+                sys.exit(f"{module} failed to start:\n{out.stderr}")
+            sample = json.loads(out.stdout.strip().splitlines()[-1])
+            sample["process_ms"] = wall
+            samples.append(sample)
+        median = {key: round(statistics.median(s[key] for s in samples), 1) for key in samples[0]}
+        print(f"{module:<10}{median['import_ms']:>11}{median['first_response_ms']:>10}"
+              f"{median['first_db_response_ms']:>13}{median['process_ms']:>12}")
+
+
+if __name__ == "__main__":
+    main()
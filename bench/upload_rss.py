@@ -0,0 +1,94 @@
+"""
+Peak RSS of a worker while it ingests uploads of growing size.
+
+For each size a fresh interpreter uploads one file of that size through the
+ASGI app in-process via httpx, streaming the request body from disk. It
+reports how much the peak RSS grew over the warmed-up baseline. With chunked
+storage the growth should stay flat as the file size grows. The database must
+already have its tables (alembic upgrade head, or python -m app.cli bootstrap).
+
+    python -m bench.upload_rss --sizes-mb 1 16 64 256
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def _upload(size_mb: int) -> dict:
+    import httpx
+    from app.database import dispose_async_engine
+    from app.main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        # warm up imports, the engine and the blob store before taking the baseline
+        await client.post("/api/posts/", data={"title": "warmup", "author": "bench"},
+                          files=[("files", ("w.bin", b"w" * 1024, "application/octet-stream"))])
+        baseline = _peak_rss_mb()
+
+        with tempfile.TemporaryFile() as f:
+            block = os.urandom(1024 * 1024)
+            for _ in range(size_mb):
+                f.write(block)
+            f.seek(0)
+            started = time.perf_counter()
+            r = await client.post("/api/posts/", data={"title": "bench", "author": "bench"},
+                                  files=[("files", ("upload.bin", f, "application/octet-stream"))])
+            elapsed = time.perf_counter() - started
+    await dispose_async_engine()
+
+    peak = _peak_rss_mb()
+    return {
+        "size_mb": size_mb,
+        "status": r.status_code,
+        "seconds": round(elapsed, 3),
+        "baseline_rss_mb": round(baseline, 1),
+        "peak_rss_mb": round(peak, 1),
+        "growth_mb": round(peak - baseline, 1),
+    }
+
+
+def _run_child(size_mb: int, env: dict) -> dict:
+    out = subprocess.run(
+        [sys.executable, "-m", "bench.upload_rss", "--child", str(size_mb)],
+        env=env, check=True, capture_output=True, text=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=os.environ.get("DATABASE_URL"))
+    parser.add_argument("--blob-root", default=None, help="defaults to a temporary directory")
+    parser.add_argument("--sizes-mb", type=int, nargs="+", default=[1, 16, 64, 256])
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        print(json.dumps(asyncio.run(_upload(args.child))))
+        return
+
+    with tempfile.TemporaryDirectory() as blob_root:
+        env = dict(os.environ, APP_DEBUG="false", IMAGE_VARIANTS_ENABLED="false",
+                   BLOB_BACKEND="local", BLOB_ROOT=args.blob_root or blob_root)
+        limit = str((max(args.sizes_mb) + 1) * 1024 * 1024)
+        env.update(MAX_UPLOAD_SIZE=limit, MAX_REQUEST_SIZE=limit)
+        if args.database_url:
+            env["DATABASE_URL"] = args.database_url
+        for size_mb in args.sizes_mb:
+            print(json.dumps(_run_child(size_mb, env)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Shared fixtures.
+
+Tests run in-process against SQLite stand-ins: every test gets a fresh
+database file and blob directory, and the engine, response cache, view
+buffer and live feed are rebuilt around it. The environment below is set
+before any app module reads its configuration, so the DATABASE_URL in .env
+is never touched.
+"""
+import os
+import tempfile
+
+_scratch = tempfile.mkdtemp(prefix="intranet-tests-")
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{_scratch}/unused.db",
+    "DATABASE_REPLICA_URLS": "",
+    "DB_ASYNC": "false",
+    "APP_DEBUG": "false",
+    "APP_PROFILE": "",
+    "BLOB_BACKEND": "local",
+    "BLOB_ROOT": os.path.join(_scratch, "blobs"),
+    "CACHE_BACKEND": "memory",
+    "CACHE_WARM_PATHS": "",
+    "VIEW_BUFFER_ENABLED": "false",
+    "IMAGE_VARIANTS_ENABLED": "false",
+    "LIVE_FEED_PG_NOTIFY": "false",
+    "METRICS_ENABLED": "true",
+    "SLOW_QUERY_MS": "0",
+})
+
+import pytest  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+
+def _reset_services():
+    from app.services import cache, live_feed, view_buffer
+    from app.services.blob_store import get_blob_store
+
+    get_blob_store.cache_clear()
+    cache._build_response_cache.cache_clear()
+    view_buffer._buffer = None
+    live_feed._feeds.clear()
+
+
+@pytest.fixture(autouse=True)
+def database(tmp_path, monkeypatch):
+    """A fresh SQLite database with every table, and a fresh blob directory; yields the engine."""
+    from app import database
+    from app.config import settings
+    import app.models.blob  # noqa: F401
+    import app.models.document  # noqa: F401
+    import app.models.post  # noqa: F401
+
+    monkeypatch.setattr(settings, "database_url", f"sqlite:///{tmp_path / 'test.db'}")
+    monkeypatch.setattr(settings, "blob_root", str(tmp_path / "blobs"))
+    monkeypatch.setattr(database, "_engines", {})
+    _reset_services()
+    engine = database.get_engine()
+    database.Base.metadata.create_all(bind=engine)
+    yield engine
+    for built in database._engines.values():
+        built.dispose()
+    _reset_services()
+
+
+@pytest.fixture
+def db(database):
+    from app.database import SessionLocal
+
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def client(database):
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    # not entered as a context manager: no startup hooks (cache warm-up) run
+    return TestClient(app)
+
+
+class StatementCounter:
+    def __init__(self):
+        self.statements = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def reset(self):
+        self.statements.clear()
+
+
+@pytest.fixture
+def count_statements(database):
+    """Records every SQL statement sent to the test database from here on."""
+    counter = StatementCounter()
+
+    def before(conn, cursor, statement, parameters, context, executemany):
+        counter.statements.append(statement)
+
+    event.listen(database, "before_cursor_execute", before)
+    yield counter
+    event.remove(database, "before_cursor_execute", before)
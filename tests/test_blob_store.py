@@ -0,0 +1,181 @@
+import hashlib
+import io
+import os
+import time
+from datetime import datetime
+
+import pytest
+
+from app.services.blob_store import CHUNK_SIZE, BlobNotFound, BlobTooLarge, LocalBlobStore, S3BlobStore
+
+PAYLOAD = os.urandom(3 * CHUNK_SIZE + 123)  # several chunks and a partial one
+
+
+@pytest.fixture(params=["local", "s3"])
+def store(request, tmp_path):
+    if request.param == "local":
+        yield LocalBlobStore(str(tmp_path / "blobs"))
+        return
+    moto = pytest.importorskip("moto")
+    boto3 = pytest.importorskip("boto3")
+    mock = moto.mock_aws() if hasattr(moto, "mock_aws") else moto.mock_s3()
+    with mock:
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket="attachments")
+        yield S3BlobStore(bucket="attachments", prefix="test/", client=client)
+
+
+def _read(store, key, start=0, end=None) -> bytes:
+    return b"".join(store.open(key, start, end))
+
+
+def _stored_keys(store) -> list:
+    if isinstance(store, LocalBlobStore):
+        return [name for _, _, files in os.walk(store.root) for name in files]
+    listing = store.client.list_objects_v2(Bucket=store.bucket)
+    return [obj["Key"] for obj in listing.get("Contents", [])]
+
+
+def test_put_is_content_addressed(store):
+    stored = store.put(io.BytesIO(PAYLOAD))
+
+    assert stored.key == stored.sha256 == hashlib.sha256(PAYLOAD).hexdigest()
+    assert stored.size == len(PAYLOAD)
+    assert store.exists(stored.key)
+    assert _read(store, stored.key) == PAYLOAD
+
+
+def test_same_bytes_are_stored_once(store):
+    first = store.put(io.BytesIO(PAYLOAD))
+    second = store.put(io.BytesIO(PAYLOAD))
+
+    assert first == second
+    assert len(_stored_keys(store)) == 1
+
+
+@pytest.mark.parametrize("start,end", [(0, 1), (10, 20), (CHUNK_SIZE - 5, CHUNK_SIZE + 5),
+                                        (len(PAYLOAD) - 7, None), (100, len(PAYLOAD))])
+def test_open_reads_byte_ranges(store, start, end):
+    key = store.put(io.BytesIO(PAYLOAD)).key
+
+    assert _read(store, key, start, end) == PAYLOAD[start:end]
+
+
+def test_open_streams_in_chunks(store):
+    key = store.put(io.BytesIO(PAYLOAD)).key
+
+    assert max(len(chunk) for chunk in store.open(key)) <= CHUNK_SIZE
+
+
+def test_oversized_put_stores_nothing(store):
+    with pytest.raises(BlobTooLarge):
+        store.put(io.BytesIO(PAYLOAD), max_size=CHUNK_SIZE)
+
+    assert _stored_keys(store) == []
+
+
+def test_delete_removes_the_blob(store):
+    key = store.put(io.BytesIO(PAYLOAD)).key
+
+    store.delete(key)
+    store.delete(key)  # deleting twice is harmless
+
+    assert not store.exists(key)
+    with pytest.raises(BlobNotFound):
+        _read(store, key)
+
+
+def test_missing_key(store):
+    assert not store.exists("0" * 64)
+    with pytest.raises(BlobNotFound):
+        _read(store, "0" * 64)
+
+
+def test_upload_is_stored_once_and_served_with_ranges(client):
+    from app.services.blob_store import get_blob_store
+
+    files = [("files", ("a.bin", PAYLOAD, "application/octet-stream")),
+             ("files", ("copy.bin", PAYLOAD, "application/octet-stream"))]
+    post = client.post("/api/posts/", data={"title": "With files", "author": "hr"}, files=files).json()
+    first, second = post["attachments"]
+    key = hashlib.sha256(PAYLOAD).hexdigest()
+
+    assert get_blob_store().exists(key)
+    assert len(_stored_keys(get_blob_store())) == 1
+
+    url = f"/api/posts/{post['id']}/attachments/{first['id']}"
+    full = client.get(url)
+    assert full.status_code == 200 and full.content == PAYLOAD
+    assert full.headers["etag"] == f'"{key}"'
+
+    partial = client.get(url, headers={"Range": "bytes=100-199"})
+    assert partial.status_code == 206
+    assert partial.content == PAYLOAD[100:200]
+    assert partial.headers["content-range"] == f"bytes 100-199/{len(PAYLOAD)}"
+
+    assert client.get(url, headers={"If-None-Match": full.headers["etag"]}).status_code == 304
+    assert client.get(f"/api/posts/{post['id']}/attachments/{second['id']}").content == PAYLOAD
+
+
+def test_iter_keys_lists_stored_blobs(store):
+    key = store.put(io.BytesIO(PAYLOAD)).key
+
+    ((listed, size, modified),) = list(store.iter_keys())
+
+    assert (listed, size) == (key, len(PAYLOAD))
+    assert abs((datetime.utcnow() - modified).total_seconds()) < 60
+
+
+def test_storing_existing_bytes_again_refreshes_the_modified_time(store):
+    store.put(io.BytesIO(PAYLOAD))
+    ((_, _, first),) = list(store.iter_keys())
+    time.sleep(1.1)
+
+    store.put(io.BytesIO(PAYLOAD))
+
+    ((_, _, second),) = list(store.iter_keys())
+    assert second > first
+    assert _read(store, hashlib.sha256(PAYLOAD).hexdigest()) == PAYLOAD
+
+
+def test_gc_sweeps_stored_objects_without_a_blobs_row(store, db):
+    from app.services import blob_refs
+
+    orphan = store.put(io.BytesIO(b"left behind by a failed request")).key
+    kept = store.put(io.BytesIO(PAYLOAD)).key
+    blob_refs.acquire(db, [(kept, len(PAYLOAD))])
+    db.commit()
+
+    assert blob_refs.collect_garbage(db, store, grace_seconds=3600) == (0, 0)  # too recent
+    assert store.exists(orphan)
+
+    deleted, freed = blob_refs.collect_garbage(db, store, grace_seconds=-60)
+
+    assert (deleted, freed) == (1, len(b"left behind by a failed request"))
+    assert not store.exists(orphan)
+    assert store.exists(kept)
+
+
+def test_update_of_a_missing_post_stores_nothing(client):
+    from app.services.blob_store import get_blob_store
+
+    response = client.put("/api/posts/999", files=[("files", ("a.bin", PAYLOAD, "application/octet-stream"))])
+
+    assert response.status_code == 404
+    assert _stored_keys(get_blob_store()) == []
+
+
+def test_failed_upload_leaves_nothing_after_gc(client, db, monkeypatch):
+    from app.config import settings
+    from app.services import blob_refs
+    from app.services.blob_store import get_blob_store
+
+    monkeypatch.setattr(settings, "max_upload_size", CHUNK_SIZE)
+    files = [("files", ("small.bin", b"fits", "application/octet-stream")),
+             ("files", ("big.bin", PAYLOAD, "application/octet-stream"))]
+    response = client.post("/api/posts/", data={"title": "Too big", "author": "hr"}, files=files)
+    assert response.status_code == 413
+
+    blob_refs.collect_garbage(db, get_blob_store(), grace_seconds=-60)
+
+    assert _stored_keys(get_blob_store()) == []
@@ -0,0 +1,133 @@
+import asyncio
+import json
+
+import pytest
+
+from app.services.cache import MemoryCache
+
+
+def test_memory_cache_refuses_a_fill_that_raced_an_invalidation():
+    cache = MemoryCache()
+    versions = cache.tag_versions(["documents"])
+    cache.invalidate_tags(["documents"])  # a write committed while the entry was being built
+
+    assert cache.set("/api/documents/?", b"stale", 60, ["documents"], versions) is False
+    assert cache.get("/api/documents/?") is None
+
+
+def test_memory_cache_invalidates_by_tag():
+    cache = MemoryCache()
+    cache.set("a", b"1", 60, ["documents", "document:1"], {})
+    cache.set("b", b"2", 60, ["document:2"], {})
+
+    cache.invalidate_tags(["document:1"])
+
+    assert cache.get("a") is None
+    assert cache.get("b") == b"2"
+
+
+def test_memory_cache_evicts_least_recently_used():
+    cache = MemoryCache(max_entries=2)
+    cache.set("a", b"1", 60, [], {})
+    cache.set("b", b"2", 60, [], {})
+    cache.get("a")
+    cache.set("c", b"3", 60, [], {})
+
+    assert cache.get("b") is None
+    assert cache.get("a") == b"1"
+
+
+def test_memory_cache_lock_is_exclusive_until_released():
+    cache = MemoryCache()
+    token = cache.acquire_lock("k", 5)
+
+    assert token is not None
+    assert cache.acquire_lock("k", 5) is None
+    cache.release_lock("k", token)
+    assert cache.acquire_lock("k", 5) is not None
+
+
+def test_document_list_is_cached_and_invalidated_by_writes(client):
+    client.post("/api/documents/", json={"name": "Leave", "description": "d", "link": "https://sp/1",
+                                         "location": "India"})
+
+    first = client.get("/api/documents/")
+    second = client.get("/api/documents/")
+    assert (first.headers["x-cache"], second.headers["x-cache"]) == ("MISS", "HIT")
+
+    client.post("/api/documents/", json={"name": "Travel", "description": "d", "link": "https://sp/2",
+                                         "location": "UK"})
+    after_write = client.get("/api/documents/")
+    assert after_write.headers["x-cache"] == "MISS"
+    assert after_write.json()["total"] == 2
+
+
+def test_concurrent_misses_share_one_build():
+    from starlette.requests import Request
+    from app.services.cache import ResponseCache
+
+    cache = ResponseCache(MemoryCache())
+    builds = 0
+
+    async def build():
+        nonlocal builds
+        builds += 1
+        await asyncio.sleep(0.05)
+        return {"ok": True}
+
+    def request():
+        return Request({"type": "http", "method": "GET", "path": "/x", "query_string": b"", "headers": []})
+
+    async def main():
+        return await asyncio.gather(*[cache.cached_json(request(), ["t"], build) for _ in range(10)])
+
+    responses = asyncio.run(main())
+    assert builds == 1
+    assert [json.loads(r.body) for r in responses] == [{"ok": True}] * 10
+
+
+def _redis_cache():
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")  # fakeredis runs the Lua scripts through lupa
+    from app.services.cache import RedisCache
+    return RedisCache(client=fakeredis.FakeRedis())
+
+
+def test_redis_cache_refuses_a_fill_that_raced_an_invalidation():
+    cache = _redis_cache()
+    versions = cache.tag_versions(["documents"])
+
+    assert cache.set("/api/documents/?", b"fresh", 60, ["documents"], versions) is True
+    assert cache.get("/api/documents/?") == b"fresh"
+
+    cache.invalidate_tags(["documents"])
+    assert cache.get("/api/documents/?") is None
+    assert cache.set("/api/documents/?", b"stale", 60, ["documents"], versions) is False
+    assert cache.get("/api/documents/?") is None
+
+
+def test_redis_cache_invalidates_by_tag():
+    cache = _redis_cache()
+    cache.set("a", b"1", 60, ["documents", "document:1"], {})
+    cache.set("b", b"2", 60, ["document:2"], {})
+
+    cache.invalidate_tags(["document:1"])
+
+    assert cache.get("a") is None
+    assert cache.get("b") == b"2"
+    assert cache.tag_versions(["document:1", "document:2"]) == {"document:1": 1, "document:2": 0}
+
+
+@pytest.mark.parametrize("make_cache", [MemoryCache, _redis_cache])
+def test_backends_report_recent_invalidations(make_cache):
+    import time
+
+    cache = make_cache()
+    before = time.time() - 1
+    assert cache.invalidated_since(["documents"], before) is False
+
+    cache.invalidate_tags(["documents"])
+
+    assert cache.invalidated_since(["documents", "posts"], before) is True
+    assert cache.invalidated_since(["posts"], before) is False
+    assert cache.invalidated_since(["documents"], time.time() + 1) is False
@@ -0,0 +1,140 @@
+import asyncio
+
+import pytest
+
+from app.services import blob_store
+from app.services.conditional import MAX_RANGES
+
+BODY = bytes(range(256)) * 4
+
+
+@pytest.fixture
+def url(client):
+    post = client.post("/api/posts/", data={"title": "Files", "author": "hr"},
+                       files=[("files", ("data.bin", BODY, "application/octet-stream"))]).json()
+    return f"/api/posts/{post['id']}/attachments/{post['attachments'][0]['id']}"
+
+
+@pytest.fixture
+def full(client, url):
+    response = client.get(url)
+    assert response.status_code == 200
+    return response
+
+
+def test_full_download_carries_validators(full):
+    assert full.content == BODY
+    assert full.headers["content-length"] == str(len(BODY))
+    assert full.headers["accept-ranges"] == "bytes"
+    assert full.headers["etag"].startswith('"') and full.headers["last-modified"]
+
+
+@pytest.mark.parametrize("header", ["etag", "weak etag", "list", "star"])
+def test_if_none_match_is_not_modified(client, url, full, header):
+    etag = full.headers["etag"]
+    value = {"etag": etag, "weak etag": f"W/{etag}", "list": f'"other", {etag}', "star": "*"}[header]
+
+    response = client.get(url, headers={"If-None-Match": value})
+
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+
+
+def test_a_different_etag_is_a_full_response(client, url, full):
+    assert client.get(url, headers={"If-None-Match": '"other"'}).status_code == 200
+
+
+def test_if_modified_since(client, url, full):
+    last_modified = full.headers["last-modified"]
+
+    assert client.get(url, headers={"If-Modified-Since": last_modified}).status_code == 304
+    assert client.get(url, headers={"If-Modified-Since": "Mon, 01 Jan 2001 00:00:00 GMT"}).status_code == 200
+    # If-None-Match wins over If-Modified-Since
+    both = {"If-None-Match": '"other"', "If-Modified-Since": last_modified}
+    assert client.get(url, headers=both).status_code == 200
+
+
+@pytest.mark.parametrize("spec,start,end", [
+    ("bytes=0-99", 0, 100),
+    ("bytes=1000-", 1000, 1024),
+    ("bytes=-24", 1000, 1024),
+    ("bytes=1000-5000", 1000, 1024),
+])
+def test_single_range_is_partial_content(client, url, spec, start, end):
+    response = client.get(url, headers={"Range": spec})
+
+    assert response.status_code == 206
+    assert response.content == BODY[start:end]
+    assert response.headers["content-range"] == f"bytes {start}-{end - 1}/{len(BODY)}"
+    assert response.headers["content-length"] == str(end - start)
+
+
+def test_several_ranges_are_multipart(client, url):
+    response = client.get(url, headers={"Range": "bytes=0-9, 100-109"})
+
+    assert response.status_code == 206
+    content_type = response.headers["content-type"]
+    assert content_type.startswith("multipart/byteranges; boundary=")
+    boundary = content_type.split("boundary=")[1].encode()
+    assert response.headers["content-length"] == str(len(response.content))
+    parts = [p for p in response.content.split(b"--" + boundary) if p.strip() not in (b"", b"--")]
+    assert len(parts) == 2
+    for part, (start, end) in zip(parts, [(0, 10), (100, 110)]):
+        head, _, data = part.partition(b"\r\n\r\n")
+        assert f"Content-Range: bytes {start}-{end - 1}/{len(BODY)}".encode() in head
+        assert data[:-2] == BODY[start:end]
+
+
+def test_overlapping_and_excessive_ranges_are_coalesced(client, url):
+    overlapping = client.get(url, headers={"Range": "bytes=0-49, 20-99"})
+    assert overlapping.headers["content-range"] == f"bytes 0-99/{len(BODY)}"
+
+    many = ", ".join(f"{i * 10}-{i * 10}" for i in range(MAX_RANGES + 1))
+    coalesced = client.get(url, headers={"Range": f"bytes={many}"})
+    assert coalesced.headers["content-range"] == f"bytes 0-{MAX_RANGES * 10}/{len(BODY)}"
+
+
+def test_unsatisfiable_range(client, url):
+    response = client.get(url, headers={"Range": "bytes=5000-6000"})
+
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(BODY)}"
+
+
+@pytest.mark.parametrize("spec", ["items=0-9", "bytes=9-0", "bytes=abc"])
+def test_malformed_ranges_are_ignored(client, url, spec):
+    response = client.get(url, headers={"Range": spec})
+
+    assert (response.status_code, response.content) == (200, BODY)
+
+
+def test_if_range(client, url, full):
+    matching = client.get(url, headers={"Range": "bytes=0-9", "If-Range": full.headers["etag"]})
+    by_date = client.get(url, headers={"Range": "bytes=0-9", "If-Range": full.headers["last-modified"]})
+    stale = client.get(url, headers={"Range": "bytes=0-9", "If-Range": '"other"'})
+
+    assert (matching.status_code, matching.content) == (206, BODY[:10])
+    assert by_date.status_code == 206
+    assert (stale.status_code, stale.content) == (200, BODY)
+
+
+@pytest.mark.parametrize("headers", [{}, {"Range": "bytes=0-9"}, {"Range": "bytes=0-9, 20-29"}])
+def test_blobs_are_opened_off_the_event_loop(client, url, monkeypatch, headers):
+    on_loop = []
+    original = blob_store.LocalBlobStore.open
+
+    def recording_open(self, key, start=0, end=None):
+        try:
+            asyncio.get_running_loop()
+            on_loop.append(True)
+        except RuntimeError:
+            on_loop.append(False)
+        return original(self, key, start, end)
+
+    monkeypatch.setattr(blob_store.LocalBlobStore, "open", recording_open)
+
+    response = client.get(url, headers=headers)
+
+    assert response.status_code in (200, 206)
+    assert on_loop and not any(on_loop)
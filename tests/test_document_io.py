@@ -0,0 +1,128 @@
+import csv
+import io
+import json
+
+import pytest
+
+
+def _import(client, body, content_type, **params):
+    response = client.post("/api/documents/bulk", content=body.encode(), params=params,
+                           headers={"Content-Type": content_type})
+    assert response.status_code == 200
+    return response.json()
+
+
+def _export(client, format):
+    response = client.get("/api/documents/export", params={"format": format})
+    assert response.status_code == 200
+    return response
+
+
+def _documents(export) -> list:
+    """The exported documents without their timestamps (an update moves them)."""
+    if export.headers["content-type"].startswith("text/csv"):
+        records = [{**row, "id": int(row["id"])} for row in csv.DictReader(io.StringIO(export.text))]
+    else:
+        records = [json.loads(line) for line in export.text.splitlines()]
+    return [{k: record[k] for k in ("id", "name", "description", "link", "location")} for record in records]
+
+
+def _ndjson(*rows) -> str:
+    return "".join(json.dumps(row) + "\n" for row in rows)
+
+
+def test_ndjson_import_creates_updates_and_reports_bad_rows(client):
+    client.post("/api/documents/", json={"name": "Old", "description": "d", "link": "https://sp/1"})
+    body = (
+        _ndjson({"name": "Leave", "description": "Annual leave", "link": "https://sp/1", "location": "Germany"},
+                {"name": "Travel", "link": "https://sp/2"})
+        + "{not json\n"
+        + "\n"
+        + _ndjson(["a", "list"], {"description": "no name", "link": "https://sp/3"})
+    )
+
+    report = _import(client, body, "application/x-ndjson")
+
+    assert (report["created"], report["updated"], report["failed"]) == (1, 1, 3)
+    assert [e["line"] for e in report["errors"]] == [3, 5, 6]
+    assert report["errors"][1]["errors"] == ["expected a JSON object"]
+    assert report["errors"][2]["errors"][0].startswith("name:")
+    documents = {d["link"]: d for d in client.get("/api/documents/").json()["documents"]}
+    assert (documents["https://sp/1"]["name"], documents["https://sp/1"]["location"]) == ("Leave", "Germany")
+    assert documents["https://sp/2"]["location"] == "India"
+
+
+def test_csv_import_reads_quoted_fields_across_lines(client):
+    body = (
+        "﻿Name,Description,Link,Location\r\n"
+        'Leave,"Annual leave:\r\n- 25 days\r\n- ""carry over"" up to 5",https://sp/1,Germany\r\n'
+        "Travel,,https://sp/2,\r\n"
+    )
+
+    report = _import(client, body, "text/csv; charset=utf-8")
+
+    assert (report["created"], report["failed"]) == (2, 0)
+    documents = {d["link"]: d for d in client.get("/api/documents/").json()["documents"]}
+    assert documents["https://sp/1"]["description"] == 'Annual leave:\r\n- 25 days\r\n- "carry over" up to 5'
+    # empty cells fall back to the defaults
+    assert (documents["https://sp/2"]["description"], documents["https://sp/2"]["location"]) == (None, "India")
+
+
+def test_csv_import_reports_bad_rows_by_their_first_line(client):
+    body = (
+        "name,description,link,location\n"
+        '"Multi\nline",d,https://sp/1,India\n'
+        "Short,https://sp/2\n"
+        ",d,https://sp/3,India\n"
+        'Open,"never closed,https://sp/4,India\n'
+    )
+
+    report = _import(client, body, "text/csv")
+
+    assert (report["created"], report["failed"]) == (1, 3)
+    assert [(e["line"], e["errors"][0]) for e in report["errors"]] == [
+        (4, "expected 4 columns, got 2"),
+        (5, "name: field required"),
+        (6, "unterminated quoted field"),
+    ]
+
+
+def test_the_format_comes_from_the_query_or_the_content_type(client):
+    body = _ndjson({"name": "Leave", "link": "https://sp/1"})
+
+    assert _import(client, body, "text/plain", format="ndjson")["created"] == 1
+    response = client.post("/api/documents/bulk", content=body.encode(), headers={"Content-Type": "text/plain"})
+    assert response.status_code == 415
+
+
+@pytest.mark.parametrize("format", ["csv", "ndjson"])
+def test_export_round_trips_through_import(client, format):
+    rows = [{"name": f"Doc {i}", "description": f'Line one\nline "two" for {i}', "link": f"https://sp/{i}",
+             "location": "Germany" if i % 2 else "India"} for i in range(5)]
+    _import(client, _ndjson(*rows), "application/x-ndjson")
+    before = _export(client, format)
+
+    report = _import(client, before.text, before.headers["content-type"])
+
+    assert (report["created"], report["updated"], report["failed"]) == (0, 5, 0)
+    expected = [{"id": i + 1, **row} for i, row in enumerate(rows)]
+    assert _documents(_export(client, format)) == _documents(before) == expected
+
+
+def test_export_formats(client):
+    _import(client, _ndjson({"name": "Leave", "description": "a, b\nc", "link": "https://sp/1"}),
+            "application/x-ndjson")
+
+    ndjson = _export(client, "ndjson")
+    exported = _export(client, "csv")
+
+    assert ndjson.headers["content-type"].startswith("application/x-ndjson")
+    (document,) = [json.loads(line) for line in ndjson.text.splitlines()]
+    assert (document["name"], document["description"]) == ("Leave", "a, b\nc")
+    assert exported.headers["content-disposition"] == 'attachment; filename="documents.csv"'
+    (row,) = csv.DictReader(io.StringIO(exported.text))
+    assert (row["id"], row["description"], row["location"]) == (str(document["id"]), "a, b\nc", "India")
+
+
+def test_empty_csv_export_still_has_a_header(client):
+    assert _export(client, "csv").text.strip().split(",")[:2] == ["name", "description"]
@@ -0,0 +1,56 @@
+import importlib.util
+from pathlib import Path
+
+import pytest
+
+from app.models.post import EXCERPT_LENGTH
+from app.services.text import make_excerpt
+
+MIGRATION = Path(__file__).parent.parent / "alembic" / "versions" / "c1e8a4f7b2d9_add_post_excerpt.py"
+
+SAMPLES = [
+    None,
+    "<p>Plain words</p>",
+    "<p>Welcome &lt;img src=x onerror=alert(1)&gt; party</p>",
+    "<style>p {}</style><p>Tom &amp; Jerry say &quot;hi&quot;</p>",
+    "<p>" + "&lt;&amp; " * 100 + "</p>",
+    "<p>" + "word " * 100 + "</p>",
+]
+
+
+def test_escaped_markup_stays_escaped():
+    excerpt = make_excerpt("<p>Welcome &lt;img src=x onerror=alert(1)&gt; party</p>")
+
+    assert excerpt == "Welcome &lt;img src=x onerror=alert(1)&gt; party"
+
+
+@pytest.mark.parametrize("html", SAMPLES)
+def test_excerpt_fits_the_column_once_escaped(html):
+    excerpt = make_excerpt(html, EXCERPT_LENGTH)
+
+    assert len(excerpt) <= EXCERPT_LENGTH
+    assert "<" not in excerpt
+
+
+def test_long_text_is_cut_at_a_word_boundary():
+    excerpt = make_excerpt("<p>" + "word " * 100 + "</p>", 20)
+
+    assert excerpt == "word word word…"
+
+
+def test_migration_backfill_matches_the_app():
+    spec = importlib.util.spec_from_file_location("add_post_excerpt", MIGRATION)
+    migration = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(migration)
+
+    for html in SAMPLES:
+        assert migration.make_excerpt(html, EXCERPT_LENGTH) == make_excerpt(html, EXCERPT_LENGTH)
+
+
+def test_summary_feed_serves_the_escaped_excerpt(client):
+    client.post("/api/posts/", data={"title": "Party", "author": "hr",
+                                     "description": "<p>Bring &lt;script&gt; snacks</p>"})
+
+    (post,) = client.get("/api/posts/", params={"view": "summary"}).json()["posts"]
+
+    assert post["excerpt"] == "Bring &lt;script&gt; snacks"
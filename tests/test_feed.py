@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models.post import Attachment, AttachmentVariant, Post, Reaction, Reply
+from app.services.feed import get_post_response, list_post_page
+
+# total, page, attachments (selectin), variants (selectin), reaction counts, liked users
+FULL_PAGE_STATEMENTS = 6
+
+
+def _seed_posts(db, count: int):
+    now = datetime.utcnow()
+    for i in range(count):
+        post = Post(title=f"Post {i}", description=f"<p>body {i}</p>", author="hr",
+                    created_at=now - timedelta(minutes=i), updated_at=now - timedelta(minutes=i))
+        post.attachments = [
+            Attachment(filename=f"{i}-{n}.png", content_type="image/png", size=10, is_image=True,
+                       storage_key=f"key{i}{n}", sha256=f"key{i}{n}",
+                       variants=[AttachmentVariant(name="thumb", content_type="image/webp", width=32, height=32,
+                                                   size=5, storage_key=f"thumb{i}{n}", sha256=f"thumb{i}{n}")])
+            for n in range(2)
+        ]
+        post.reactions = [Reaction(user=f"user{u}", reaction="like" if u % 2 else "love") for u in range(3)]
+        post.replies = [Reply(user="user0", content="nice")]
+        db.add(post)
+    db.commit()
+
+
+@pytest.mark.parametrize("posts,limit", [(1, 50), (10, 50), (60, 50), (100, 100), (150, 100)])
+def test_feed_page_statement_count_does_not_grow_with_the_page(db, count_statements, posts, limit):
+    _seed_posts(db, posts)
+    db.expunge_all()
+    count_statements.reset()
+
+    page = list_post_page(db, limit=limit)
+
+    assert len(page.posts) == min(posts, limit)
+    assert count_statements.count == FULL_PAGE_STATEMENTS
+    first = page.posts[0]
+    assert first.reaction_counts == {"like": 1, "love": 2}
+    assert sorted(first.liked_users) == ["user1"]
+    assert len(first.attachments) == 2 and first.attachments[0].variants[0].name == "thumb"
+
+
+def test_feed_without_total_skips_the_count(db, count_statements):
+    _seed_posts(db, 5)
+    db.expunge_all()
+    count_statements.reset()
+
+    list_post_page(db, limit=50, count="none")
+
+    assert count_statements.count == FULL_PAGE_STATEMENTS - 1
+
+
+def test_summary_view_loads_no_child_rows(db, count_statements):
+    _seed_posts(db, 5)
+    db.expunge_all()
+    count_statements.reset()
+
+    page = list_post_page(db, limit=50, view="summary", count="none")
+
+    # the page and one GROUP BY for attachment counts; no attachment, variant or liked-user loads
+    assert count_statements.count == 2
+    assert "description" not in count_statements.statements[0]
+    assert len(page.posts) == 5
+
+
+def test_single_post_uses_the_same_loader(db, count_statements):
+    _seed_posts(db, 1)
+    db.expunge_all()
+    count_statements.reset()
+
+    post = get_post_response(db, 1)
+
+    assert post.title == "Post 0"
+    assert count_statements.count == FULL_PAGE_STATEMENTS - 1
+
+
+def test_feed_endpoint_statement_count_is_reported(client, db):
+    _seed_posts(db, 20)
+
+    response = client.get("/api/posts/", params={"limit": 20})
+
+    assert response.status_code == 200
+    assert f'desc="{FULL_PAGE_STATEMENTS} queries"' in response.headers["server-timing"]
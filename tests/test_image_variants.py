@@ -0,0 +1,72 @@
+import io
+
+import pytest
+from sqlalchemy import select
+
+from app.models.blob import Blob
+from app.models.post import AttachmentVariant
+from app.services import images
+from app.services.conditional import IMMUTABLE_CACHE_CONTROL, VARIANT_PENDING_CACHE_CONTROL
+
+Image = pytest.importorskip("PIL.Image")
+
+
+def _png(shade: int = 0) -> bytes:
+    out = io.BytesIO()
+    Image.new("RGB", (1600, 900), (200, 40, 120 * shade)).save(out, "PNG")
+    return out.getvalue()
+
+
+def _upload_images(client, count: int = 1):
+    files = [("files", (f"photo{i}.png", _png(i), "image/png")) for i in range(count)]
+    post = client.post("/api/posts/", data={"title": "Photos", "author": "hr"}, files=files).json()
+    return post["id"], [a["id"] for a in post["attachments"]]
+
+
+def test_pending_variant_falls_back_with_a_short_cache_lifetime(client, db):
+    post_id, (att_id,) = _upload_images(client)
+    url = f"/api/posts/{post_id}/attachments/{att_id}"
+
+    original = client.get(url)
+    fallback = client.get(url, params={"variant": "thumb"})
+    assert fallback.content == original.content
+    assert fallback.headers["cache-control"] == VARIANT_PENDING_CACHE_CONTROL
+    assert original.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+
+    images.generate_variants(db, [att_id])
+    thumb = client.get(url, params={"variant": "thumb"})
+    assert thumb.headers["content-type"] == "image/webp"
+    assert thumb.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+    assert thumb.headers["etag"] != fallback.headers["etag"]
+
+
+def test_racing_variant_jobs_do_not_abort_the_batch(client, db, monkeypatch):
+    from app.database import SessionLocal
+
+    _, (raced_id, other_id) = _upload_images(client, 2)
+    render = images.render_variants
+    other_worker = SessionLocal()
+    raced = []
+
+    def render_after_the_other_worker(store, att):
+        # the backfill command renders the same attachment first and commits
+        if att.id == raced_id and not raced:
+            raced.append(att.id)
+            images.generate_variants(other_worker, [raced_id])
+        return render(store, att)
+
+    monkeypatch.setattr(images, "render_variants", render_after_the_other_worker)
+    try:
+        created = images.generate_variants(db, [raced_id, other_id])
+    finally:
+        other_worker.close()
+
+    assert created == 2  # only the attachment nobody else handled
+    names = db.execute(select(AttachmentVariant.attachment_id, AttachmentVariant.name)).all()
+    assert sorted(names) == sorted([(raced_id, "thumb"), (raced_id, "medium"),
+                                    (other_id, "thumb"), (other_id, "medium")])
+    variant_keys = set(db.scalars(select(AttachmentVariant.storage_key)))
+    blobs = {b.key: b for b in db.scalars(select(Blob))}
+    # one reference per variant row, and no stored variant without a blobs row
+    assert all(blobs[key].ref_count == 1 for key in variant_keys)
+    assert all(b.ref_count >= 0 for b in blobs.values())
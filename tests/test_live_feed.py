@@ -0,0 +1,206 @@
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.main import app
+from app.services import live_feed
+from app.services.live_feed import LiveFeed
+
+
+async def _next(subscription):
+    return await asyncio.wait_for(subscription.queue.get(), 2)
+
+
+def test_engagement_is_coalesced_per_post():
+    async def run():
+        feed = LiveFeed(coalesce_window=0.05)
+        subscription = feed.subscribe()
+        for _ in range(3):
+            feed.record_engagement(1, views_count=1)
+        feed.record_engagement(1, **{"reactions_count": 1, "reaction:like": 1})
+        feed.record_engagement(2, shares_count=1)
+        # cancels out, so post 3 gets no event at all
+        feed.record_engagement(3, **{"reactions_count": 1, "reaction:like": 1})
+        feed.record_engagement(3, **{"reactions_count": -1, "reaction:like": -1})
+        events = [await _next(subscription), await _next(subscription)]
+        await feed.shutdown()
+        return events, subscription.queue.qsize()
+
+    events, left = asyncio.run(run())
+
+    assert [(e.event, e.data) for e in events] == [
+        ("engagement", {"post_id": 1, "views_count": 3, "reactions_count": 1, "reaction_counts": {"like": 1}}),
+        ("engagement", {"post_id": 2, "shares_count": 1}),
+    ]
+    assert left == 1  # only the end-of-stream marker from shutdown
+
+
+def test_engagement_recorded_off_the_loop_is_sent_on_shutdown():
+    async def run():
+        feed = LiveFeed(coalesce_window=60)
+        subscription = feed.subscribe()
+        await asyncio.to_thread(feed.record_engagement, 7, replies_count=2)
+        await feed.shutdown()
+        return await _next(subscription)
+
+    assert asyncio.run(run()).data == {"post_id": 7, "replies_count": 2}
+
+
+def test_a_subscriber_resumes_after_its_last_event_id():
+    async def run():
+        feed = LiveFeed()
+        for i in range(3):
+            feed.publish("post.created", {"id": i})
+        first = list(feed._history)[0]
+        subscription = feed.subscribe(first.id)
+        events = [await _next(subscription), await _next(subscription)]
+        await feed.shutdown()
+        return events, subscription.queue.qsize()
+
+    events, left = asyncio.run(run())
+
+    assert [e.data["id"] for e in events] == [1, 2]
+    assert left == 1
+
+
+def test_an_id_older_than_the_history_gets_a_reset():
+    async def run():
+        feed = LiveFeed(history_size=2)
+        feed.publish("post.created", {"id": 0})
+        missed = list(feed._history)[0].id
+        for i in range(1, 4):
+            feed.publish("post.created", {"id": i})
+        subscription = feed.subscribe(missed)
+        reset = await _next(subscription)
+        feed.publish("post.created", {"id": 4})
+        after = await _next(subscription)
+        await feed.shutdown()
+        return reset, after, list(feed._history)
+
+    reset, after, history = asyncio.run(run())
+
+    assert reset.event == "reset"
+    assert reset.id == history[-2].id  # resuming from the reset picks up what follows it
+    assert after.data == {"id": 4}
+
+
+def test_a_stalled_subscriber_is_disconnected():
+    async def run():
+        feed = LiveFeed(queue_size=2)
+        subscription = feed.subscribe()
+        for i in range(3):
+            feed.publish("post.created", {"id": i})
+        events = [event async for event in feed.listen(subscription, heartbeat=1)]
+        await feed.shutdown()
+        return events
+
+    assert asyncio.run(run()) == []
+
+
+async def _sse(path, count, headers=(), publish=None):
+    """Read `count` events from an SSE endpoint, calling `publish` once the stream is open."""
+    scope = {"type": "http", "http_version": "1.1", "method": "GET", "scheme": "http", "root_path": "",
+             "path": path, "raw_path": path.encode(), "query_string": b"", "server": ("test", 80),
+             "client": ("test", 1), "headers": [(k.lower().encode(), v.encode()) for k, v in headers]}
+    body, opened, received, disconnected = b"", asyncio.Event(), asyncio.Event(), asyncio.Event()
+    response = {}
+
+    async def receive():
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal body
+        if message["type"] == "http.response.start":
+            response.update(message)
+            return
+        body += message.get("body", b"")
+        opened.set()
+        if body.count(b"\nevent: ") >= count:
+            received.set()
+
+    task = asyncio.create_task(app(scope, receive, send))
+    await asyncio.wait_for(opened.wait(), 2)
+    if publish:
+        publish()
+    await asyncio.wait_for(received.wait(), 2)
+    disconnected.set()
+    await asyncio.wait_for(task, 2)
+    await live_feed.shutdown()
+    return response, body.decode()
+
+
+def test_sse_delivers_events():
+    def publish():
+        live_feed.publish("post.created", {"id": 1, "title": "Town hall"})
+
+    response, body = asyncio.run(_sse("/api/posts/stream", 1, publish=publish))
+
+    assert response["status"] == 200
+    assert dict(response["headers"])[b"content-type"].startswith(b"text/event-stream")
+    retry, event = body.strip().split("\n\n")
+    assert retry == "retry: 3000"
+    event_id, name, data = event.split("\n")
+    assert event_id.startswith("id: ")
+    assert (name, json.loads(data[len("data: "):])) == ("event: post.created", {"id": 1, "title": "Town hall"})
+
+
+def test_sse_resumes_from_the_last_event_id_header():
+    async def run():
+        feed = live_feed.get_live_feed()
+        feed.publish("post.created", {"id": 1})
+        first = list(feed._history)[0].id
+        feed.publish("post.created", {"id": 2})
+        return await _sse("/api/posts/stream", 1, headers=[("Last-Event-ID", first)])
+
+    _, body = asyncio.run(run())
+
+    assert '"id":2' in body and '"id":1' not in body
+
+
+@pytest.fixture
+def api(monkeypatch):
+    monkeypatch.setattr(settings, "live_feed_coalesce_window", 0.05)
+    # one event loop for requests and the socket, so events published by a request reach it
+    with TestClient(app) as api:
+        yield api
+
+
+def test_websocket_receives_post_events_and_engagement(api):
+    with api.websocket_connect("/api/posts/ws") as socket:
+        post_id = api.post("/api/posts/", data={"title": "Town hall", "author": "hr"}).json()["id"]
+        created = socket.receive_json()
+        for user in ("a", "b"):
+            api.post(f"/api/posts/{post_id}/reactions", data={"user": user, "reaction": "like"})
+        # the two reactions may land in one coalescing window or two
+        engagement = [socket.receive_json()]
+        while sum(e["data"]["reactions_count"] for e in engagement) < 2:
+            engagement.append(socket.receive_json())
+        api.delete(f"/api/posts/{post_id}")
+        deleted = socket.receive_json()
+
+    assert created["event"] == "post.created"
+    assert (created["data"]["id"], created["data"]["title"]) == (post_id, "Town hall")
+    assert {e["event"] for e in engagement} == {"engagement"}
+    assert {e["data"]["post_id"] for e in engagement} == {post_id}
+    assert all(set(e["data"]) == {"post_id", "reactions_count", "reaction_counts"} for e in engagement)
+    assert (deleted["event"], deleted["data"]) == ("post.deleted", {"id": post_id})
+
+
+def test_websocket_resumes_or_resets(api):
+    with api.websocket_connect("/api/posts/ws") as socket:
+        for title in ("First", "Second"):
+            api.post("/api/posts/", data={"title": title, "author": "hr"})
+        first = socket.receive_json()
+        socket.receive_json()
+
+    with api.websocket_connect(f"/api/posts/ws?last_event_id={first['id']}") as socket:
+        resumed = socket.receive_json()
+    with api.websocket_connect("/api/posts/ws?last_event_id=0-0") as socket:
+        reset = socket.receive_json()
+
+    assert resumed["data"]["title"] == "Second"
+    assert reset["event"] == "reset"
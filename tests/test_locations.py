@@ -0,0 +1,93 @@
+import importlib.util
+from pathlib import Path
+
+import pytest
+
+from app.models.location import Location
+from app.services.locations import CODE_LENGTH, LocationConflict, canonical, resolve_location
+
+MIGRATION = Path(__file__).parent.parent / "alembic" / "versions" / "e2c7a9f4b1d6_normalize_document_locations.py"
+
+SAMPLES = ["India", " india ", "IN", "U.S.A.", "Hyderabad Campus North", "Hyderabad Campus South",
+           "United Arab Emirates - Dubai", "United Arab Emirates - Abu Dhabi", "São Paulo", "!!!",
+           "A very long campus name that keeps going well past the code column - Building 1",
+           "A very long campus name that keeps going well past the code column - Building 2"]
+
+
+def _document(client, link, location):
+    return client.post("/api/documents/", json={"name": "Policy", "description": "d", "link": link,
+                                                "location": location})
+
+
+def test_known_aliases_share_a_code():
+    assert canonical(" india ") == canonical("IN") == ("IN", "India")
+
+
+@pytest.mark.parametrize("first,second", [
+    ("Hyderabad Campus North", "Hyderabad Campus South"),
+    ("United Arab Emirates - Dubai", "United Arab Emirates - Abu Dhabi"),
+    (SAMPLES[-2], SAMPLES[-1]),
+])
+def test_distinct_names_get_distinct_codes(first, second):
+    assert canonical(first)[0] != canonical(second)[0]
+    assert len(canonical(first)[0]) <= CODE_LENGTH
+
+
+def test_spelling_variants_share_a_code():
+    assert canonical("Hyderabad  campus-north")[0] == canonical("Hyderabad Campus North")[0]
+
+
+def test_filters_keep_similar_locations_apart(client):
+    _document(client, "https://sp/1", "Hyderabad Campus North")
+    _document(client, "https://sp/2", "Hyderabad Campus South")
+
+    north = client.get("/api/documents/", params={"location": "Hyderabad Campus North"}).json()
+
+    assert [d["location"] for d in north["documents"]] == ["Hyderabad Campus North"]
+    facets = client.get("/api/documents/facets").json()["locations"]
+    assert sorted(f["name"] for f in facets) == ["Hyderabad Campus North", "Hyderabad Campus South"]
+
+
+def test_a_code_held_by_another_name_is_refused(client, db):
+    # e.g. a row left by an older scheme that truncated codes
+    db.add(Location(code="HYDERABAD_CAMPUS", name="Hyderabad Campus North"))
+    db.commit()
+
+    with pytest.raises(LocationConflict):
+        resolve_location(db, "Hyderabad Campus")
+    db.rollback()
+
+    response = _document(client, "https://sp/3", "Hyderabad Campus")
+    assert response.status_code == 409
+
+
+def test_migration_codes_match_the_app():
+    spec = importlib.util.spec_from_file_location("normalize_document_locations", MIGRATION)
+    migration = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(migration)
+
+    for value in SAMPLES:
+        assert migration.canonical(value) == canonical(value)
+
+
+@pytest.mark.parametrize("cleared", [None, "   "])
+def test_clearing_a_location_falls_back_to_the_default(client, cleared):
+    document_id = _document(client, "https://sp/1", "Hyderabad Campus North").json()["id"]
+
+    response = client.put(f"/api/documents/{document_id}", json={"location": cleared})
+
+    assert response.status_code == 200
+    assert response.json()["location"] == "India"
+    assert client.get("/api/documents/", params={"location": "Hyderabad Campus North"}).json()["total"] == 0
+    assert client.get("/api/documents/", params={"location": "IN"}).json()["total"] == 1
+    facets = client.get("/api/documents/facets").json()["locations"]
+    assert [(f["name"], f["count"]) for f in facets] == [("India", 1)]
+
+
+def test_changing_a_location_moves_the_document(client):
+    document_id = _document(client, "https://sp/1", "India").json()["id"]
+
+    client.put(f"/api/documents/{document_id}", json={"location": "u.s.a."})
+
+    assert client.get("/api/documents/", params={"location": "India"}).json()["total"] == 0
+    assert client.get("/api/documents/", params={"location": "USA"}).json()["total"] == 1
@@ -0,0 +1,72 @@
+import base64
+import json
+from datetime import datetime
+
+import pytest
+
+from app.models.document import Document
+from app.models.post import Post
+from app.services.pagination import InvalidCursor, decode_cursor, encode_cursor
+
+
+def _token(payload) -> str:
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+TAMPERED = [
+    "W10",  # []
+    "not-base64!",
+    _token({"created": 1}),
+    _token(["created"]),
+    _token(["created", 1, 2]),
+    _token(["created", {"dt": "yesterday"}, 2]),
+    _token(["created", {"dt": "2025-01-01T00:00:00"}, "2"]),
+    _token(["created", {"dt": "2025-01-01T00:00:00"}, True]),
+    _token(["name", {"a": 1}, 2]),
+    _token(["name", "Leave", None]),
+    _token(["search", "high", "post", 1]),
+    _token(["replies-oldest", {"dt": "2025-01-01T00:00:00"}, [1]]),
+]
+
+
+def test_cursor_round_trip():
+    created = datetime(2025, 12, 12, 10, 0, 0)
+    cursor = encode_cursor("created", created, 42)
+
+    assert decode_cursor(cursor, "created", (datetime, int)) == (created, 42)
+    assert decode_cursor(encode_cursor("search", 1, "post", 7), "search", (float, str, int)) == (1.0, "post", 7)
+
+
+@pytest.mark.parametrize("cursor", TAMPERED)
+def test_tampered_cursors_are_invalid(cursor):
+    for kind, types in [("created", (datetime, int)), ("name", (str, int)), ("search", (float, str, int)),
+                        ("replies-oldest", (datetime, int))]:
+        with pytest.raises(InvalidCursor):
+            decode_cursor(cursor, kind, types)
+
+
+@pytest.mark.parametrize("cursor", TAMPERED)
+def test_tampered_cursors_are_a_bad_request(client, cursor):
+    post_id = client.post("/api/posts/", data={"title": "Hello", "author": "hr"}).json()["id"]
+
+    for url, params in [("/api/posts/", {}), ("/api/documents/", {"sort": "name"}),
+                        ("/api/documents/", {"sort": "updated"}), (f"/api/posts/{post_id}/replies", {}),
+                        ("/api/search/", {"q": "hello"})]:
+        response = client.get(url, params={**params, "cursor": cursor})
+        assert response.status_code == 400, (url, params)
+
+
+def test_next_cursor_continues_each_listing(client, db):
+    now = datetime.utcnow()
+    for i in range(3):
+        db.add(Post(title=f"Post {i}", author="hr", created_at=now, updated_at=now))
+        db.add(Document(name=f"Doc {i}", description="d", link=f"https://sp/{i}", updated_at=now))
+    db.commit()
+
+    for url, params, key in [("/api/posts/", {}, "posts"), ("/api/documents/", {"sort": "name"}, "documents"),
+                             ("/api/documents/", {"sort": "updated"}, "documents")]:
+        first = client.get(url, params={**params, "limit": 2}).json()
+        rest = client.get(url, params={**params, "limit": 2, "cursor": first["next_cursor"]})
+        assert rest.status_code == 200, (url, params)
+        ids = [row["id"] for row in first[key] + rest.json()[key]]
+        assert sorted(ids) == [1, 2, 3], (url, params)
@@ -0,0 +1,61 @@
+import asyncio
+
+from sqlalchemy import func, select, text
+
+from app.models.post import AttachmentVariant, PostView, Reaction, Reply, Share
+
+
+def _create_post(client, title="Hello"):
+    response = client.post("/api/posts/", data={"title": title, "author": "hr"})
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+def test_sqlite_connections_enforce_foreign_keys(database):
+    with database.connect() as conn:
+        assert conn.execute(text("PRAGMA foreign_keys")).scalar() == 1
+
+
+def test_async_sqlite_connections_enforce_foreign_keys(tmp_path):
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    async def check():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'async.db'}")
+        try:
+            async with engine.connect() as conn:
+                return (await conn.execute(text("PRAGMA foreign_keys"))).scalar()
+        finally:
+            await engine.dispose()
+
+    assert asyncio.run(check()) == 1
+
+
+def test_deleting_a_post_removes_its_engagement(client, db):
+    post_id = _create_post(client)
+    client.post(f"/api/posts/{post_id}/reactions", data={"user": "a", "reaction": "like"})
+    client.post(f"/api/posts/{post_id}/reactions", data={"user": "b", "reaction": "like"})
+    client.post(f"/api/posts/{post_id}/replies", data={"user": "a", "content": "first"})
+    client.post(f"/api/posts/{post_id}/shares", data={"user": "a", "platform": "teams"})
+    client.post(f"/api/posts/{post_id}/views", data={"user": "a"})
+
+    assert client.delete(f"/api/posts/{post_id}").status_code == 204
+
+    for model in (Reaction, Reply, Share, PostView, AttachmentVariant):
+        assert db.scalar(select(func.count()).select_from(model)) == 0, model.__name__
+
+
+def test_a_reused_post_id_starts_without_engagement(client):
+    old_id = _create_post(client, "Old")
+    client.post(f"/api/posts/{old_id}/reactions", data={"user": "a", "reaction": "like"})
+    client.post(f"/api/posts/{old_id}/replies", data={"user": "a", "content": "old reply"})
+    client.delete(f"/api/posts/{old_id}")
+
+    # SQLite hands out the highest id again once that row is gone
+    new_id = _create_post(client, "New")
+    assert new_id == old_id
+
+    post = client.get(f"/api/posts/{new_id}").json()
+    assert post["reaction_counts"] == {}
+    assert post["liked_users"] == []
+    assert post["reactions_count"] == 0
+    assert client.get(f"/api/posts/{new_id}/replies").json() == []
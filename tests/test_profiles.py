@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import database
+from app.config import override_settings, settings
+from app.factory import create_app
+
+
+@pytest.fixture
+def apps(monkeypatch):
+    """Both profiles in one process, with the env vars they set left unset."""
+    for name in ("CACHE_BACKEND", "DB_POOL_MODE", "VIEW_BUFFER_ENABLED", "LIVE_FEED_PG_NOTIFY", "IMAGE_VARIANTS_ENABLED"):
+        monkeypatch.delenv(name, raising=False)
+    worker = create_app("worker")
+    serverless = create_app("serverless")
+    return TestClient(worker), TestClient(serverless)
+
+
+def test_each_app_keeps_its_own_profile(apps):
+    worker, serverless = apps
+
+    assert worker.get("/").json()["profile"] == "worker"
+    assert serverless.get("/").json()["profile"] == "serverless"
+    # building the serverless app last did not change the process-wide settings
+    assert settings.cache_backend == "memory"
+
+
+def test_serverless_does_not_cache_responses(apps):
+    worker, serverless = apps
+
+    assert worker.get("/api/documents/").headers["x-cache"] == "MISS"
+    assert worker.get("/api/documents/").headers["x-cache"] == "HIT"
+    assert "x-cache" not in serverless.get("/api/documents/").headers
+
+
+def test_each_app_uses_an_engine_for_its_pool_mode(apps):
+    worker, serverless = apps
+
+    worker.get("/api/documents/")
+    serverless.get("/api/documents/")
+
+    modes = {mode: type(engine.pool).__name__ for (_, mode), engine in database._engines.items()}
+    assert modes["null"] == "NullPool"
+    assert modes["queue"] == "InstrumentedQueuePool"
+    assert serverless.get("/health").json()["database"]["primary"]["pool_class"] == "NullPool"
+
+
+def test_explicit_settings_win_over_the_profile(monkeypatch):
+    monkeypatch.setenv("CACHE_BACKEND", "memory")
+    serverless = TestClient(create_app("serverless"))
+
+    assert serverless.get("/api/documents/").headers["x-cache"] == "MISS"
+
+
+def test_serverless_does_not_render_variants_in_the_background(apps, monkeypatch):
+    from app.services import images
+
+    scheduled = []
+    monkeypatch.setattr(images, "_run_job", scheduled.append)
+    monkeypatch.setattr(settings, "image_variants_enabled", True)
+    monkeypatch.setattr(settings, "image_workers", 1)
+    worker, serverless = apps
+    png = b"\x89PNG\r\n\x1a\n" + b"\x00" * 64
+
+    for client in (serverless, worker):
+        client.post("/api/posts/", data={"title": "Photo", "author": "hr"},
+                    files=[("files", ("photo.png", png, "image/png"))])
+    images.shutdown()
+
+    assert scheduled == [[2]]
+
+
+@pytest.mark.parametrize("dependency", [database.get_session, database.get_read_session])
+def test_db_async_is_resolved_per_request(dependency):
+    from sqlalchemy.ext.asyncio import AsyncSession
+    from sqlalchemy.orm import Session
+    from starlette.requests import Request
+
+    async def session_type():
+        args = (Request({"type": "http", "headers": []}),) if dependency is database.get_read_session else ()
+        generator = dependency(*args)
+        db = await generator.__anext__()
+        await generator.aclose()
+        return type(db)
+
+    assert issubclass(asyncio.run(session_type()), Session)
+    with override_settings({"db_async": True}):
+        assert issubclass(asyncio.run(session_type()), AsyncSession)
+        asyncio.run(database.dispose_async_engine())
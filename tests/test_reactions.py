@@ -0,0 +1,68 @@
+import pytest
+
+
+@pytest.fixture
+def post_id(client):
+    return client.post("/api/posts/", data={"title": "Town hall", "author": "hr"}).json()["id"]
+
+
+def _react(client, post_id, user, reaction, **data):
+    return client.post(f"/api/posts/{post_id}/reactions", data={"user": user, "reaction": reaction, **data})
+
+
+def _counts(client, post_id):
+    post = client.get(f"/api/posts/{post_id}").json()
+    listed = next(p for p in client.get("/api/posts/").json()["posts"] if p["id"] == post_id)
+    assert listed["reactions_count"] == post["reactions_count"]
+    return post["reactions_count"], listed["reaction_counts"]
+
+
+def test_first_reaction_is_created(client, post_id):
+    response = _react(client, post_id, "alice", "like")
+
+    assert response.status_code == 201
+    assert (response.json()["user"], response.json()["reaction"]) == ("alice", "like")
+    assert _counts(client, post_id) == (1, {"like": 1})
+
+
+def test_repeating_a_reaction_returns_the_existing_one(client, post_id):
+    first = _react(client, post_id, "alice", "like")
+
+    repeat = _react(client, post_id, "alice", "like")
+
+    assert repeat.status_code == 200
+    assert repeat.json()["id"] == first.json()["id"]
+    assert _counts(client, post_id) == (1, {"like": 1})
+
+
+def test_reaction_types_are_normalised_to_lowercase(client, post_id):
+    assert _react(client, post_id, "alice", " Like ").json()["reaction"] == "like"
+    assert _react(client, post_id, "alice", "LIKE").status_code == 200
+    assert _react(client, post_id, "bob", "Celebrate").status_code == 201
+
+    assert _counts(client, post_id) == (2, {"like": 1, "celebrate": 1})
+
+
+def test_toggle_removes_an_existing_reaction(client, post_id):
+    assert _react(client, post_id, "alice", "like", toggle="true").status_code == 201
+
+    removed = _react(client, post_id, "alice", "Like", toggle="true")
+
+    assert removed.status_code == 204
+    assert _counts(client, post_id) == (0, {})
+    assert _react(client, post_id, "alice", "like", toggle="true").status_code == 201
+
+
+def test_delete_removes_the_reaction_once(client, post_id):
+    _react(client, post_id, "alice", "like")
+    _react(client, post_id, "bob", "like")
+    url = f"/api/posts/{post_id}/reactions"
+
+    assert client.delete(url, params={"user": "alice", "reaction": "LIKE"}).status_code == 204
+    assert client.delete(url, params={"user": "alice", "reaction": "like"}).status_code == 404
+    assert _counts(client, post_id) == (1, {"like": 1})
+
+
+def test_reacting_to_an_unknown_post_is_not_found(client, post_id):
+    assert _react(client, 999, "alice", "like").status_code == 404
+    assert _counts(client, post_id) == (0, {})
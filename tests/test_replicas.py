@@ -0,0 +1,105 @@
+import shutil
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import database as db_module
+from app.config import settings
+from app.factory import create_app
+from app.services import cache
+
+
+def _dispose_replicas():
+    for replica in db_module._replicas or []:
+        for engine in replica.engines.values():
+            engine.dispose()
+        replica.engines.clear()
+
+
+def _use_replicas(monkeypatch, urls):
+    monkeypatch.setattr(settings, "database_replica_urls", urls)
+    monkeypatch.setattr(settings, "db_replica_sticky_seconds", 1)
+    monkeypatch.setattr(db_module, "_replicas", None)
+    cache._build_response_cache.cache_clear()
+    return create_app("worker")
+
+
+@pytest.fixture
+def replica(database, tmp_path, monkeypatch):
+    """A second SQLite file standing in for a replica; call it to let the replica catch up."""
+    primary, path = tmp_path / "test.db", tmp_path / "replica.db"
+
+    def catch_up():
+        _dispose_replicas()
+        shutil.copy(primary, path)
+
+    catch_up()
+    app = _use_replicas(monkeypatch, [f"sqlite:///{path}"])
+    yield app, catch_up
+    _dispose_replicas()
+
+
+def _add_document(client, name, **kwargs):
+    return client.post("/api/documents/", json={"name": name, "description": "d", "link": f"https://sp/{name}",
+                                                "location": "India"}, **kwargs)
+
+
+def test_reads_go_to_the_replica_and_writers_read_their_writes(replica):
+    app, _ = replica
+    writer, other = TestClient(app), TestClient(app)
+
+    created = _add_document(writer, "Leave")
+    assert created.status_code == 201
+    assert db_module.READ_PRIMARY_COOKIE in writer.cookies
+
+    # the replica has not caught up: its answer is served but not cached
+    lagging = other.get("/api/documents/")
+    assert (lagging.json()["total"], lagging.headers["x-cache"]) == (0, "MISS")
+    assert other.get("/api/documents/").headers["x-cache"] == "MISS"
+
+    pinned = writer.get("/api/documents/")
+    assert (pinned.json()["total"], pinned.headers["x-cache"]) == (1, "BYPASS")
+
+    # the writer's primary read replaced the entry, so everyone sees the write now
+    after = other.get("/api/documents/")
+    assert (after.json()["total"], after.headers["x-cache"]) == (1, "HIT")
+
+
+def test_replica_reads_are_cached_once_the_lag_window_passed(replica):
+    app, catch_up = replica
+    client = TestClient(app)
+    _add_document(client, "Leave")
+    catch_up()
+    time.sleep(1.1)
+    client.cookies.clear()
+
+    assert client.get("/api/documents/").headers["x-cache"] == "MISS"
+    hit = client.get("/api/documents/")
+    assert (hit.json()["total"], hit.headers["x-cache"]) == (1, "HIT")
+
+
+def test_an_unreachable_replica_falls_back_to_the_primary(database, db, tmp_path, monkeypatch):
+    from app.models.document import Document
+
+    app = _use_replicas(monkeypatch, [f"sqlite:///{tmp_path / 'missing' / 'replica.db'}"])
+    db.add(Document(name="Leave", description="d", link="https://sp/1", location="India"))
+    db.commit()
+
+    response = TestClient(app).get("/api/documents/")
+
+    assert response.status_code == 200
+    assert response.json()["total"] == 1
+    assert not db_module.get_replicas()[0].healthy()
+
+
+@pytest.mark.parametrize("headers,same_site", [
+    ({}, "SameSite=Lax"),
+    ({"X-Forwarded-Proto": "https"}, "SameSite=None; Secure"),
+])
+def test_read_primary_cookie_is_cross_site_over_https(replica, headers, same_site):
+    app, _ = replica
+
+    response = _add_document(TestClient(app), "Leave", headers=headers)
+
+    assert response.headers["set-cookie"].endswith(same_site)
@@ -0,0 +1,68 @@
+import json
+
+import pytest
+
+from app.routes import posts as posts_routes
+
+
+@pytest.fixture
+def post_id(client):
+    post_id = client.post("/api/posts/", data={"title": "Town hall", "author": "hr"}).json()["id"]
+    for i in range(5):
+        response = client.post(f"/api/posts/{post_id}/replies", data={"user": f"user{i}", "content": f"Reply {i}"})
+        assert response.status_code == 201
+    return post_id
+
+
+def _all_pages(client, post_id, **params):
+    pages, cursor = [], None
+    for _ in range(10):
+        response = client.get(f"/api/posts/{post_id}/replies", params={**params, "limit": 2, "cursor": cursor})
+        assert response.status_code == 200
+        pages.append([reply["content"] for reply in response.json()])
+        cursor = response.headers.get("x-next-cursor")
+        if cursor is None:
+            return pages
+    pytest.fail(f"cursor never ran out: {pages}")
+
+
+@pytest.mark.parametrize("order,expected", [
+    ("oldest", [["Reply 0", "Reply 1"], ["Reply 2", "Reply 3"], ["Reply 4"]]),
+    ("newest", [["Reply 4", "Reply 3"], ["Reply 2", "Reply 1"], ["Reply 0"]]),
+])
+def test_the_cursor_walks_every_page(client, post_id, order, expected):
+    assert _all_pages(client, post_id, order=order) == expected
+
+
+def test_a_cursor_from_the_other_order_is_a_bad_request(client, post_id):
+    cursor = client.get(f"/api/posts/{post_id}/replies", params={"limit": 2}).headers["x-next-cursor"]
+
+    response = client.get(f"/api/posts/{post_id}/replies", params={"order": "newest", "cursor": cursor})
+
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("format", ["json", "ndjson"])
+def test_unknown_post_is_not_found(client, format):
+    assert client.get("/api/posts/999/replies", params={"format": format}).status_code == 404
+
+
+def test_post_without_replies_is_an_empty_page(client):
+    post_id = client.post("/api/posts/", data={"title": "Quiet", "author": "hr"}).json()["id"]
+
+    response = client.get(f"/api/posts/{post_id}/replies")
+
+    assert (response.status_code, response.json()) == (200, [])
+    assert "x-next-cursor" not in response.headers
+
+
+def test_ndjson_export_streams_every_reply_in_chunks(client, post_id, monkeypatch):
+    monkeypatch.setattr(posts_routes, "REPLY_EXPORT_CHUNK", 2)
+
+    response = client.get(f"/api/posts/{post_id}/replies", params={"format": "ndjson", "order": "newest"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["content"] for line in lines] == [f"Reply {i}" for i in (4, 3, 2, 1, 0)]
+    assert {"id", "user", "content", "created_at"} <= set(lines[0])
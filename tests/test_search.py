@@ -0,0 +1,75 @@
+from app.services.search import MARK_START, MARK_STOP, search
+
+
+def _search(client, q, **params):
+    response = client.get("/api/search/", params={"q": q, **params})
+    assert response.status_code == 200
+    return response.json()["results"]
+
+
+def test_matches_are_marked(client):
+    client.post("/api/documents/", json={"name": "Leave policy", "description": "Annual leave is 25 days",
+                                         "link": "https://sp/1", "location": "India"})
+
+    (hit,) = _search(client, "annual")
+
+    assert hit["kind"] == "document"
+    assert hit["snippet"] == "<mark>Annual</mark> leave is 25 days India"
+
+
+def test_post_snippets_do_not_revive_escaped_markup(client):
+    description = "<p>Welcome &lt;img src=x onerror=alert(1)&gt; party on Friday</p>"
+    client.post("/api/posts/", data={"title": "Party", "author": "hr", "description": description})
+
+    (hit,) = _search(client, "welcome")
+
+    assert "<img" not in hit["snippet"]
+    assert hit["snippet"] == "<mark>Welcome</mark> &lt;img src=x onerror=alert(1)&gt; party on Friday"
+
+
+def test_document_snippets_escape_stored_markup(client):
+    client.post("/api/documents/", json={"name": "Handbook", "description": "<script>alert(1)</script> benefits",
+                                         "link": "https://sp/2", "location": "India"})
+
+    (hit,) = _search(client, "benefits")
+
+    assert hit["snippet"] == "&lt;script&gt;alert(1)&lt;/script&gt; <mark>benefits</mark> India"
+
+
+def test_sentinels_never_reach_the_client(db, client):
+    client.post("/api/documents/", json={"name": "Travel", "description": "Travel claims",
+                                         "link": "https://sp/3", "location": "India"})
+
+    hits, _ = search(db, "travel")
+
+    assert hits and all(MARK_START not in h.snippet and MARK_STOP not in h.snippet for h in hits)
+
+
+def test_results_page_with_the_cursor(client):
+    for i in range(5):
+        client.post("/api/posts/", data={"title": f"Town hall {i}", "author": "hr", "description": "town hall"})
+
+    first = client.get("/api/search/", params={"q": "town", "limit": 3}).json()
+    rest = client.get("/api/search/", params={"q": "town", "limit": 3, "cursor": first["next_cursor"]}).json()
+
+    ids = [hit["id"] for hit in first["results"] + rest["results"]]
+    assert sorted(ids) == [1, 2, 3, 4, 5]
+    assert rest["next_cursor"] is None
+
+
+def test_hits_with_equal_rank_page_without_gaps_or_repeats(client):
+    for _ in range(7):
+        client.post("/api/posts/", data={"title": "Town hall", "author": "hr", "description": "town hall"})
+
+    pages, cursor = [], None
+    while True:
+        body = client.get("/api/search/", params={"q": "town", "limit": 2, "cursor": cursor}).json()
+        pages.append(body["results"])
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+
+    hits = [hit for page in pages for hit in page]
+    assert len({hit["rank"] for hit in hits}) == 1
+    assert [hit["id"] for hit in hits] == [1, 2, 3, 4, 5, 6, 7]
+    assert len(pages) == 4
@@ -0,0 +1,64 @@
+import pytest
+
+from app.services.uploads import serving_type
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 64
+SVG = b'<svg xmlns="http://www.w3.org/2000/svg"><script>alert(1)</script></svg>'
+DOCX = b"PK\x03\x04" + b"\x00" * 64
+DOCX_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+
+def _upload(client, name, body, content_type):
+    post = client.post("/api/posts/", data={"title": "Files", "author": "hr"},
+                       files=[("files", (name, body, content_type))]).json()
+    (att,) = post["attachments"]
+    return att, client.get(f"/api/posts/{post['id']}/attachments/{att['id']}")
+
+
+@pytest.mark.parametrize("name,body,declared", [
+    ("logo.svg", SVG, "image/svg+xml"),
+    ("page.html", b"<html><script>alert(1)</script></html>", "text/html"),
+    ("fake.png", b"not really a png", "image/png"),
+])
+def test_unsniffed_uploads_are_never_images_and_download_as_octet_stream(client, name, body, declared):
+    att, response = _upload(client, name, body, declared)
+
+    assert att["is_image"] is False
+    assert att["content_type"] == "application/octet-stream"
+    assert response.headers["content-type"] == "application/octet-stream"
+    assert response.headers["content-disposition"].startswith("attachment;")
+    assert response.headers["x-content-type-options"] == "nosniff"
+
+
+def test_sniffed_raster_images_are_shown_inline(client):
+    att, response = _upload(client, "photo.bin", PNG, "application/octet-stream")
+
+    assert att["is_image"] is True
+    assert response.headers["content-type"] == "image/png"
+    assert response.headers["content-disposition"].startswith("inline;")
+
+
+def test_office_documents_keep_their_declared_type_as_a_download(client):
+    att, response = _upload(client, "report.docx", DOCX, DOCX_TYPE)
+
+    assert att["content_type"] == DOCX_TYPE
+    assert response.headers["content-type"] == DOCX_TYPE
+    assert response.headers["content-disposition"].startswith("attachment;")
+
+
+def test_a_zip_cannot_claim_a_dangerous_declared_type(client):
+    att, _ = _upload(client, "page.html", DOCX, "text/html")
+
+    assert att["content_type"] == "application/zip"
+
+
+@pytest.mark.parametrize("stored,served", [
+    ("image/svg+xml", ("application/octet-stream", "attachment")),
+    ("text/html", ("application/octet-stream", "attachment")),
+    (None, ("application/octet-stream", "attachment")),
+    ("image/jpeg", ("image/jpeg", "inline")),
+    ("application/pdf", ("application/pdf", "inline")),
+    ("application/vnd.ms-excel", ("application/vnd.ms-excel", "attachment")),
+])
+def test_legacy_rows_are_served_by_trusted_type_only(stored, served):
+    assert serving_type(stored) == served
@@ -0,0 +1,157 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.models.post import Post, PostView
+from app.services import view_buffer
+from app.services.view_buffer import ViewBuffer
+
+
+@pytest.fixture
+def post_ids(db):
+    posts = [Post(title=f"Post {i}", author="hr") for i in range(2)]
+    db.add_all(posts)
+    db.commit()
+    return [p.id for p in posts]
+
+
+def _views(db):
+    db.expire_all()
+    return sorted((v.post_id, v.user) for v in db.query(PostView)), {p.id: p.views_count for p in db.query(Post)}
+
+
+@pytest.fixture
+def flushes(monkeypatch):
+    """Records each batch handed to the database."""
+    batches = []
+    flush = view_buffer._flush_batch
+
+    def recording_flush(events):
+        batches.append(list(events))
+        flush(events)
+
+    monkeypatch.setattr(view_buffer, "_flush_batch", recording_flush)
+    return batches
+
+
+def test_full_batches_are_written_in_one_go(db, post_ids, flushes):
+    first, second = post_ids
+
+    async def run():
+        buffer = ViewBuffer(batch_size=3, flush_interval=60)
+        for event in [(first, "a"), (first, "b"), (second, "a"), (second, "b")]:
+            await buffer.add(*event)
+        await asyncio.sleep(0.1)
+        assert len(flushes) == 1  # the fourth view waits for its batch to fill
+        await buffer.shutdown()
+
+    asyncio.run(run())
+
+    assert [len(batch) for batch in flushes] == [3, 1]
+    assert _views(db) == ([(first, "a"), (first, "b"), (second, "a"), (second, "b")], {first: 2, second: 2})
+
+
+def test_a_partial_batch_is_written_after_the_flush_interval(db, post_ids, flushes):
+    async def run():
+        buffer = ViewBuffer(batch_size=100, flush_interval=0.05)
+        await buffer.add(post_ids[0], "a")
+        await asyncio.sleep(0.3)
+        assert flushes == [[(post_ids[0], "a")]]
+        await buffer.shutdown()
+
+    asyncio.run(run())
+
+    assert _views(db)[1][post_ids[0]] == 1
+
+
+def test_shutdown_flushes_what_is_queued(db, post_ids, flushes):
+    async def run():
+        buffer = ViewBuffer(batch_size=100, flush_interval=60)
+        for user in ("a", "b", "c"):
+            await buffer.add(post_ids[0], user)
+        await buffer.shutdown()
+
+    asyncio.run(run())
+
+    assert len(flushes) == 1
+    assert _views(db)[1][post_ids[0]] == 3
+
+
+def test_repeat_views_inside_the_window_are_dropped(db, post_ids):
+    first, second = post_ids
+
+    async def run():
+        buffer = ViewBuffer(batch_size=100, flush_interval=60, dedup_window=0.2)
+        results = [await buffer.add(first, "a"), await buffer.add(first, "a"),
+                   await buffer.add(first, "b"), await buffer.add(second, "a")]
+        await asyncio.sleep(0.3)
+        results.append(await buffer.add(first, "a"))  # the window has passed
+        await buffer.shutdown()
+        return results
+
+    assert asyncio.run(run()) == [True, False, True, True, True]
+    assert _views(db)[1] == {first: 3, second: 1}
+
+
+def test_views_for_deleted_posts_are_dropped_at_flush(db, post_ids):
+    async def run():
+        buffer = ViewBuffer(batch_size=100, flush_interval=60)
+        await buffer.add(post_ids[0], "a")
+        await buffer.add(999, "a")
+        await buffer.shutdown()
+
+    asyncio.run(run())
+
+    assert _views(db)[0] == [(post_ids[0], "a")]
+
+
+def test_a_full_queue_is_a_503(client, post_ids, monkeypatch):
+    release = threading.Event()
+    flush = view_buffer._flush_batch
+    monkeypatch.setattr(view_buffer, "_flush_batch", lambda events: release.wait(5) and flush(events))
+    monkeypatch.setattr(settings, "view_buffer_enabled", True)
+    monkeypatch.setattr(settings, "view_buffer_batch_size", 1)
+    monkeypatch.setattr(settings, "view_buffer_max_queue", 1)
+    monkeypatch.setattr(settings, "view_buffer_enqueue_timeout", 0.05)
+
+    # one event loop for every request, so the background writer keeps running between them
+    with TestClient(client.app) as api:
+        statuses = [api.post(f"/api/posts/{post_ids[0]}/views", data={"user": user}).status_code
+                    for user in ("a", "b", "c")]
+        full = api.post(f"/api/posts/{post_ids[0]}/views", data={"user": "d"})
+        retried = api.post(f"/api/posts/{post_ids[0]}/views", data={"user": "d"})
+        release.set()
+
+    # "a" is being written, "b" waits in the queue, "c" does not fit
+    assert statuses == [202, 202, 503]
+    assert (full.status_code, full.headers["retry-after"]) == (503, "1")
+    # a view rejected as "full" is not remembered as a duplicate
+    assert retried.status_code == 503
+
+
+def test_bulk_views_report_duplicates_and_unknown_posts(client, db, post_ids):
+    first, second = post_ids
+    views = [{"post_id": first, "user": "a"}, {"post_id": first, "user": "a"},
+             {"post_id": second, "user": "a"}, {"post_id": 999, "user": "a"}]
+
+    response = client.post("/api/posts/views/bulk", json={"views": views})
+
+    assert response.status_code == 202
+    assert response.json() == {"accepted": 2, "duplicates": 1, "rejected": 1}
+    assert _views(db)[1] == {first: 1, second: 1}
+
+
+def test_bulk_views_go_through_the_buffer(client, db, post_ids, monkeypatch):
+    monkeypatch.setattr(settings, "view_buffer_enabled", True)
+    views = [{"post_id": post_ids[0], "user": "a"}, {"post_id": post_ids[0], "user": "a"},
+             {"post_id": post_ids[0], "user": "b"}]
+
+    with TestClient(client.app) as api:
+        response = api.post("/api/posts/views/bulk", json={"views": views})
+
+    assert response.json() == {"accepted": 2, "duplicates": 1, "rejected": 0}
+    # flushed on shutdown
+    assert _views(db)[1][post_ids[0]] == 2